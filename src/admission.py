@@ -0,0 +1,328 @@
+from fractions import Fraction
+import numpy as np
+from common import task_error
+from edf import edf_qpa
+from sched_api import InvalidTaskSetError, NotSchedulableError
+
+
+class RmsAdmission:
+    """Incremental RMS admission control.
+
+    The admitted task set is always schedulable under RMS. The tasks are kept sorted
+    by period, so adding, removing or changing a task only affects the tasks with
+    the same or longer periods. A change is first checked with the utilization and
+    hyperbolic bounds (Bini et al.). When they are inconclusive, the response time
+    upper bound of Bini and Baruah is checked for each affected task, and the exact
+    Response Time Analysis (RTA) runs only for the tasks not passing it. The response
+    times skipped by the bounds are computed when they are requested.
+
+    As in :func:`rms.rms_response_times`, tasks with the same period interfere with each other.
+
+    :param task_list: initial task set.
+    :type  task_list: List of dictionaries.
+    :raises InvalidTaskSetError: if a task is invalid or two tasks have the same name.
+    :raises NotSchedulableError: if the initial task set is not schedulable.
+
+    :Example:
+
+        >>> admission = RmsAdmission()
+        >>> admission.admit(dict(name='P1', exec_time=1, deadline=8, period=8))
+        True
+        >>> admission.response_times()
+        {'P1': 1}
+    """
+
+    def __init__(self, task_list=()):
+        self.tasks = {}
+        # task names sorted by period, and the arrays of their periods, execution times and min(deadline, period)
+        self.order = []
+        self.periods = np.empty(0, dtype=np.int64)
+        self.execs = np.empty(0, dtype=np.int64)
+        self.deadlines = np.empty(0, dtype=np.int64)
+        self.utilization = Fraction(0)
+        # number of tasks with deadline shorter than the period
+        self.constrained = 0
+        # response time of each task. For the stale tasks, it is only a lower bound
+        self.resp = {}
+        self.stale = set()
+        for task in task_list:
+            if not self.admit(task):
+                raise NotSchedulableError("the task set is not schedulable for RMS")
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, name):
+        return name in self.tasks
+
+    def admit(self, task):
+        """Add a task if the task set remains schedulable.
+
+        :param task: task descriptor.
+        :type  task: Dictionary.
+        :return: True if the task was admitted, False otherwise.
+        :rtype: bool
+        :raises InvalidTaskSetError: if the task is invalid or its name is already used.
+        """
+        error = task_error(task)
+        if error is not None:
+            raise InvalidTaskSetError(error)
+        if task['name'] in self.tasks:
+            raise InvalidTaskSetError("task %s already admitted" % task['name'])
+        return self._update(dict(task), None)
+
+    def remove(self, name):
+        """Remove a task. The task set always remains schedulable.
+
+        :param name: task name.
+        :type  name: str
+        :return: None.
+        :raises KeyError: if there is no task with this name.
+        """
+        if name not in self.tasks:
+            raise KeyError(name)
+        self._update(None, name)
+
+    def modify(self, task):
+        """Replace the task with the same name if the task set remains schedulable.
+
+        :param task: new task descriptor.
+        :type  task: Dictionary.
+        :return: True if the change was accepted, False otherwise. A rejected change leaves the task set unchanged.
+        :rtype: bool
+        :raises InvalidTaskSetError: if the task is invalid.
+        :raises KeyError: if there is no task with this name.
+        """
+        error = task_error(task)
+        if error is not None:
+            raise InvalidTaskSetError(error)
+        if task['name'] not in self.tasks:
+            raise KeyError(task['name'])
+        return self._update(dict(task), task['name'])
+
+    def _update(self, new_task, removed):
+        """Check and apply the removal of a task and/or the addition of a new one.
+
+        :param new_task: task to be added, or None.
+        :param removed: name of the task to be removed, or None.
+        :return: True if the change was applied.
+        :rtype: bool
+        """
+        order = self.order
+        periods = self.periods
+        execs = self.execs
+        deadlines = self.deadlines
+        utilization = self.utilization
+        constrained = self.constrained
+        first_period = None
+        if removed is not None:
+            old = self.tasks[removed]
+            pos = order.index(removed)
+            order = order[:pos] + order[pos+1:]
+            periods = np.delete(periods, pos)
+            execs = np.delete(execs, pos)
+            deadlines = np.delete(deadlines, pos)
+            utilization -= Fraction(old['exec_time'], old['period'])
+            constrained -= old['deadline'] < old['period']
+            first_period = old['period']
+        if new_task is not None:
+            pos = int(np.searchsorted(periods, new_task['period'], side='right'))
+            order = order[:pos] + [new_task['name']] + order[pos:]
+            periods = np.insert(periods, pos, new_task['period'])
+            execs = np.insert(execs, pos, new_task['exec_time'])
+            deadlines = np.insert(deadlines, pos, min(new_task['deadline'], new_task['period']))
+            utilization += Fraction(new_task['exec_time'], new_task['period'])
+            constrained += new_task['deadline'] < new_task['period']
+            if first_period is None or new_task['period'] < first_period:
+                first_period = new_task['period']
+        if utilization > 1:
+            return False
+        # the tasks with shorter periods are not affected
+        first = int(np.searchsorted(periods, first_period, side='left'))
+        tasks = dict(self.tasks)
+        if removed is not None:
+            del tasks[removed]
+        if new_task is not None:
+            tasks[new_task['name']] = new_task
+
+        # the old response times remain lower bounds only when a task is added
+        resp = dict(self.resp)
+        if removed is not None:
+            resp.pop(removed)
+            for name in order[first:]:
+                resp[name] = 0
+        if new_task is not None:
+            resp[new_task['name']] = 0
+
+        stale = set(self.stale)
+        stale.discard(removed)
+        # a removal never makes the task set unschedulable. The hyperbolic bound
+        # applies to implicit deadlines, with some slack for the rounding errors
+        if new_task is None or (constrained == 0 and np.prod(execs / periods + 1.0) <= 2.0 - 1e-9):
+            stale.update(order[first:])
+        else:
+            # response time upper bound of each affected task (Bini and Baruah)
+            utils = execs / periods
+            cum_utils = np.concatenate(([0.0], np.cumsum(utils)))
+            cum_work = np.concatenate(([0.0], np.cumsum(execs * (1.0 - utils))))
+            hi = np.searchsorted(periods, periods[first:], side='right')
+            hp_utils = cum_utils[hi] - utils[first:]
+            hp_work = cum_work[hi] - execs[first:] * (1.0 - utils[first:])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                bounded = (hp_utils < 1.0) & ((execs[first:] + hp_work) / (1.0 - hp_utils) <= deadlines[first:] - 1e-9)
+            prev = None
+            for pos in range(first, len(order)):
+                name = order[pos]
+                if bounded[pos - first]:
+                    stale.add(name)
+                    prev = None
+                    continue
+                task = tasks[name]
+                start = resp[name]
+                # the response time of a task with shorter period is a lower bound
+                if prev is not None and tasks[prev]['period'] < task['period']:
+                    start = max(start, resp[prev] + task['exec_time'])
+                resp[name] = self._response_time(task, periods, execs, start)
+                if resp[name] is None:
+                    return False
+                stale.discard(name)
+                prev = name
+
+        self.tasks = tasks
+        self.order = order
+        self.periods = periods
+        self.execs = execs
+        self.deadlines = deadlines
+        self.utilization = utilization
+        self.constrained = constrained
+        self.resp = resp
+        self.stale = stale
+        return True
+
+    @staticmethod
+    def _response_time(task, periods, execs, start=0):
+        """Exact response time of a task, as in :func:`rms.response_time`.
+
+        :return: The response time, or None if the task misses its deadline.
+        :rtype: int
+        """
+        deadline = min(task['deadline'], task['period'])
+        # the tasks with the same or shorter periods, including this task
+        hi = int(np.searchsorted(periods, task['period'], side='right'))
+        hp_periods = periods[:hi]
+        hp_execs = execs[:hi]
+        resp = max(start, int(hp_execs.sum()))
+        while resp <= deadline:
+            # resp <= period, so the task itself contributes a single exec_time
+            new_resp = int((-(-resp // hp_periods) * hp_execs).sum())
+            if new_resp == resp:
+                return resp
+            resp = new_resp
+        return None
+
+    def response_time(self, name):
+        """Response time of a task.
+
+        :param name: task name.
+        :type  name: str
+        :rtype: int
+        :raises KeyError: if there is no task with this name.
+        """
+        if name in self.stale:
+            self.response_times()
+        return self.resp[name]
+
+    def response_times(self):
+        """Response time of each task.
+
+        :return: The response time of each task, by task name, in priority order.
+        :rtype: Dictionary.
+        """
+        if self.stale:
+            prev = None
+            for name in self.order:
+                if name in self.stale:
+                    task = self.tasks[name]
+                    start = self.resp[name]
+                    # the response time of a task with shorter period is a lower bound
+                    if prev is not None and self.tasks[prev]['period'] < task['period']:
+                        start = max(start, self.resp[prev] + task['exec_time'])
+                    self.resp[name] = self._response_time(task, self.periods, self.execs, start)
+                prev = name
+            self.stale.clear()
+        return {name: self.resp[name] for name in self.order}
+
+
+class EdfAdmission:
+    """Incremental EDF admission control.
+
+    The admitted task set is always schedulable under EDF. When all deadlines are
+    equal to or longer than the periods, the exact utilization test is updated in
+    constant time. Otherwise, the Quick Processor-demand Analysis (QPA) checks
+    the new task set.
+
+    :param task_list: initial task set.
+    :type  task_list: List of dictionaries.
+    :raises InvalidTaskSetError: if a task is invalid or two tasks have the same name.
+    :raises NotSchedulableError: if the initial task set is not schedulable.
+    """
+
+    def __init__(self, task_list=()):
+        self.tasks = {}
+        self.utilization = Fraction(0)
+        # number of tasks with deadline shorter than the period
+        self.constrained = 0
+        for task in task_list:
+            if not self.admit(task):
+                raise NotSchedulableError("the task set is not schedulable for EDF")
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __contains__(self, name):
+        return name in self.tasks
+
+    def admit(self, task):
+        """Add a task if the task set remains schedulable, as in :meth:`RmsAdmission.admit`."""
+        error = task_error(task)
+        if error is not None:
+            raise InvalidTaskSetError(error)
+        if task['name'] in self.tasks:
+            raise InvalidTaskSetError("task %s already admitted" % task['name'])
+        return self._update(dict(task), None)
+
+    def remove(self, name):
+        """Remove a task, as in :meth:`RmsAdmission.remove`."""
+        if name not in self.tasks:
+            raise KeyError(name)
+        self._update(None, name)
+
+    def modify(self, task):
+        """Replace the task with the same name if the task set remains schedulable, as in :meth:`RmsAdmission.modify`."""
+        error = task_error(task)
+        if error is not None:
+            raise InvalidTaskSetError(error)
+        if task['name'] not in self.tasks:
+            raise KeyError(task['name'])
+        return self._update(dict(task), task['name'])
+
+    def _update(self, new_task, removed):
+        tasks = dict(self.tasks)
+        utilization = self.utilization
+        constrained = self.constrained
+        if removed is not None:
+            old = tasks.pop(removed)
+            utilization -= Fraction(old['exec_time'], old['period'])
+            constrained -= old['deadline'] < old['period']
+        if new_task is not None:
+            tasks[new_task['name']] = new_task
+            utilization += Fraction(new_task['exec_time'], new_task['period'])
+            constrained += new_task['deadline'] < new_task['period']
+        if utilization > 1:
+            return False
+        if constrained > 0 and new_task is not None and not edf_qpa(list(tasks.values())):
+            return False
+        self.tasks = tasks
+        self.utilization = utilization
+        self.constrained = constrained
+        return True
@@ -0,0 +1,233 @@
+import numpy as np
+
+# supported algorithms of the batch simulator
+BATCH_ALGOS = ['rms', 'edf']
+# live task sets below this fraction trigger the compaction of the state arrays
+COMPACT_RATIO = 0.75
+
+
+def pack_task_sets(task_sets):
+    """Pack task sets in the input YAML format into padded 2-D arrays.
+
+    Each row is a task set. Task sets with less tasks are padded with zero
+    execution time, as in :func:`rms.rms_is_schedulable_batch`.
+
+    :param task_sets: List of task lists.
+    :type  task_sets: List of lists of dictionaries.
+    :return: The execution times, periods and deadlines, each one with shape (number of task sets, max number of tasks).
+    :rtype: tuple of numpy arrays of int.
+    """
+    num_tasks = max((len(tasks) for tasks in task_sets), default=0)
+    exec_times = np.zeros((len(task_sets), num_tasks), dtype=np.int64)
+    periods = np.ones((len(task_sets), num_tasks), dtype=np.int64)
+    deadlines = np.ones((len(task_sets), num_tasks), dtype=np.int64)
+    for row, tasks in enumerate(task_sets):
+        for col, task in enumerate(tasks):
+            exec_times[row, col] = task['exec_time']
+            periods[row, col] = task['period']
+            deadlines[row, col] = task['deadline']
+    return exec_times, periods, deadlines
+
+
+def batch_sched(exec_times, periods, deadlines=None, sim_time=0, algo='rms', intervals=False, stop_at_miss=True):
+    """Simulates RMS or EDF for many task sets at once.
+
+    The task sets are advanced in lockstep with vectorized operations. Each step
+    moves every task set to its own next job release or job completion, as in
+    :func:`common.event_sched`, so the number of steps depends on the number of
+    jobs of the largest task set instead of the number of simulated OS ticks.
+    The jobs are released and prioritized as in the other simulators, and the
+    execution intervals are the same ones returned by :func:`common.event_sched`.
+
+    A job misses its deadline when it finishes after it, or when it is not
+    finished when its deadline is over, as in :func:`common.verify_sched`.
+
+    :param exec_times: execution time of the tasks, shape (number of task sets, max number of tasks). Padding tasks have zero execution time.
+    :type  exec_times: numpy array of int.
+    :param periods: periods of the tasks, same shape of exec_times.
+    :type  periods: numpy array of int.
+    :param deadlines: deadlines of the tasks, same shape of exec_times. If none is defined, the periods are used.
+    :type  deadlines: numpy array of int.
+    :param sim_time: Number of OS ticks to be simulated.
+    :type  sim_time: int
+    :param algo: 'rms' or 'edf'.
+    :type  algo: str
+    :param intervals: If True, the execution intervals are returned.
+    :type  intervals: bool
+    :param stop_at_miss: If True, the simulation of a task set stops at its first deadline miss. The intervals of such task sets are incomplete.
+    :type  stop_at_miss: bool
+
+    :return: Dictionary with 'missed' (True for the task sets missing a deadline) and 'miss_time'
+        (completion time or deadline of the first job detected missing its deadline, -1 if none).
+        If intervals is True, it also has 'intervals', a dictionary with the arrays 'set', 'task'
+        (column of the task, -1 when idle), 'start' and 'end', sorted by task set and start time.
+    :rtype: Dictionary.
+    :raises ValueError: if the algorithm is not supported, the arrays have different shapes or the simulation time is too long.
+
+    :Example:
+
+        >>> batch_sched([[1,2,2],[3,3,0]], [[8,5,10],[4,6,1]], sim_time=40)['missed']
+        >>> array([False,  True])
+    """
+    if algo not in BATCH_ALGOS:
+        raise ValueError("unsupported scheduling algorithm %s" % algo)
+    exec_times = np.array(exec_times, dtype=np.int64, ndmin=2)
+    periods = np.array(periods, dtype=np.int64, ndmin=2)
+    deadlines = periods.copy() if deadlines is None else np.array(deadlines, dtype=np.int64, ndmin=2)
+    if not (exec_times.shape == periods.shape == deadlines.shape):
+        raise ValueError("the execution times, periods and deadlines must have the same shape")
+    num_sets, num_tasks = exec_times.shape
+    sim_time = int(sim_time)
+
+    missed = np.zeros(num_sets, dtype=bool)
+    miss_time = np.full(num_sets, -1, dtype=np.int64)
+    out = dict(missed=missed, miss_time=miss_time)
+    recorded = []
+    if num_sets == 0 or num_tasks == 0 or sim_time <= 0:
+        if intervals:
+            out['intervals'] = _merge_intervals(recorded)
+        return out
+
+    # the ready jobs are ordered by (priority level, release order, column), as in
+    # the ReadyQueue of the other simulators. The three are packed into one key
+    valid = exec_times > 0
+    periods = np.where(valid, periods, 1)
+    max_level = sim_time + int(np.abs(deadlines).max()) + 1 if algo == 'edf' else int(periods.max())
+    weight = sim_time + 2
+    never = np.iinfo(np.int64).max
+    if (max_level + 1) * weight * num_tasks >= never:
+        raise ValueError("simulation time %d too long for the batch simulator" % sim_time)
+
+    # the state arrays have one row per task and one column per task set, so the
+    # reductions over the tasks of each set are element-wise operations on rows.
+    # Only the oldest ready job of each task competes for the CPU, since the jobs 
+    # of a task run in order
+    ids = np.arange(num_sets)
+    C, T, D = exec_times.T.copy(), periods.T.copy(), deadlines.T.copy()
+    # release order (0, period, 2*period, ...) and tick of the next job of each task
+    next_order = np.zeros((num_tasks, num_sets), dtype=np.int64)
+    next_tick = np.ascontiguousarray(np.where(valid.T, 0, never))
+    # number of ready jobs of each task, release order, remaining execution time and key of the oldest one
+    pending = np.zeros((num_tasks, num_sets), dtype=np.int64)
+    head_order = np.zeros((num_tasks, num_sets), dtype=np.int64)
+    head_rem = np.zeros((num_tasks, num_sets), dtype=np.int64)
+    key = np.full((num_tasks, num_sets), never, dtype=np.int64)
+    time = np.zeros(num_sets, dtype=np.int64)
+    alive = np.ones(num_sets, dtype=bool)
+
+    while True:
+        num_live = len(ids)
+        rows = np.arange(num_live)
+        # flat views of the state arrays, indexed by task * num_live + task set
+        C_f, T_f, D_f = C.reshape(-1), T.reshape(-1), D.reshape(-1)
+        next_order_f, next_tick_f, pending_f = next_order.reshape(-1), next_tick.reshape(-1), pending.reshape(-1)
+        head_order_f, head_rem_f, key_f = head_order.reshape(-1), head_rem.reshape(-1), key.reshape(-1)
+
+        if algo == 'edf':
+            def job_key(flat, order):
+                return ((order + D_f[flat]) * weight + order) * num_tasks + flat // num_live
+        else:
+            def job_key(flat, order):
+                return (T_f[flat] * weight + order) * num_tasks + flat // num_live
+
+        set_next = next_tick.min(axis=0)
+        while True:
+            # move the released jobs to the ready lists. A task releases at most
+            # one job per tick, so this loops at most twice
+            while True:
+                due_sets = np.nonzero(set_next <= time)[0]
+                if len(due_sets) == 0:
+                    break
+                tasks, sets = np.nonzero(next_tick[:, due_sets] <= time[due_sets])
+                flat = tasks * num_live + due_sets[sets]
+                order = next_order_f[flat]
+                first = pending_f[flat] == 0
+                head = flat[first]
+                head_order_f[head] = order[first]
+                head_rem_f[head] = C_f[head]
+                key_f[head] = job_key(head, order[first])
+                pending_f[flat] += 1
+                # the job of the release order i is released at the tick i
+                order = order + T_f[flat]
+                next_order_f[flat] = order
+                next_tick_f[flat] = np.where(order < sim_time, order, never)
+                set_next[due_sets] = next_tick[:, due_sets].min(axis=0)
+
+            # the highest priority ready job of each task set runs up to its
+            # completion or the next release, whichever comes first
+            next_release = np.minimum(set_next, sim_time)
+            top = key.min(axis=0)
+            busy = top != never
+            run = top % num_tasks * num_live + rows
+            rem = head_rem_f[run]
+            end = np.where(busy, np.minimum(time + rem, next_release), next_release)
+            end = np.where(alive, end, time)
+
+            if intervals:
+                live = alive & (end > time)
+                recorded.append((ids[live], np.where(busy, top % num_tasks, -1)[live], time[live], end[live]))
+
+            # the running jobs execute up to the end of the step
+            rem = rem - (end - time)
+            head_rem_f[run[busy]] = rem[busy]
+            done = np.nonzero(busy & (rem == 0) & alive)[0]
+            if len(done) > 0:
+                flat = run[done]
+                late = end[done] > head_order_f[flat] + D_f[flat]
+                first = late & ~missed[ids[done]]
+                miss_time[ids[done[first]]] = end[done[first]]
+                missed[ids[done[late]]] = True
+                pending_f[flat] -= 1
+                order = head_order_f[flat] + T_f[flat]
+                head_order_f[flat] = order
+                more = pending_f[flat] > 0
+                head_rem_f[flat] = np.where(more, C_f[flat], 0)
+                key_f[flat] = np.where(more, job_key(flat, order), never)
+
+            time = end
+            finished = time >= sim_time
+            if stop_at_miss:
+                finished |= missed[ids]
+            # the jobs still ready at the simulation end miss their deadline if it is over
+            ended = np.nonzero(finished & alive)[0]
+            if len(ended) > 0:
+                job_deadline = head_order[:, ended] + D[:, ended]
+                over = (pending[:, ended] > 0) & (job_deadline <= sim_time)
+                late = over.any(axis=0) & ~missed[ids[ended]]
+                miss_time[ids[ended[late]]] = np.where(over[:, late], job_deadline[:, late], never).min(axis=0)
+                missed[ids[ended[late]]] = True
+                next_tick[:, ended] = never
+                set_next[ended] = never
+                alive[ended] = False
+                num_alive = int(alive.sum())
+                # drop the finished task sets, so the next steps work on smaller arrays
+                if num_alive < COMPACT_RATIO * num_live:
+                    break
+
+        if num_alive == 0:
+            break
+        ids = ids[alive]
+        C, T, D, next_order, next_tick, pending, head_order, head_rem, key = (np.ascontiguousarray(state[:, alive])
+            for state in (C, T, D, next_order, next_tick, pending, head_order, head_rem, key))
+        time = time[alive]
+        alive = np.ones(num_alive, dtype=bool)
+
+    if intervals:
+        out['intervals'] = _merge_intervals(recorded)
+    return out
+
+
+def _merge_intervals(recorded):
+    """Sort the intervals recorded by :func:`batch_sched` and merge the consecutive ones of the same task."""
+    if not recorded:
+        empty = np.zeros(0, dtype=np.int64)
+        return dict(set=empty, task=empty.copy(), start=empty.copy(), end=empty.copy())
+    sets, tasks, starts, ends = (np.concatenate(column) for column in zip(*recorded))
+    order = np.lexsort((starts, sets))
+    sets, tasks, starts, ends = sets[order], tasks[order], starts[order], ends[order]
+    # an interval starts a new segment unless it continues the previous one
+    new = np.ones(len(sets), dtype=bool)
+    new[1:] = (sets[1:] != sets[:-1]) | (tasks[1:] != tasks[:-1]) | (starts[1:] != ends[:-1])
+    first = np.nonzero(new)[0]
+    last = np.concatenate((first[1:], [len(sets)])) - 1
+    return dict(set=sets[first], task=tasks[first], start=starts[first], end=ends[last])
@@ -0,0 +1,183 @@
+import argparse
+import csv
+import sys
+from multiprocessing import Pool
+import numpy as np
+# supported algorithms
+from rms import rms_is_schedulable_batch
+from edf import edf_is_schedulable
+from batch_sched import batch_sched, pack_task_sets
+
+
+def uunifast(n, util, rng):
+    """Draw the utilization of n tasks with the UUniFast algorithm.
+
+    The task utilizations are uniformly distributed and sum up to util,
+    as proposed by Bini and Buttazzo.
+
+    :param n: number of tasks.
+    :type  n: int
+    :param util: total utilization of the task set.
+    :type  util: float
+    :param rng: random number generator.
+    :type  rng: numpy.random.Generator
+
+    :return: The utilization of each task.
+    :rtype: List of float.
+    """
+    utils = []
+    sum_u = util
+    for i in range(1, n):
+        next_sum_u = sum_u * rng.random() ** (1.0 / (n - i))
+        utils.append(sum_u - next_sum_u)
+        sum_u = next_sum_u
+    utils.append(sum_u)
+    return utils
+
+
+def gen_task_set(n, util, rng, min_period=10, max_period=1000, constrained=False):
+    """Generate a random task set in the input YAML format.
+
+    The utilizations are drawn with UUniFast and the periods are log-uniformly
+    distributed in [min_period, max_period]. The execution times are rounded
+    to the nearest tick, with at least one tick.
+
+    :param n: number of tasks.
+    :type  n: int
+    :param util: total utilization of the task set.
+    :type  util: float
+    :param rng: random number generator.
+    :type  rng: numpy.random.Generator
+    :param min_period: shortest period.
+    :type  min_period: int
+    :param max_period: longest period.
+    :type  max_period: int
+    :param constrained: if True, the deadlines are uniformly distributed between the execution time and the period. Otherwise, they are equal to the periods.
+    :type  constrained: bool
+
+    :return: List of task descriptors.
+    :rtype: List of dictionaries.
+    """
+    tasks = []
+    periods = np.exp(rng.uniform(np.log(min_period), np.log(max_period + 1), n)).astype(int)
+    for idx, (task_util, period) in enumerate(zip(uunifast(n, util, rng), periods)):
+        period = int(period)
+        exec_time = max(1, int(round(task_util * period)))
+        if constrained:
+            deadline = int(rng.integers(min(exec_time, period), period + 1))
+        else:
+            deadline = period
+        tasks.append(dict(name='task%d' % (idx+1), exec_time=exec_time, deadline=deadline, period=period))
+    return tasks
+
+
+def run_chunk(args):
+    """Generate and analyze a chunk of task sets of the same utilization level.
+
+    The random number generator of the chunk is seeded from the campaign seed,
+    the utilization level and the chunk index, so the results do not depend on
+    the number of worker processes.
+
+    When sim_time is positive, the task sets are also simulated with :func:`batch_sched.batch_sched`
+    and the task sets without deadline misses are counted.
+
+    :param args: tuple (seed, level index, chunk index, utilization, number of task sets, number of tasks, min period, max period, constrained, sim_time).
+    :type  args: tuple
+
+    :return: Tuple (level index, number of task sets, accepted by RMS, accepted by EDF, simulated without misses by RMS, simulated without misses by EDF).
+    :rtype: tuple
+    """
+    seed, level, chunk, util, num_sets, num_tasks, min_period, max_period, constrained, sim_time = args
+    rng = np.random.default_rng([seed, level, chunk])
+    task_sets = [gen_task_set(num_tasks, util, rng, min_period, max_period, constrained) for _ in range(num_sets)]
+
+    # RMS is checked at once for all task sets of the chunk
+    exec_times, periods, deadlines = pack_task_sets(task_sets)
+    rms_ok = int(rms_is_schedulable_batch(exec_times, periods, deadlines).sum())
+    edf_ok = sum(1 for tasks in task_sets if edf_is_schedulable(tasks))
+    rms_sim_ok = edf_sim_ok = 0
+    if sim_time > 0:
+        # all the task sets of the chunk are simulated in lockstep
+        rms_sim_ok = int((~batch_sched(exec_times, periods, deadlines, sim_time, 'rms')['missed']).sum())
+        edf_sim_ok = int((~batch_sched(exec_times, periods, deadlines, sim_time, 'edf')['missed']).sum())
+    return level, num_sets, rms_ok, edf_ok, rms_sim_ok, edf_sim_ok
+
+
+def main():
+    """Acceptance ratio campaign of the schedulability tests.
+
+    For each utilization level, it generates random task sets with UUniFast and
+    checks them with the RMS and EDF schedulability tests in a pool of worker
+    processes. The acceptance ratio of each algorithm is saved in a CSV file.
+    With --simtime, the task sets are also simulated and the ratio of task sets 
+    without deadline misses is saved too.
+
+    :return: None.
+    """
+    # parsing arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument('ofile', type=argparse.FileType('w'),
+                        help='output CSV file with the acceptance ratios'
+                        )
+    parser.add_argument('-n','--tasks', dest='num_tasks', default=10, type=int,
+                help='The number of tasks of each task set (default: %(default)s).')
+    parser.add_argument('--sets', dest='num_sets', default=1000, type=int,
+                help='The number of task sets of each utilization level (default: %(default)s).')
+    parser.add_argument('--umin', default=0.5, type=float,
+                help='The lowest utilization level (default: %(default)s).')
+    parser.add_argument('--umax', default=1.0, type=float,
+                help='The highest utilization level (default: %(default)s).')
+    parser.add_argument('--ustep', default=0.05, type=float,
+                help='The step between utilization levels (default: %(default)s).')
+    parser.add_argument('--pmin', dest='min_period', default=10, type=int,
+                help='The shortest task period (default: %(default)s).')
+    parser.add_argument('--pmax', dest='max_period', default=1000, type=int,
+                help='The longest task period (default: %(default)s).')
+    parser.add_argument('--constrained', action='store_true', default=False,
+                help='Generate deadlines shorter than the periods.')
+    parser.add_argument('--seed', default=0, type=int,
+                help='The seed of the random task set generator (default: %(default)s).')
+    parser.add_argument('--simtime', dest='sim_time', default=0, type=int,
+                help='Also simulate the task sets for this number of OS ticks and count the ones without deadline misses. Zero disables the simulation (default: %(default)s).')
+    parser.add_argument('-j','--jobs', default=None, type=int,
+                help='The number of worker processes. If not defined, the number of CPUs is used.')
+    parser.add_argument('--chunk', default=100, type=int,
+                help='The number of task sets analyzed by each work item (default: %(default)s).')
+
+    args = parser.parse_args()
+
+    if args.num_tasks < 2:
+        print ("ERROR: the task sets must have more than 1 task. Got", args.num_tasks)
+        sys.exit(1)
+    if args.min_period <= 0 or args.min_period > args.max_period:
+        print ("ERROR: invalid period range", args.min_period, args.max_period)
+        sys.exit(1)
+
+    levels = np.round(np.arange(args.umin, args.umax + args.ustep/2, args.ustep), 6)
+    work = []
+    for level, util in enumerate(levels):
+        for chunk, first in enumerate(range(0, args.num_sets, args.chunk)):
+            work.append((args.seed, level, chunk, float(util), min(args.chunk, args.num_sets - first),
+                args.num_tasks, args.min_period, args.max_period, args.constrained, args.sim_time))
+
+    print ('analyzing', args.num_sets*len(levels), 'task sets in', len(work), 'work items ... ', end='', flush=True)
+    totals = np.zeros((len(levels), 5), dtype=int)
+    with Pool(args.jobs) as pool:
+        for level, *counts in pool.imap_unordered(run_chunk, work):
+            totals[level] += counts
+    print ('done !')
+
+    with open(args.ofile.name, 'w', newline='') as outfile:
+        writer = csv.writer(outfile)
+        header = ['utilization', 'task_sets', 'rms_accepted', 'rms_ratio', 'edf_accepted', 'edf_ratio']
+        if args.sim_time > 0:
+            header += ['rms_sim_ok', 'rms_sim_ratio', 'edf_sim_ok', 'edf_sim_ratio']
+        writer.writerow(header)
+        for util, (num_sets, rms_ok, edf_ok, rms_sim_ok, edf_sim_ok) in zip(levels, totals):
+            row = [util, num_sets, rms_ok, rms_ok/num_sets, edf_ok, edf_ok/num_sets]
+            if args.sim_time > 0:
+                row += [rms_sim_ok, rms_sim_ok/num_sets, edf_sim_ok, edf_sim_ok/num_sets]
+            writer.writerow(row)
+
+if __name__ == "__main__":
+    main()
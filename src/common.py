@@ -1,10 +1,16 @@
 import sys
 from math import gcd
+from collections import deque
+import heapq
+import bisect
+from functools import reduce
 import datetime
-# for plotting
-import plotly.express as px
-import pandas as pd
 import numpy as np
+# plotly and pandas are imported by the plotting functions, so the simulators
+# can be used without the plotting stack
+
+# schedules with more jobs or ticks than this are plotted with plot_gantt_large
+LARGE_SCHED_JOBS = 10000
 
 
 def versiontuple(v):
@@ -23,6 +29,259 @@ def versiontuple(v):
     return tuple(map(int, (v.split("."))))
 
 
+class ReadyQueue:
+    """OS's ready list ordered by priority level.
+
+    Each priority level holds its jobs in a FIFO and the non-empty levels are
+    kept in a heap, so releasing a job and removing the top job cost O(log n),
+    where n is the number of distinct priority levels.
+    The lower the level value, the higher the priority. Jobs with the same 
+    priority level are served in the order they were released.
+
+    :Example: 
+
+        >>> rq = ReadyQueue()
+        >>> rq.push(5, "P2")
+        >>> rq.push(8, "P1")
+        >>> rq.push(5, "P3")
+        >>> rq.top()
+        'P2'
+    """
+
+    def __init__(self):
+        self.levels = []
+        self.fifos = {}
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, level, job):
+        """Insert a job at the end of its priority level.
+
+        :param level: priority level of the job. Lower values have higher priority.
+        :type  level: int
+        :param job: the job descriptor.
+        """
+        fifo = self.fifos.get(level)
+        if fifo is None:
+            fifo = deque()
+            self.fifos[level] = fifo
+            heapq.heappush(self.levels, level)
+        fifo.append(job)
+        self.size += 1
+
+    def top(self):
+        """Return the oldest job of the highest priority level.
+
+        :return: the job descriptor.
+        """
+        return self.fifos[self.levels[0]][0]
+
+    def pop(self):
+        """Remove and return the oldest job of the highest priority level.
+
+        :return: the job descriptor.
+        """
+        level = self.levels[0]
+        fifo = self.fifos[level]
+        job = fifo.popleft()
+        if len(fifo) == 0:
+            heapq.heappop(self.levels)
+            del self.fifos[level]
+        self.size -= 1
+        return job
+
+    def items(self):
+        """Return the jobs of each priority level, from the highest priority to the lowest one.
+
+        :return: List of (level, list of job descriptors) tuples.
+        :rtype: List of tuples.
+        """
+        return [(level, list(self.fifos[level])) for level in sorted(self.levels)]
+
+
+class Task:
+    """Compact task descriptor used by the simulators.
+
+    It keeps the fields of a task dictionary in slots, with the position of the
+    task in its task list, so the simulators use attribute reads and integer task 
+    ids instead of hash lookups. It also supports ``task['period']``, so it can be 
+    passed to the functions expecting task dictionaries.
+
+    :param idx: position of the task in its task list.
+    :type  idx: int
+    :param name: task name.
+    :type  name: str
+    :param exec_time: execution time.
+    :type  exec_time: int
+    :param deadline: relative deadline.
+    :type  deadline: int
+    :param period: period.
+    :type  period: int
+    :param priority: fixed priority level, lower levels first. If none is defined, the period is used, as in RMS.
+    :type  priority: int
+    """
+    __slots__ = ('idx', 'name', 'exec_time', 'deadline', 'period', 'priority')
+
+    def __init__(self, idx, name, exec_time, deadline, period, priority=None):
+        self.idx = idx
+        self.name = name
+        self.exec_time = exec_time
+        self.deadline = deadline
+        self.period = period
+        self.priority = period if priority is None else priority
+
+    def __getitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key not in ('idx', 'priority') and key in self.__slots__
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def to_dict(self):
+        """Return the task dictionary, as in the input YAML file.
+
+        :rtype: Dictionary.
+        """
+        return dict(name=self.name, exec_time=self.exec_time, deadline=self.deadline, period=self.period)
+
+    def __repr__(self):
+        return 'Task(%r)' % self.to_dict()
+
+
+def compact_tasks(task_list, priorities=None):
+    """Build the compact representation of a task list, once before simulating it.
+
+    :param task_list: List of task descriptors, as dictionaries or :class:`Task`.
+    :type  task_list: List of dictionaries.
+    :param priorities: fixed priority level of each task, as returned by :func:`rms.assign_priorities`. If none is defined, the periods are used.
+    :type  priorities: List of int.
+    :return: One :class:`Task` per task, in the same order. The tasks already in the compact format, in the right position and with the right priority are reused.
+    :rtype: List of :class:`Task`.
+    """
+    if priorities is None:
+        priorities = [None]*len(task_list)
+    return [task if isinstance(task, Task) and task.idx == idx and (level is None or task.priority == level) else
+        Task(idx, task['name'], task['exec_time'], task['deadline'], task['period'], level)
+        for idx, (task, level) in enumerate(zip(task_list, priorities))]
+
+
+def task_list_error(task_list):
+    """Check the required fields of the task descriptors for RMS and EDF algorithms.
+
+    Unlike :func:`check_rms_edf`, it prints nothing.
+
+    :param task_list: List of task descriptors.
+    :type  task_list: List of dictionaries.
+    :return: The description of the first error found, or None if the task list is valid.
+    :rtype: str
+    """
+    # must have at least 2 tasks
+    if len(task_list) <= 1:
+        return "the task list must have more than 1 task. Found %d" % len(task_list)
+
+    # check if all tasks have the mandatory fields
+    for task in task_list:
+        for field in ('name', 'exec_time', 'period', 'deadline'):
+            if field not in task:
+                return "field '%s' not found in task" % field
+
+    for task in task_list:
+        error = task_error(task)
+        if error is not None:
+            return error
+    return None
+
+
+# names of the tasks added to the schedules by the simulators
+RESERVED_TASK_NAMES = ('idle', 'overhead')
+
+
+def task_error(task):
+    """Check the fields of a single task descriptor, as in :func:`task_list_error`.
+
+    :param task: task descriptor.
+    :type  task: Dictionary.
+    :return: The description of the first error found, or None if the task is valid.
+    :rtype: str
+    """
+    for field in ('name', 'exec_time', 'period', 'deadline'):
+        if field not in task:
+            return "field '%s' not found in task" % field
+
+    # each task must have a name (str), exec_time (N), deadline (N), period (N)
+    if type(task['name']) is not str:
+        return "string expected in the 'name' field. Got %s" % type(task['name'])
+    if task['name'] in RESERVED_TASK_NAMES:
+        return "the task name '%s' is reserved for the schedule" % task['name']
+    for field in ('exec_time', 'period', 'deadline'):
+        if type(task[field]) is not int:
+            return "int expected in the '%s' field. Got %s" % (field, type(task[field]))
+        if task[field] <= 0:
+            return "'%s' field must be a positive integer. Got %d" % (field, task[field])
+    # the optional fixed priority level. lower levels run first
+    if 'priority' in task:
+        if type(task['priority']) is not int:
+            return "int expected in the 'priority' field. Got %s" % type(task['priority'])
+        if task['priority'] < 0:
+            return "'priority' field must be a non-negative integer. Got %d" % task['priority']
+    return None
+
+
+# fields of the optional 'overheads' section of the input YAML file, in OS ticks
+OVERHEAD_FIELDS = ('context_switch', 'preemption_delay', 'tick_cost', 'tick_period')
+
+
+def overhead_error(overheads):
+    """Check the 'overheads' section of the input YAML file.
+
+    All the fields are optional non-negative integers, in OS ticks:
+
+     * context_switch: cost of each job dispatch;
+     * preemption_delay: cache-related delay paid by a preempted job when it resumes, in addition to the context switch;
+     * tick_cost: cost of the scheduler tick handler, which runs every tick_period OS ticks (default: 1).
+
+    :param overheads: the overheads.
+    :type  overheads: Dictionary.
+    :return: The description of the first error found, or None if the overheads are valid.
+    :rtype: str
+    """
+    if not isinstance(overheads, dict):
+        return "dictionary expected in the 'overheads' field. Got %s" % type(overheads)
+    for field, value in overheads.items():
+        if field not in OVERHEAD_FIELDS:
+            return "unknown overhead '%s'. Expected one of %s" % (field, ', '.join(OVERHEAD_FIELDS))
+        if type(value) is not int:
+            return "int expected in the '%s' overhead. Got %s" % (field, type(value))
+        if value < 0:
+            return "'%s' overhead must be a non-negative integer. Got %d" % (field, value)
+    if overheads.get('tick_period', 1) <= 0:
+        return "'tick_period' overhead must be a positive integer. Got %d" % overheads['tick_period']
+    if overheads.get('tick_cost', 0) >= overheads.get('tick_period', 1) and overheads.get('tick_cost', 0) > 0:
+        return "the tick handler takes the whole CPU: tick_cost %d >= tick_period %d" % (overheads['tick_cost'], overheads.get('tick_period', 1))
+    return None
+
+
+def overhead_params(overheads):
+    """The overheads with the default values of the missing fields.
+
+    :param overheads: the overheads, as in :func:`overhead_error`, or None.
+    :type  overheads: Dictionary.
+    :return: Dictionary with all the fields of OVERHEAD_FIELDS, or None if there is no overhead.
+    :rtype: Dictionary.
+    """
+    params = dict(context_switch=0, preemption_delay=0, tick_cost=0, tick_period=1)
+    params.update(overheads or {})
+    if params['context_switch'] == 0 and params['preemption_delay'] == 0 and params['tick_cost'] == 0:
+        return None
+    return params
+
+
 def check_rms_edf(task_list):
     """Parse the YAML for the required field for RMS and EDF algorithms.
 
@@ -42,53 +301,100 @@ def check_rms_edf(task_list):
 
     # must have at least 2 tasks
     if len(task_list) <= 1:
-        print ("ERROR: the task list must have more than 1 task. Found", len(task_list))
+        print ("ERROR:", task_list_error(task_list))
         return False
 
-    # check if all tasks have the mandatory fields
     print ('checking the task list ... ', end='')
-    for task in task_list:
-        if 'name' not in task:
-            print ("\nERROR: field 'name' not found in task")
-            return False
-        if 'exec_time' not in task:
-            print ("\nERROR: field 'exec_time' not found in task")
-            return False
-        if 'period' not in task:
-            print ("\nERROR: field 'period' not found in task")
-            return False
-        if 'deadline' not in task:
-            print ("\nERROR: field 'deadline' not found in task")
-            return False
- 
-    # each task must have a name (str), exec_time (N), deadline (N), period (N)
-    for task in task_list:
-        if type(task['name']) is not str:
-            print ("\nERROR: string expected in the 'name' field. Got",type(task['name']))
-            return False
-        if type(task['exec_time']) is not int:
-            print ("\nERROR: int expected in the 'exec_time' field. Got",type(task['exec_time']))
-            return False
-        if task['exec_time'] <= 0:
-            print ("\nERROR: 'exec_time' field must be a positive integer. Got",task['exec_time'])
-            return False
-        if type(task['period']) is not int:
-            print ("\nERROR: int expected in the 'period' field. Got",type(task['period']))
-            return False
-        if task['period'] <= 0:
-            print ("\nERROR: 'period' field must be a positive integer. Got",task['period'])
-            return False
-        if type(task['deadline']) is not int:
-            print ("\nERROR: int expected in the 'deadline' field. Got",type(task['deadline']))
-            return False
-        if task['deadline'] <= 0:
-            print ("\nERROR: 'deadline' field must be a positive integer. Got",task['deadline'])
-            return False
+    error = task_list_error(task_list)
+    if error is not None:
+        print ("\nERROR:", error)
+        return False
 
     print ('passed !')  
     return True  
 
 
+def hyperperiod(task_list):
+    """Hyperperiod of a task set, i.e. the LCM (Lowest Common Multiple) of the task periods.
+
+    It is computed with Python integers, so it never overflows.
+
+    :param task_list: List of task descriptors.
+    :type  task_list: List of dictionaries.
+    :return: The hyperperiod.
+    :rtype: int
+    """
+    return reduce(lambda a, b: a*b // gcd(a, b), (task['period'] for task in task_list), 1)
+
+
+def busy_period(task_list, limit=0):
+    """Length of the first busy period of the simulated task set.
+
+    It is the number of OS ticks the CPU stays busy, from tick 0 until all the released 
+    jobs have finished, when all the tasks release their jobs at ticks 0, period, 2*period, 
+    and so on, as in the simulators. The worst-case response times of synchronous task sets 
+    happen in this interval, so it is enough to simulate it to find deadline misses.
+
+    :param task_list: List of task descriptors.
+    :type  task_list: List of dictionaries.
+    :param limit: stop the computation when the busy period exceeds this value. Zero means no limit.
+    :type  limit: int
+    :return: The busy period length, or limit if it is longer than limit.
+    :rtype: int
+    """
+    busy = sum(task['exec_time'] for task in task_list)
+    while limit == 0 or busy < limit:
+        new_busy = sum(-(-busy // task['period']) * task['exec_time'] for task in task_list)
+        if new_busy == busy:
+            return busy
+        busy = new_busy
+    return limit
+
+
+def sim_horizon(task_list, sim_time=0, horizon='hyperperiod', max_sim_time=0):
+    """Number of OS ticks to be simulated.
+
+    The hyperperiod is always reported. 
+
+    :param task_list: List of task descriptors.
+    :type  task_list: List of dictionaries.
+    :param sim_time: Time for simulation defined by the user. If zero, it is defined by the horizon argument.
+    :type  sim_time: int
+    :param horizon: 'hyperperiod' simulates the LCM of the periods, while 'busy' simulates only the first busy period.
+    :type  horizon: str
+    :param max_sim_time: Maximum simulation time. Zero means no limit.
+    :type  max_sim_time: int
+    :return: The simulation time, or None if the horizon is not supported.
+    :rtype: int
+    """
+    hyper = hyperperiod(task_list)
+    print ("The hyperperiod is:", hyper)
+    if sim_time == 0:
+        if horizon == 'hyperperiod':
+            sim_time = hyper
+        elif horizon == 'busy':
+            # the CPU utilization may be 100%, then the hyperperiod is the limit
+            sim_time = busy_period(task_list, limit=hyper)
+        else:
+            print ("ERROR: unsupported simulation horizon", horizon)
+            return None
+    if max_sim_time > 0 and sim_time > max_sim_time:
+        print ("WARNING: the simulation time", sim_time, "is limited to", max_sim_time)
+        sim_time = max_sim_time
+    return int(sim_time)
+
+
+def released_jobs(task_list, sim_time):
+    """Number of jobs released by the simulators within the simulation time.
+
+    :param task_list: List of task descriptors.
+    :type  task_list: List of dictionaries.
+    :param sim_time: Number of OS ticks simulated.
+    :type  sim_time: int
+    :rtype: int
+    """
+    return sum(-(-sim_time // task['period']) for task in task_list)
+
 
 def check_sched(sched):
     """Parse the YAML for the resulting schedule of a scheduling algorithm.
@@ -144,6 +450,114 @@ def check_sched(sched):
 
 
 
+def verify_sched(sched, task_list=None, horizon=None):
+    """Verify the timing correctness of a schedule.
+
+    All the jobs are loaded into NumPy arrays and checked at once for:
+
+     * overlaps: two tasks using the CPU at the same time;
+     * gaps: OS ticks in which neither a task nor the idle task is running;
+     * deadline misses: jobs finishing after their deadline, or not finished when their deadline is over;
+     * execution errors: tasks running more than the execution time of their released jobs.
+
+    The timing checks require the task list. Jobs are released as in the simulators, 
+    i.e. the job i at tick i*period, and it has to finish up to i*period+deadline, the 
+    absolute deadline used by EDF. 
+    The jobs of a task run in their release order, so the intervals of a task are 
+    assigned to its jobs by accumulating the execution time.
+
+    The jobs are [start, end) intervals. Zero-length intervals are ignored and the 
+    overlapping or adjacent intervals of the same task are merged.
+
+    :param sched: The schedule, as in :func:`check_sched`.
+    :type  sched: Dictionary.
+    :param task_list: List of task descriptors. If none is defined, the timing checks are skipped.
+    :type  task_list: List of dictionaries.
+    :param horizon: Number of OS ticks covered by the schedule. If none is defined, the end of the last job is used.
+    :type  horizon: int
+
+    :return: Dictionary with 'valid' (bool) and the lists 'overlaps' ([task, task, start, end]), 'gaps' ([start, end]), 
+        'deadline_misses' ([task, job index, release, deadline, finish time or None]) and 
+        'exec_errors' ([task, job index, release, start time]).
+    :rtype: Dictionary.
+    """
+    names = []
+    starts = []
+    ends = []
+    task_starts = {}
+    task_ends = {}
+    for task in sched['sched']:
+        jobs = np.asarray(task['jobs'], dtype=np.int64).reshape(-1, 2)
+        jobs = jobs[jobs[:, 1] > jobs[:, 0]]
+        jobs = jobs[np.argsort(jobs[:, 0], kind='stable')]
+        job_starts, job_ends = merge_intervals(jobs[:, 0], jobs[:, 1], 0)
+        task_starts[task['name']] = job_starts
+        task_ends[task['name']] = job_ends
+        names.append(task['name'])
+        starts.append(job_starts)
+        ends.append(job_ends)
+
+    result = dict(valid=True, overlaps=[], gaps=[], deadline_misses=[], exec_errors=[])
+    tid = np.concatenate([np.full(len(job_starts), idx) for idx, job_starts in enumerate(starts)] + [np.zeros(0, dtype=int)])
+    starts = np.concatenate(starts + [np.zeros(0, dtype=np.int64)])
+    ends = np.concatenate(ends + [np.zeros(0, dtype=np.int64)])
+    if horizon is None:
+        horizon = int(ends.max()) if len(ends) > 0 else 0
+
+    order = np.lexsort((ends, starts))
+    starts, ends, tid = starts[order], ends[order], tid[order]
+    if len(starts) > 0:
+        # the latest end so far and the interval it belongs to
+        max_end = np.maximum.accumulate(ends)
+        owner = np.maximum.accumulate(np.where(ends == max_end, np.arange(len(ends)), 0))
+        prev_end = np.concatenate(([0], max_end[:-1]))
+        for idx in np.nonzero(starts[1:] < max_end[:-1])[0] + 1:
+            result['overlaps'].append([names[tid[owner[idx-1]]], names[tid[idx]],
+                int(starts[idx]), int(min(ends[idx], max_end[idx-1]))])
+        for idx in np.nonzero(starts > prev_end)[0]:
+            result['gaps'].append([int(prev_end[idx]), int(starts[idx])])
+        if max_end[-1] < horizon:
+            result['gaps'].append([int(max_end[-1]), int(horizon)])
+    elif horizon > 0:
+        result['gaps'].append([0, int(horizon)])
+
+    for task in task_list or []:
+        job_starts = task_starts.get(task['name'], np.zeros(0, dtype=np.int64))
+        job_ends = task_ends.get(task['name'], np.zeros(0, dtype=np.int64))
+        # cumulative execution time at the end of each interval
+        cum = np.cumsum(job_ends - job_starts)
+        # releases up to the horizon plus the next one
+        num_jobs = 1 + horizon // task['period']
+        job = np.arange(num_jobs + 1)
+        release = job*task['period']
+        deadline = job*task['period'] + task['deadline']
+
+        if len(cum) == 0:
+            cum = np.zeros(1, dtype=np.int64)
+            job_ends = np.zeros(1, dtype=np.int64)
+
+        # the job starts when the previous jobs executed their whole execution time
+        executed = job*task['exec_time']
+        started = cum[-1] > executed
+        pos = np.minimum(np.searchsorted(cum, executed, side='right'), len(cum)-1)
+        start = job_ends[pos] - (cum[pos] - executed)
+        for idx in np.nonzero(started & (start < release))[0]:
+            result['exec_errors'].append([task['name'], int(idx), int(release[idx]), int(start[idx])])
+
+        # the job finishes when the task executed the execution time of all jobs up to it
+        executed = executed[1:]
+        finished = cum[-1] >= executed
+        pos = np.minimum(np.searchsorted(cum, executed, side='left'), len(cum)-1)
+        finish = job_ends[pos] - (cum[pos] - executed)
+        missed = np.where(finished, finish > deadline[:-1], deadline[:-1] <= horizon)
+        for idx in np.nonzero(missed)[0]:
+            result['deadline_misses'].append([task['name'], int(idx), int(release[idx]), int(deadline[idx]),
+                int(finish[idx]) if finished[idx] else None])
+
+    result['valid'] = not (result['overlaps'] or result['gaps'] or result['deadline_misses'] or result['exec_errors'])
+    return result
+
+
 def convert_to_datetime(x):
     """Converts a natural number to date. 
     
@@ -163,7 +577,22 @@ def convert_to_datetime(x):
 
 
 
-def plot_gantt(sched, verbose = False):
+def task_label(task):
+    """Label of a task in the gantt chart.
+
+    Multicore schedules have a 'core' field in each task, so the tasks are grouped by core.
+
+    :param task: task of the schedule.
+    :type  task: Dictionary.
+    :return: The task label, e.g. "task1" or "core 0: task1".
+    :rtype: str
+    """
+    if 'core' in task:
+        return "core %d: %s" % (task['core'], task['name'])
+    return task['name']
+
+
+def plot_gantt(sched, verbose = False, mode = 'auto'):
     """Use the plotly lib to plot the gantt chart.
 
 
@@ -175,6 +604,8 @@ def plot_gantt(sched, verbose = False):
     :type   sched: List of dictionaries.
     :param  verbose: enable/disable verbose mode
     :type   verbose: bool
+    :param  mode: 'timeline' plots each job as a bar with dates in the x axis, 'large' uses :func:`plot_gantt_large`, and 'auto' selects 'large' for schedules with more than LARGE_SCHED_JOBS jobs or ticks.
+    :type   mode: str
     :return: None
 
     .. todo:: add a slider
@@ -207,6 +638,8 @@ def plot_gantt(sched, verbose = False):
 
     # check plotly version
     import plotly as pl
+    import plotly.express as px
+    import pandas as pd
     if versiontuple(pl.__version__) < versiontuple("4.9.0"):
         print ("ERROR: the scheduling plotting function requires plotly 4.9.0 or newer. Found", pl.__version__)
         return False
@@ -216,6 +649,14 @@ def plot_gantt(sched, verbose = False):
         print("Aborting execution of scheduling plotting due to invalid input file.")
         sys.exit(1)
 
+    if mode == 'auto':
+        num_jobs = sum(len(task['jobs']) for task in sched['sched'])
+        max_tick = max((job[1] for task in sched['sched'] for job in task['jobs'][-1:]), default=0)
+        if num_jobs > LARGE_SCHED_JOBS or max_tick > LARGE_SCHED_JOBS:
+            mode = 'large'
+    if mode == 'large':
+        return plot_gantt_large(sched, verbose)
+
     # get the max value of x of the schedule to be used in the plot
     max_x = 0
     # create the data format required by pandas DataFrame
@@ -228,14 +669,14 @@ def plot_gantt(sched, verbose = False):
             task_color = 'blue' # the default color
         if len(task['jobs']) == 0:
             # place the task in the char even if it had no job executed
-            list_tasks.append(dict(Task=task['name'], Start=convert_to_datetime(0), 
+            list_tasks.append(dict(Task=task_label(task), Start=convert_to_datetime(0), 
                     Finish=convert_to_datetime(0), Color = task_color, 
                     # used only by the hover feature
                     Start_tick = 0, Finish_tick = 0, Duration = 0
                     ))
         else:
             for job in task['jobs']:
-                list_tasks.append(dict(Task=task['name'], Start=convert_to_datetime(job[0]), 
+                list_tasks.append(dict(Task=task_label(task), Start=convert_to_datetime(job[0]), 
                     Finish=convert_to_datetime(job[1]), Color = task_color, 
                     # used only by the hover feature
                     Start_tick = job[0], Finish_tick = job[1], Duration = job[1]-job[0]
@@ -273,10 +714,122 @@ def plot_gantt(sched, verbose = False):
     # it will show in the browser
     fig.show()
 
+def merge_intervals(starts, ends, resolution):
+    """Merge the intervals closer than a given resolution.
+
+    Used to reduce the level of detail of a schedule before plotting it. 
+    Intervals separated by gaps shorter than the resolution become a single interval, 
+    so there are at most about (last end - first start)/resolution intervals left.
+    With resolution 0, only the overlapping intervals are merged.
+
+    :param starts: start time of the intervals, in increasing order.
+    :type  starts: numpy array of int.
+    :param ends: end time of the intervals.
+    :type  ends: numpy array of int.
+    :param resolution: shortest gap kept between intervals.
+    :type  resolution: int
+
+    :return: The start and end times of the merged intervals.
+    :rtype: tuple of numpy arrays.
+    """
+    if len(starts) == 0:
+        return starts, ends
+    # the end of an interval may come before the end of a previous one
+    ends_so_far = np.maximum.accumulate(ends)
+    first = np.concatenate(([0], np.nonzero(starts[1:] - ends_so_far[:-1] >= resolution)[0] + 1))
+    return starts[first], np.maximum.reduceat(ends, first)
+
+
+def plot_gantt_large(sched, verbose = False, max_intervals = 5000, max_ticks = 20):
+    """Use the plotly lib to plot the gantt chart of large schedules.
+
+    Instead of one bar per job with dates in the x axis, each task becomes a 
+    single WebGL line trace with a numeric x axis. When the schedule has more
+    intervals than max_intervals, the intervals of a task closer than the
+    resolution of the plot are merged, so the plotting time and the size of the
+    plot stay bounded as the schedule grows. 
+
+    :param  sched: The shedule YAML file, as in :func:`plot_gantt`.
+    :type   sched: List of dictionaries.
+    :param  verbose: enable/disable verbose mode
+    :type   verbose: bool
+    :param  max_intervals: maximum number of intervals plotted per task.
+    :type   max_intervals: int
+    :param  max_ticks: maximum number of labels in the x axis.
+    :type   max_ticks: int
+    :return: None
+    """
+    import plotly.graph_objects as go
+
+    tasks = []
+    max_x = 0
+    for task in sched['sched']:
+        jobs = np.asarray(task['jobs'], dtype=np.int64).reshape(-1, 2)
+        tasks.append(jobs)
+        if len(jobs) > 0:
+            max_x = max(max_x, int(jobs[:, 1].max()))
+    resolution = max(1, -(-max_x // max_intervals))
+    if verbose:
+        print ("Plotting with resolution of", resolution, "ticks")
+
+    fig = go.Figure()
+    for pos, (task, jobs) in enumerate(zip(sched['sched'], tasks)):
+        starts, ends = merge_intervals(jobs[:, 0], jobs[:, 1], resolution)
+        # one line segment per interval, separated by NaN
+        x = np.full(3*len(starts), np.nan)
+        x[0::3] = starts
+        x[1::3] = ends
+        fig.add_trace(go.Scattergl(x = x, y = np.full(len(x), pos), mode = 'lines', 
+            name = task['name'], connectgaps = False,
+            line = dict(color = task.get('color', 'blue'), width = 20),
+            hovertemplate = "Time: %{x}<extra>" + task_label(task) + "</extra>"))
+
+    fig.update_layout(title = sched.get('title', ''), showlegend = False, 
+        height = 100 + 40*len(tasks))
+    fig.update_yaxes(tickvals = list(range(len(tasks))), 
+        ticktext = [task_label(task) for task in sched['sched']], 
+        autorange = "reversed")  # otherwise tasks are listed from the bottom up
+    fig.update_xaxes(nticks = max_ticks)
+
+    # it will show in the browser
+    fig.show()
+
+
+def sched_list_2_segments(sched_list):
+    """Run-length encoding of a schedule list.
+
+    Convert a list with the task running in each OS tick into a list of execution segments,
+    in a single pass over the list.
+
+    :param sched_list: List the execution order of the jobs, e.g. ["P1","P1","P1","idle","P3","P2","P3", ...].
+    :type sched_list: List of str.
+
+    :return: The execution segments, e.g. [["P1",0,3],["idle",3,4],["P3",4,5],["P2",5,6],["P3",6,7], ...].
+    :rtype: List of lists.
+
+    :Example: 
+
+        >>> sched_list_2_segments(["P1","P1","idle","P1"])
+        >>> [['P1', 0, 2], ['idle', 2, 3], ['P1', 3, 4]]
+    """
+    segments = []
+    for idx, name in enumerate(sched_list):
+        if segments and segments[-1][0] == name:
+            continue
+        if segments:
+            segments[-1][2] = idx
+        segments.append([name, idx, idx])
+    if segments:
+        segments[-1][2] = len(sched_list)
+    return segments
+
+
 def sched_list_2_sched_dict(tasks,sched_list,verbose=False):
     """Schedule format conversion.
     
     Convert a scheduling in format of a list into a schedule in the format of list of dictionary.
+    The list is scanned only once, so the cost is linear in the number of ticks and 
+    the intermediate memory scales with the number of context switches.
 
     .. literalinclude:: ../../wikipedia.yaml
         :language: yaml
@@ -296,40 +849,572 @@ def sched_list_2_sched_dict(tasks,sched_list,verbose=False):
     :return: List of schedule descriptors, as in the example above.
     :rtype: List of dictionaries.
     """       
+    return sched_segments_2_sched_dict(tasks, sched_list_2_segments(sched_list), verbose)
+
+
+def sched_segments_2_sched_dict(tasks,segments,verbose=False):
+    """Schedule format conversion from execution segments.
+
+    Convert a scheduling in format of a list of execution segments into a schedule
+    in the format of list of dictionary. A segment is a ``[name, start, end]`` list
+    meaning that the task ``name`` used the CPU from the tick ``start`` up to the
+    tick ``end`` (exclusive). Consecutive segments must not have the same name.
+    Instead of the name, the segments may have the index of the task in the task
+    list, as returned by the simulators with task_ids=True.
+    The result is the same one :func:`sched_list_2_sched_dict` would return for the 
+    equivalent list of ticks, with one job per segment.
+
+    :param tasks: List of tasks descriptors.
+    :param segments: List of execution segments, e.g. [["P1",0,3],["idle",3,4],["P3",4,5], ...].
+    :param verbose: Enable/disable the verbosity level.
+    :type tasks: List of dictionaries.
+    :type segments: List of lists.
+    :type verbose: bool.
+
+    :return: List of schedule descriptors.
+    :rtype: List of dictionaries.
+    """
+    # group the segments by task, keeping their order
+    task_index = {}
+    for idx, task in enumerate(tasks):
+        task_index.setdefault(task['name'], idx)
+    jobs_per_task = [[] for _ in tasks]
+    # segments of tasks not in the task list
+    unknown = []
+    for name, start, end in segments:
+        task_idx = name if type(name) is int else task_index.get(name)
+        jobs = jobs_per_task[task_idx] if task_idx is not None else unknown
+        jobs.append([start,end])
+
     # creating the data structrute for scheduling
     sched = {}
     sched['title'] = 'Some title'
     sched['sched'] = []
-    for task in tasks:
+    for task, jobs in zip(tasks, jobs_per_task):
         sched_task = {}
         sched_task['name'] = task['name']
-        sched_task['jobs'] = []
+        sched_task['jobs'] = jobs
         if task['name'] == 'idle':
             sched_task['color'] = 'green'
+        elif task['name'] == 'overhead':
+            sched_task['color'] = 'red'
         else:
             sched_task['color'] = 'blue'
-        if verbose:
-            print ("#############", task['name'], "#############")
-            print (sched_task)
-        #search for this task in the schedule
-        idx = 0
-        while idx < len(sched_list):
-            if task['name'] == sched_list[idx]:
-                start_time = idx
-                if idx != len(sched_list):
-                    for idx2, ready_task2 in enumerate(sched_list[idx:]):
-                        end_time = idx+idx2
-                        if task['name'] != ready_task2:
-                            #skip the start time to the next period
-                            idx = end_time
-                            break
-                else:
-                    end_time = idx
-                #print (task['name'], "[",start_time,end_time,"]")
-                sched_task['jobs'].append([start_time,end_time])
-            idx +=1
         sched['sched'].append(sched_task)
         if verbose:
+            print ("#############", task['name'], "#############")
             print (sched_task)
             print ("##########################")
     return sched
+
+
+class SchedMetrics:
+    """Per-task timing metrics collected while simulating.
+
+    The simulators report each execution interval, idle interval and job completion,
+    and the metrics are accumulated on the fly, using constant memory per task:
+    number of completed jobs, best, average and worst-case response time, 
+    release jitter (variation of the time between the job release and its first 
+    execution), finishing jitter (variation of the response time), number of 
+    preemptions, and CPU idle time.
+
+    Jobs are lists [remaining exec time, task index, release time, first execution time], 
+    where the first execution time is None until the job runs.
+
+    :param task_list: List of task descriptors.
+    :type  task_list: List of dictionaries.
+    """
+
+    def __init__(self, task_list):
+        num_tasks = len(task_list)
+        self.names = [task['name'] for task in task_list]
+        self.jobs = [0]*num_tasks
+        self.resp_sum = [0]*num_tasks
+        self.resp_min = [None]*num_tasks
+        self.resp_max = [0]*num_tasks
+        self.start_min = [None]*num_tasks
+        self.start_max = [0]*num_tasks
+        self.preemptions = [0]*num_tasks
+        self.busy_time = 0
+        self.idle_time = 0
+        self.overhead_time = 0
+        self.last_job = None
+
+    def run(self, job, start, end):
+        """A job used the CPU in the interval [start, end).
+
+        :param job: the job descriptor.
+        :param start: start time of the interval.
+        :type  start: int
+        :param end: end time of the interval.
+        :type  end: int
+        """
+        last = self.last_job
+        if last is not None and last is not job and last[0] > 0:
+            # the previous job did not finish, so it was preempted
+            self.preemptions[last[1]] += 1
+        if job[3] is None:
+            job[3] = start
+            idx = job[1]
+            latency = start - job[2]
+            if self.start_min[idx] is None or latency < self.start_min[idx]:
+                self.start_min[idx] = latency
+            self.start_max[idx] = max(self.start_max[idx], latency)
+        self.busy_time += end - start
+        self.last_job = job
+
+    def idle(self, start, end):
+        """The CPU was idle in the interval [start, end).
+
+        :param start: start time of the interval.
+        :type  start: int
+        :param end: end time of the interval.
+        :type  end: int
+        """
+        self.idle_time += end - start
+        self.last_job = None
+
+    def overhead(self, start, end):
+        """The CPU ran the scheduler or switched context in the interval [start, end).
+
+        :param start: start time of the interval.
+        :type  start: int
+        :param end: end time of the interval.
+        :type  end: int
+        """
+        self.overhead_time += end - start
+
+    def complete(self, job, finish):
+        """A job finished its execution.
+
+        :param job: the job descriptor.
+        :param finish: the completion time.
+        :type  finish: int
+        """
+        idx = job[1]
+        resp = finish - job[2]
+        self.jobs[idx] += 1
+        self.resp_sum[idx] += resp
+        if self.resp_min[idx] is None or resp < self.resp_min[idx]:
+            self.resp_min[idx] = resp
+        self.resp_max[idx] = max(self.resp_max[idx], resp)
+
+    def summary(self):
+        """Summary table of the metrics.
+
+        :return: Dictionary with 'idle_ratio', 'overhead_ratio' and 'tasks', a list with one dictionary per task with 
+            'name', 'jobs', 'bcrt', 'avg_rt', 'wcrt', 'release_jitter', 'finish_jitter' and 'preemptions'.
+        :rtype: Dictionary.
+        """
+        tasks = []
+        for idx, name in enumerate(self.names):
+            jobs = self.jobs[idx]
+            tasks.append(dict(
+                name = name,
+                jobs = jobs,
+                bcrt = self.resp_min[idx] if jobs > 0 else 0,
+                avg_rt = self.resp_sum[idx] / jobs if jobs > 0 else 0.0,
+                wcrt = self.resp_max[idx],
+                release_jitter = self.start_max[idx] - self.start_min[idx] if self.start_min[idx] is not None else 0,
+                finish_jitter = self.resp_max[idx] - self.resp_min[idx] if jobs > 0 else 0,
+                preemptions = self.preemptions[idx],
+            ))
+        total = self.busy_time + self.idle_time + self.overhead_time
+        return dict(tasks = tasks, idle_ratio = self.idle_time / total if total > 0 else 0.0,
+            overhead_ratio = self.overhead_time / total if total > 0 else 0.0)
+
+
+class SchedCheckpoints:
+    """Periodic snapshots of the state of :func:`event_sched`.
+
+    Each checkpoint records the next release of each task and the remaining
+    execution time of each ready job, so the schedule can be re-simulated from 
+    there by :func:`event_sched_window`. A checkpoint is recorded at the first
+    simulator event at or after each multiple of the interval. 
+
+    :param interval: number of OS ticks between checkpoints.
+    :type  interval: int
+    :param states: checkpoints already recorded, as returned by :meth:`to_dict`.
+    :type  states: List of dictionaries.
+    :param sim_time: simulation time of the recorded schedule.
+    :type  sim_time: int
+    """
+
+    def __init__(self, interval, states=None, sim_time=None):
+        if interval < 1:
+            raise ValueError("the checkpoint interval must be positive")
+        self.interval = interval
+        self.states = [] if states is None else states
+        self.sim_time = sim_time
+
+    def __len__(self):
+        return len(self.states)
+
+    def record(self, time, release_heap, ready_list):
+        """Record the simulator state at a time.
+
+        :param time: current simulation time.
+        :type  time: int
+        :param release_heap: next release of each task, as (tick, release order, task index) tuples.
+        :param ready_list: the ready jobs.
+        :type  ready_list: ReadyQueue
+        :return: the time of the next checkpoint.
+        :rtype: int
+        """
+        self.states.append(dict(
+            time = time,
+            releases = sorted(list(release) for release in release_heap),
+            ready = [[level, [list(job) for job in jobs]] for level, jobs in ready_list.items()],
+        ))
+        return (time // self.interval + 1) * self.interval
+
+    def nearest(self, time):
+        """Return the last checkpoint at or before a time.
+
+        :param time: simulation time.
+        :type  time: int
+        :rtype: Dictionary.
+        """
+        times = [state['time'] for state in self.states]
+        pos = max(bisect.bisect_right(times, time) - 1, 0)
+        return self.states[pos]
+
+    def restore(self, time):
+        """Rebuild the simulator state of the last checkpoint at or before a time.
+
+        :param time: simulation time.
+        :type  time: int
+        :return: the checkpoint time, the release heap and the ready list.
+        :rtype: tuple
+        """
+        state = self.nearest(time)
+        release_heap = [tuple(release) for release in state['releases']]
+        heapq.heapify(release_heap)
+        ready_list = ReadyQueue()
+        for level, jobs in state['ready']:
+            for job in jobs:
+                ready_list.push(level, list(job))
+        return state['time'], release_heap, ready_list
+
+    def to_dict(self):
+        """Return the checkpoints as a JSON serializable dictionary.
+
+        :rtype: Dictionary.
+        """
+        return dict(interval=self.interval, sim_time=self.sim_time, states=self.states)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build the checkpoints from a dictionary returned by :meth:`to_dict`.
+
+        :rtype: SchedCheckpoints
+        """
+        return cls(data['interval'], data['states'], data['sim_time'])
+
+
+def tick_sched(task_list, sim_time, priority, metrics=None, task_ids=False, keep_sched=True):
+    """Simulates a preemptive priority scheduler one OS tick at a time.
+
+    The jobs of each task are released at ticks 0, period, 2*period, and so on.
+    At each tick, the ready job with the lowest priority level gets the CPU. Jobs with the same priority level run in 
+    the order they were released.
+
+    :param  task_list: List of task descriptors.
+    :param sim_time: Number of OS ticks to be simulated.
+    :type  sim_time: int
+    :param priority: Function returning the priority level of a job given its compact task descriptor (:class:`Task`) and its release order (0, period, 2*period, ...).
+    :type  priority: function
+    :param metrics: If defined, it is updated with the timing metrics of the jobs.
+    :type  metrics: SchedMetrics
+    :param task_ids: If True, the schedule has the task index instead of the task name, and len(task_list) for the idle ticks.
+    :type  task_ids: bool
+    :param keep_sched: If False, the schedule is not stored. Useful when only the metrics are required.
+    :type  keep_sched: bool
+
+    :return: The task name running in each OS tick, e.g. ["P1","P1","idle","P3", ...].
+    :rtype: List of str.
+    """
+    tasks = compact_tasks(task_list)
+    idle = len(tasks)
+
+    # assuming all the tasks start at time zero, initialize the OS's ready_list
+    ready_list = ReadyQueue()
+    for idx, task in enumerate(tasks):
+        ready_list.push(priority(task, 0), [task.exec_time, idx, 0, None])
+
+    # the next OS tick each task releases a job. (tick, task index)
+    release_heap = [(task.period, idx) for idx, task in enumerate(tasks)]
+    heapq.heapify(release_heap)
+
+    schedule = []
+    for i in range(sim_time):
+        # check if there are tasks to be included in the ready_list
+        while release_heap[0][0] == i:
+            _, idx = release_heap[0]
+            task = tasks[idx]
+            ready_list.push(priority(task, i), [task.exec_time, idx, i, None])
+            heapq.heapreplace(release_heap, (i + task.period, idx))
+
+        if len(ready_list) ==0:
+            if keep_sched:
+                schedule.append(idle)
+            if metrics is not None:
+                metrics.idle(i, i+1)
+            # skip this OS tick
+            continue
+        # top task gain access to the cpu
+        job = ready_list.top()
+        if keep_sched:
+            schedule.append(job[1])
+        # decrement computation time of the top job
+        job[0] -= 1
+        if metrics is not None:
+            metrics.run(job, i, i+1)
+        # check if the job finished, then delete the top of the list
+        if job[0] == 0:
+            ready_list.pop()
+            if metrics is not None:
+                metrics.complete(job, i+1)
+
+    if task_ids:
+        return schedule
+    names = [task.name for task in tasks] + ['idle']
+    return [names[idx] for idx in schedule]
+
+
+def event_sched(task_list, sim_time, priority, metrics=None, keep_sched=True, checkpoints=None, task_ids=False, overheads=None):
+    """Simulates a preemptive priority scheduler jumping from one job release or job completion to the next one.
+
+    It generates the same schedule as :func:`tick_sched`, but its cost depends on 
+    the number of jobs instead of the number of simulated OS ticks. 
+
+    :param  task_list: List of task descriptors.
+    :param sim_time: Number of OS ticks to be simulated.
+    :type  sim_time: int
+    :param priority: Function returning the priority level of a job given its task descriptor and its release order (0, period, 2*period, ...).
+    :type  priority: function
+    :param metrics: If defined, it is updated with the timing metrics of the jobs.
+    :type  metrics: SchedMetrics
+    :param keep_sched: If False, the execution segments are not stored. Useful when only the metrics are required.
+    :type  keep_sched: bool
+    :param checkpoints: If defined, the simulator state is recorded in it periodically, so any time window can be re-simulated with :func:`event_sched_window`.
+    :type  checkpoints: SchedCheckpoints
+    :param task_ids: If True, the segments have the task index instead of the task name, and len(task_list) for the idle segments.
+    :type  task_ids: bool
+    :param overheads: If defined, the scheduling overheads are charged as 'overhead' segments (len(task_list)+1 with task_ids), see :func:`overhead_error`. Checkpoints are not supported with overheads.
+    :type  overheads: Dictionary.
+
+    :return: The execution segments, e.g. [["P1",0,3],["idle",3,4],["P3",4,5], ...].
+    :rtype: List of lists.
+    """
+    tasks = compact_tasks(task_list)
+    overheads = overhead_params(overheads)
+
+    # the next release of each task. (tick, release order, task index)
+    release_heap = [(0, 0, idx) for idx in range(len(task_list))]
+    heapq.heapify(release_heap)
+
+    if overheads is not None:
+        if checkpoints is not None:
+            raise ValueError("checkpoints are not supported with overheads")
+        segments = _overhead_loop(tasks, sim_time, priority, overheads, release_heap, metrics, keep_sched)
+        return segments if task_ids else segment_names(tasks, segments)
+
+    if checkpoints is not None:
+        checkpoints.sim_time = sim_time
+    segments = _event_loop(tasks, sim_time, priority, 0, sim_time, release_heap, ReadyQueue(), metrics, keep_sched, checkpoints)
+    return segments if task_ids else segment_names(tasks, segments)
+
+
+def event_sched_window(task_list, priority, checkpoints, start, end):
+    """Re-simulates a time window of a schedule from the nearest checkpoint.
+
+    The simulation resumes from the last checkpoint at or before the window start,
+    so its cost depends on the checkpoint interval instead of the window position.
+
+    :param  task_list: List of task descriptors, the same ones used to record the checkpoints.
+    :param priority: Function returning the priority level of a job, the same one used to record the checkpoints.
+    :type  priority: function
+    :param checkpoints: The checkpoints recorded by :func:`event_sched`.
+    :type  checkpoints: SchedCheckpoints
+    :param start: window start.
+    :type  start: int
+    :param end: window end (exclusive). It is limited to the simulation time of the checkpoints.
+    :type  end: int
+
+    :return: The execution segments clipped to the window, as returned by :func:`event_sched`.
+    :rtype: List of lists.
+    """
+    end = min(end, checkpoints.sim_time)
+    if start >= end:
+        return []
+    tasks = compact_tasks(task_list)
+    time, release_heap, ready_list = checkpoints.restore(start)
+    segments = _event_loop(tasks, checkpoints.sim_time, priority, time, end, release_heap, ready_list, None, True, None)
+    # drop the execution before the window start
+    first = 0
+    while first < len(segments) and segments[first][2] <= start:
+        first += 1
+    segments = segments[first:]
+    if segments:
+        segments[0][1] = max(segments[0][1], start)
+    return segment_names(tasks, segments)
+
+
+def segment_names(task_list, segments):
+    """Replace the task index of the execution segments by the task name.
+
+    :param task_list: List of task descriptors.
+    :param segments: execution segments with task indexes, where len(task_list) means idle and len(task_list)+1 overhead.
+    :type  segments: List of lists.
+    :return: The execution segments with task names.
+    :rtype: List of lists.
+    """
+    names = [task['name'] for task in task_list] + ['idle', 'overhead']
+    return [[names[idx], start, end] for idx, start, end in segments]
+
+
+def _event_loop(tasks, sim_time, priority, time, stop, release_heap, ready_list, metrics, keep_sched, checkpoints):
+    """Main loop of :func:`event_sched`, from the given simulator state up to the tick stop.
+
+    The tasks are compact task descriptors and the segments have task indexes.
+    """
+    idle = len(tasks)
+    segments = []
+    # the first checkpoint records the initial state
+    next_checkpoint = time if checkpoints is not None else stop
+    while time < stop:
+        if time >= next_checkpoint:
+            next_checkpoint = checkpoints.record(time, release_heap, ready_list)
+
+        # move the released jobs to the ready list
+        while release_heap and release_heap[0][0] <= time:
+            tick, order, idx = heapq.heappop(release_heap)
+            task = tasks[idx]
+            ready_list.push(priority(task, order), [task.exec_time, idx, tick, None])
+            # the job of the release order i is released at the tick i
+            next_order = order + task.period
+            if next_order < sim_time:
+                heapq.heappush(release_heap, (next_order, next_order, idx))
+
+        # the CPU keeps its current state up to the next release
+        if release_heap:
+            next_event = min(release_heap[0][0], stop)
+        else:
+            next_event = stop
+
+        if len(ready_list) == 0:
+            running = idle
+            end_time = next_event
+            if metrics is not None:
+                metrics.idle(time, end_time)
+        else:
+            # top job gain access to the cpu until it finishes or the next release
+            job = ready_list.top()
+            running = job[1]
+            end_time = min(time + job[0], next_event)
+            job[0] -= end_time - time
+            if metrics is not None:
+                metrics.run(job, time, end_time)
+            if job[0] == 0:
+                ready_list.pop()
+                if metrics is not None:
+                    metrics.complete(job, end_time)
+
+        if keep_sched:
+            # merge consecutive segments of the same task
+            if segments and segments[-1][0] == running:
+                segments[-1][2] = end_time
+            else:
+                segments.append([running, time, end_time])
+        time = end_time
+
+    return segments
+
+
+def _overhead_loop(tasks, sim_time, priority, overheads, release_heap, metrics, keep_sched):
+    """Main loop of :func:`event_sched` charging the scheduling overheads.
+
+    The tick handler runs every tick_period OS ticks, starting at 0, and preempts
+    everything else. Each job dispatch costs a context switch, plus the preemption
+    delay when the job was preempted before. The dispatch overheads are not
+    preempted by job releases, so the new jobs are considered when they end.
+    The overhead segments have the index len(tasks)+1.
+    """
+    idle = len(tasks)
+    overhead = idle + 1
+    context_switch = overheads['context_switch']
+    preemption_delay = overheads['preemption_delay']
+    tick_cost = overheads['tick_cost']
+    tick_period = overheads['tick_period']
+    next_tick = 0 if tick_cost > 0 else sim_time
+    ready_list = ReadyQueue()
+    # the job owning the CPU context, and its pending dispatch overhead
+    current = None
+    pending = 0
+    segments = []
+    time = 0
+    while time < sim_time:
+        # move the released jobs to the ready list. The last field flags the preempted jobs
+        while release_heap and release_heap[0][0] <= time:
+            tick, order, idx = heapq.heappop(release_heap)
+            task = tasks[idx]
+            ready_list.push(priority(task, order), [task.exec_time, idx, tick, None, False])
+            # the job of the release order i is released at the tick i
+            next_order = order + task.period
+            if next_order < sim_time:
+                heapq.heappush(release_heap, (next_order, next_order, idx))
+
+        if time >= next_tick:
+            # the tick handler does not change the CPU context
+            running = overhead
+            end_time = min(time + tick_cost, sim_time)
+            next_tick += tick_period
+            if metrics is not None:
+                metrics.overhead(time, end_time)
+        else:
+            # the CPU keeps its current state up to the next release or tick
+            next_event = min(release_heap[0][0], sim_time) if release_heap else sim_time
+            next_event = min(next_event, next_tick)
+            if pending == 0 and len(ready_list) > 0 and ready_list.top() is not current:
+                # dispatch a new job. The previous one was preempted if it did not finish
+                if current is not None and current[0] > 0:
+                    current[4] = True
+                current = ready_list.top()
+                pending = context_switch + (preemption_delay if current[4] else 0)
+                current[4] = False
+
+            if pending > 0:
+                running = overhead
+                end_time = min(time + pending, next_tick, sim_time)
+                pending -= end_time - time
+                if metrics is not None:
+                    metrics.overhead(time, end_time)
+            elif len(ready_list) == 0:
+                running = idle
+                end_time = next_event
+                current = None
+                if metrics is not None:
+                    metrics.idle(time, end_time)
+            else:
+                # the dispatched job runs until it finishes, the next release or the next tick
+                job = current
+                running = job[1]
+                end_time = min(time + job[0], next_event)
+                job[0] -= end_time - time
+                if metrics is not None:
+                    metrics.run(job, time, end_time)
+                if job[0] == 0:
+                    ready_list.pop()
+                    if metrics is not None:
+                        metrics.complete(job, end_time)
+
+        if keep_sched:
+            # merge consecutive segments of the same task
+            if segments and segments[-1][0] == running:
+                segments[-1][2] = end_time
+            else:
+                segments.append([running, time, end_time])
+        time = end_time
+
+    return segments
@@ -1,43 +1,261 @@
-from common import check_rms_edf, sched_list_2_sched_dict
+from common import check_rms_edf, overhead_params, tick_sched, event_sched
+from profiler import profile_phase
 import numpy as np
+from fractions import Fraction
+import math
 import sys
 
-def edf_is_schedulable(tasks):
+def edf_demand(tasks, t):
+    """Processor demand of a task set in the interval [0, t].
+
+    It is the total execution time of the jobs released and with deadline 
+    within the interval, assuming all tasks release their first job at time 0.
+
+    :param tasks: list of task descriptors.
+    :param t: length of the interval.
+    :type  t: int
+
+    :return: The processor demand h(t).
+    :rtype: int
+    """
+    demand = 0
+    for task in tasks:
+        if t >= task['deadline']:
+            demand += ((t - task['deadline']) // task['period'] + 1) * task['exec_time']
+    return demand
+
+
+def edf_busy_period(tasks):
+    """Length of the synchronous busy period of a task set.
+
+    :param tasks: list of task descriptors. The utilization must not exceed 1.
+
+    :return: The length of the first interval in which the CPU is never idle.
+    :rtype: int
+    """
+    busy = sum(task['exec_time'] for task in tasks)
+    while True:
+        new_busy = sum(-(-busy // task['period']) * task['exec_time'] for task in tasks)
+        if new_busy == busy:
+            return busy
+        busy = new_busy
+
+
+def edf_last_deadline(tasks, t):
+    """Latest absolute deadline before a given time.
+
+    :param tasks: list of task descriptors.
+    :param t: the time.
+    :type  t: int
+
+    :return: The latest absolute deadline strictly lower than t, or 0 if there is none.
+    :rtype: int
+    """
+    last = 0
+    for task in tasks:
+        if t > task['deadline']:
+            last = max(last, (t - task['deadline'] - 1) // task['period'] * task['period'] + task['deadline'])
+    return last
+
+
+def edf_qpa(tasks):
+    """Quick Processor-demand Analysis (QPA) of a task set under EDF.
+
+    Exact feasibility test for tasks with arbitrary deadlines, as proposed by 
+    Zhang and Burns. Instead of checking the processor demand at every 
+    absolute deadline up to the hyperperiod, it walks backwards from the 
+    upper bound of the interval to be checked, jumping directly to h(t).
+
+    :param tasks: list of task descriptors. The utilization must not exceed 1.
+
+    :return: True if the task set is schedulable, False otherwise.
+    :rtype: bool.
+    """
+    util = sum(Fraction(task['exec_time'], task['period']) for task in tasks)
+    # upper bound of the interval to be checked
+    bound = edf_busy_period(tasks)
+    if util < 1:
+        la = max(max(task['deadline'] for task in tasks),
+            sum((task['period'] - task['deadline']) * Fraction(task['exec_time'], task['period']) for task in tasks) / (1 - util))
+        bound = min(bound, math.ceil(la))
+
+    min_deadline = min(task['deadline'] for task in tasks)
+    t = edf_last_deadline(tasks, bound)
+    demand = edf_demand(tasks, t)
+    while demand <= t and demand > min_deadline:
+        if demand < t:
+            t = demand
+        else:
+            t = edf_last_deadline(tasks, t)
+        demand = edf_demand(tasks, t)
+    return demand <= min_deadline
+
+
+def edf_overhead_tasks(tasks, overheads):
+    """Task set accounting for the scheduling overheads in the EDF schedulability tests.
+
+    Under EDF, a job release preempts at most one job, so each job costs its
+    execution time, its own context switch and the context switch and preemption
+    delay of the job it preempts. The tick handler becomes a task whose deadline is
+    its cost. The deadlines are shortened by the non preemptive overheads a job may
+    find running at its release: a dispatch and a tick handler.
+
+    :param tasks: list of task descriptors.
+    :param overheads: the overheads, as in :func:`common.overhead_error`.
+    :type  overheads: Dictionary.
+
+    :return: The equivalent task list, or None if a job cannot meet its deadline even alone.
+    :rtype: List of dictionaries.
+    """
+    overheads = overhead_params(overheads)
+    if overheads is None:
+        return list(tasks)
+    switch = overheads['context_switch']
+    resume = switch + overheads['preemption_delay']
+    blocking = resume + overheads['tick_cost']
+    result = []
+    for task in tasks:
+        exec_time = task['exec_time'] + switch + resume
+        deadline = task['deadline'] - blocking
+        if deadline < exec_time:
+            return None
+        result.append(dict(task, exec_time=exec_time, deadline=deadline))
+    if overheads['tick_cost'] > 0:
+        result.append(dict(name='tick', exec_time=overheads['tick_cost'], deadline=overheads['tick_cost'], period=overheads['tick_period']))
+    return result
+
+
+def edf_is_schedulable(tasks, overheads=None):
     """Check the task set schedulability for EDF.
 
     Check whether the specified task set is schedulable under EDF algorithm.
+    When all deadlines are equal to or greater than the periods, the utilization 
+    test is exact. Otherwise, the Quick Processor-demand Analysis (QPA) decides.
 
     :param tasks: list of task descriptors.
+    :param overheads: If defined, the scheduling overheads are accounted as in :func:`edf_overhead_tasks`.
+    :type  overheads: Dictionary.
 
     :return: The return value. True for success, False otherwise.
     :rtype: bool.
     """
+    if overheads is not None:
+        tasks = edf_overhead_tasks(tasks, overheads)
+        if tasks is None:
+            return False
 
-    totalUse = sum((task['exec_time']/float(task['period']) for task in tasks))
+    totalUse = sum(Fraction(task['exec_time'], task['period']) for task in tasks)
     n = len(tasks)
     if(n == 0 ): return
-    if(totalUse <= 1):
-        return True
-    else:
+    if(totalUse > 1):
         return False
+    if all(task['deadline'] >= task['period'] for task in tasks):
+        return True
+    return edf_qpa(tasks)
+
+
+def edf_priority(task, order):
+    """Priority level of an EDF job, i.e. its absolute deadline.
 
-def edf(task_list, sim_time=0, verbose=False):
+    :param task: compact task descriptor.
+    :type  task: :class:`common.Task`
+    :param order: release order of the job (0 for the first job, then period, 2*period, ...).
+    :type  order: int
+
+    :return: The priority level. Earliest absolute deadline first.
+    :rtype: int
+    """
+    return order + task.deadline
+
+
+def edf_tick_sched(task_list, sim_time, metrics=None, task_ids=False, keep_sched=True):
+    """Simulates EDF one OS tick at a time.
+
+    :param  task_list: List of task descriptors.
+    :param sim_time: Number of OS ticks to be simulated.
+    :type  sim_time: int
+    :param metrics: If defined, it is updated with the timing metrics of the jobs.
+    :type  metrics: SchedMetrics
+    :param task_ids: If True, the schedule has the task index instead of the task name.
+    :type  task_ids: bool
+    :param keep_sched: If False, the schedule is not stored. Useful when only the metrics are required.
+    :type  keep_sched: bool
+
+    :return: The task name running in each OS tick, e.g. ["P1","P1","idle","P3", ...].
+    :rtype: List of str.
+    """
+    return tick_sched(task_list, sim_time, edf_priority, metrics, task_ids=task_ids, keep_sched=keep_sched)
+
+
+def edf_event_sched(task_list, sim_time, metrics=None, checkpoints=None, task_ids=False, overheads=None, keep_sched=True):
+    """Simulates EDF jumping from one job release or job completion to the next one.
+
+    Jobs with the same absolute deadline run in the order they were released, and
+    jobs released at the same time run in the order of the task list.
+
+    :param  task_list: List of task descriptors.
+    :param sim_time: Number of OS ticks to be simulated.
+    :type  sim_time: int
+    :param metrics: If defined, it is updated with the timing metrics of the jobs.
+    :type  metrics: SchedMetrics
+    :param checkpoints: If defined, the simulator state is recorded in it periodically.
+    :type  checkpoints: SchedCheckpoints
+    :param task_ids: If True, the segments have the task index instead of the task name.
+    :type  task_ids: bool
+    :param overheads: If defined, the scheduling overheads are charged as 'overhead' segments.
+    :type  overheads: Dictionary.
+    :param keep_sched: If False, the execution segments are not stored. Useful when only the metrics are required.
+    :type  keep_sched: bool
+
+    :return: The execution segments, e.g. [["P1",0,3],["idle",3,4],["P3",4,5], ...].
+    :rtype: List of lists.
+    """
+    return event_sched(task_list, sim_time, edf_priority, metrics, keep_sched, checkpoints=checkpoints, task_ids=task_ids, overheads=overheads)
+
+
+def edf(task_list, sim_time=0, verbose=False, engine='event', horizon='hyperperiod', max_sim_time=0, metrics=False, profiler=None, checkpoints=None, overheads=None, keep_sched=True):
     """Simulates the Earliest Deadline First (EDF) scheduling algorithm.
 
     :param  task_list: List of task descriptors.
-    :param sim_time: Time for simulation. If none is defined, then LCM (Lowest Common Multiple) of periods is used.
+    :param sim_time: Time for simulation. If none is defined, then it is defined by the horizon argument.
     :type  sim_time: int
     :param verbose:
     :type  verbose: bool
+    :param engine: Simulation engine. 'event' jumps between job releases and completions, while 'tick' simulates every OS tick.
+    :type  engine: str
+    :param horizon: Simulation time when sim_time is not defined. 'hyperperiod' uses the LCM (Lowest Common Multiple) of periods and 'busy' uses the first busy period.
+    :type  horizon: str
+    :param max_sim_time: Maximum simulation time. Zero means no limit.
+    :type  max_sim_time: int
+    :param metrics: If True, the timing metrics of each task are included in sched['metrics'], as returned by :meth:`SchedMetrics.summary`.
+    :type  metrics: bool
+    :param profiler: If defined, it measures the check, analysis, horizon, simulate and convert phases and counts the simulated ticks and jobs.
+    :type  profiler: :class:`profiler.PhaseProfiler`
+    :param checkpoints: If defined, the simulator state is recorded in it periodically, so any time window can be re-simulated with :func:`common.event_sched_window`. Requires the event engine.
+    :type  checkpoints: :class:`common.SchedCheckpoints`
+    :param overheads: If defined, the scheduling overheads, as in :func:`common.overhead_error`. They are accounted by the schedulability test and charged as 'overhead' jobs in the schedule. Requires the event engine and no checkpoints.
+    :type  overheads: Dictionary.
+    :param keep_sched: If False, the schedule is not built, and the result has only the timing metrics of each task, in sched['metrics'].
+    :type  keep_sched: bool
 
     :return: sched 
     :rtype: schedule list for each task (List of dictionaries)
     """
 
-    if not check_rms_edf(task_list):
+    # imported here, since sched_api imports this module
+    from sched_api import TaskSet, SchedError, NotSchedulableError, schedule
+
+    with profile_phase(profiler, 'check'):
+        valid = check_rms_edf(task_list)
+    if not valid:
         print("Aborting execution of EDF algorithm due to invalid input file.")
         sys.exit(1)
 
-    sched = {}
-
-    return sched
+    try:
+        return schedule(TaskSet(task_list, overheads=overheads), 'edf', sim_time, engine, horizon, max_sim_time, metrics,
+            keep_sched=keep_sched, profiler=profiler, checkpoints=checkpoints, verbose=True)
+    except NotSchedulableError:
+        print("Aborting execution of EDF algorithm since this task set is not schedulable for EDF.")
+    except SchedError as exc:
+        print ("ERROR:", exc)
+    sys.exit(1)
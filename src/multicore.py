@@ -0,0 +1,278 @@
+import heapq
+import os
+import sys
+from collections import deque
+from multiprocessing import Pool
+from common import ReadyQueue, compact_tasks, sched_segments_2_sched_dict, sim_horizon, check_rms_edf, released_jobs
+from profiler import profile_phase
+from rms import rms_priority, rms_response_times, rms_event_sched
+from edf import edf_priority, edf_is_schedulable, edf_event_sched
+
+
+def core_is_schedulable(tasks, algo):
+    """Check the schedulability of the tasks assigned to a single core.
+
+    :param tasks: list of task descriptors.
+    :param algo: 'rms' or 'edf'.
+    :type  algo: str
+
+    :return: True if the tasks are schedulable on a core, False otherwise.
+    :rtype: bool
+    """
+    if len(tasks) == 0:
+        return True
+    if algo == 'rms':
+        if sum(task['exec_time']/float(task['period']) for task in tasks) > 1.0:
+            return False
+        return all(resp is not None for resp in rms_response_times(tasks, stop_at_miss=True))
+    return edf_is_schedulable(tasks)
+
+
+def partition(task_list, num_cores, algo='rms', heuristic='first-fit'):
+    """Assign the tasks to the cores with a bin-packing heuristic.
+
+    The tasks are sorted by decreasing utilization. Then, each task goes to the
+    first core (first-fit) or to the least loaded core (worst-fit) in which the
+    single core schedulability test of the algorithm still passes.
+
+    :param task_list: List of task descriptors.
+    :type  task_list: List of dictionaries.
+    :param num_cores: number of cores.
+    :type  num_cores: int
+    :param algo: 'rms' or 'edf'.
+    :type  algo: str
+    :param heuristic: 'first-fit' or 'worst-fit'.
+    :type  heuristic: str
+
+    :return: The list of tasks of each core, or None if some task does not fit.
+    :rtype: List of lists of dictionaries.
+    """
+    cores = [[] for _ in range(num_cores)]
+    load = [0.0]*num_cores
+    for task in sorted(task_list, key=lambda task: task['exec_time']/float(task['period']), reverse=True):
+        if heuristic == 'first-fit':
+            candidates = range(num_cores)
+        else:
+            candidates = sorted(range(num_cores), key=lambda core: load[core])
+        for core in candidates:
+            if core_is_schedulable(cores[core] + [task], algo):
+                cores[core].append(task)
+                load[core] += task['exec_time']/float(task['period'])
+                break
+        else:
+            print ("ERROR: task", task['name'], "does not fit in any core.")
+            return None
+    # keep the order of the input file in each core
+    position = {id(task): idx for idx, task in enumerate(task_list)}
+    return [sorted(tasks, key=lambda task: position[id(task)]) for tasks in cores]
+
+
+def simulate_core(args):
+    """Simulate the tasks of a single core. Used by the worker processes.
+
+    :param args: tuple (list of task descriptors, algorithm, simulation time).
+    :type  args: tuple
+
+    :return: The execution segments of the core.
+    :rtype: List of lists.
+    """
+    tasks, algo, sim_time = args
+    if len(tasks) == 0:
+        return [['idle', 0, sim_time]] if sim_time > 0 else []
+    if algo == 'rms':
+        return rms_event_sched(tasks, sim_time)
+    return edf_event_sched(tasks, sim_time)
+
+
+def global_event_sched(task_list, sim_time, priority, num_cores):
+    """Simulates a global preemptive priority scheduler on multiple cores.
+
+    Jobs are released as in :func:`common.event_sched`, and the num_cores ready
+    jobs with the highest priority run at any time. The jobs of a task run one
+    at a time, in their release order. A job keeps its core while it is running, 
+    and the jobs starting to run take the free cores in increasing order.
+
+    :param  task_list: List of task descriptors.
+    :param sim_time: Number of OS ticks to be simulated.
+    :type  sim_time: int
+    :param priority: Function returning the priority level of a job given its compact task descriptor (:class:`common.Task`) and its release order.
+    :type  priority: function
+    :param num_cores: number of cores.
+    :type  num_cores: int
+
+    :return: The execution segments of each core.
+    :rtype: List of lists of lists.
+    """
+    task_list = compact_tasks(task_list)
+    release_heap = [(0, 0, idx) for idx in range(len(task_list))]
+    heapq.heapify(release_heap)
+
+    # ready jobs. [remaining exec time, task index, priority level, core]
+    ready_list = ReadyQueue()
+    # the jobs of a task never run in parallel, so only its oldest job is in the ready list
+    active = [False]*len(task_list)
+    backlog = [deque() for _ in task_list]
+    segments = [[] for _ in range(num_cores)]
+    running = set()
+    time = 0
+    while time < sim_time:
+        # move the released jobs to the ready list
+        while release_heap and release_heap[0][0] <= time:
+            _, order, idx = heapq.heappop(release_heap)
+            task = task_list[idx]
+            # ties are broken by release order, as in the single core FIFOs
+            level = (priority(task, order), order, idx)
+            job = [task.exec_time, idx, level, None]
+            if active[idx]:
+                # the previous job of the task did not finish yet
+                backlog[idx].append(job)
+            else:
+                ready_list.push(level, job)
+                active[idx] = True
+            next_order = order + task.period
+            if next_order < sim_time:
+                heapq.heappush(release_heap, (next_order, next_order, idx))
+
+        if release_heap:
+            next_event = min(release_heap[0][0], sim_time)
+        else:
+            next_event = sim_time
+
+        # the highest priority jobs gain access to the cores
+        selected = [ready_list.pop() for _ in range(min(num_cores, len(ready_list)))]
+        busy_cores = {job[3] for job in selected if id(job) in running}
+        free_cores = iter([core for core in range(num_cores) if core not in busy_cores])
+        for job in selected:
+            if id(job) not in running:
+                job[3] = next(free_cores)
+        end_time = next_event
+        for job in selected:
+            end_time = min(end_time, time + job[0])
+
+        names = ['idle']*num_cores
+        for job in selected:
+            job[0] -= end_time - time
+            names[job[3]] = task_list[job[1]].name
+        for core, name in enumerate(names):
+            # merge consecutive segments of the same task
+            if segments[core] and segments[core][-1][0] == name:
+                segments[core][-1][2] = end_time
+            else:
+                segments[core].append([name, time, end_time])
+
+        # put back the unfinished jobs
+        running = set()
+        for job in selected:
+            if job[0] > 0:
+                ready_list.push(job[2], job)
+                running.add(id(job))
+        # the next job of the tasks that finished a job become ready
+        for job in selected:
+            if job[0] == 0:
+                idx = job[1]
+                if backlog[idx]:
+                    next_job = backlog[idx].popleft()
+                    ready_list.push(next_job[2], next_job)
+                else:
+                    active[idx] = False
+        time = end_time
+
+    return segments
+
+
+def multicore_sched(task_list, num_cores, algo='rms', mode='partitioned', heuristic='first-fit',
+        sim_time=0, horizon='hyperperiod', max_sim_time=0, jobs=None, verbose=False, profiler=None):
+    """Simulates RMS or EDF on multiple cores.
+
+    In the partitioned mode, the tasks are assigned to the cores by :func:`partition`
+    and each core is simulated in a separate worker process. In the global mode,
+    a single ready list feeds all the cores.
+
+    The resulting schedule has the same format of the single core schedule,
+    but each entry of sched['sched'] has an additional 'core' field with the
+    core index, so the same task may appear once per core.
+
+    :param task_list: List of task descriptors.
+    :type  task_list: List of dictionaries.
+    :param num_cores: number of cores.
+    :type  num_cores: int
+    :param algo: 'rms' or 'edf'.
+    :type  algo: str
+    :param mode: 'partitioned' or 'global'.
+    :type  mode: str
+    :param heuristic: bin-packing heuristic of the partitioned mode, 'first-fit' or 'worst-fit'.
+    :type  heuristic: str
+    :param sim_time: Time for simulation. If none is defined, then it is defined by the horizon argument.
+    :type  sim_time: int
+    :param horizon: 'hyperperiod' or 'busy', as in :func:`common.sim_horizon`.
+    :type  horizon: str
+    :param max_sim_time: Maximum simulation time. Zero means no limit.
+    :type  max_sim_time: int
+    :param jobs: number of worker processes of the partitioned mode, up to one per core. If none is defined, the number of CPUs is used.
+    :type  jobs: int
+    :param verbose:
+    :type  verbose: bool
+    :param profiler: If defined, it measures the check, analysis, horizon, simulate and convert phases and counts the simulated ticks of all cores and the jobs.
+    :type  profiler: :class:`profiler.PhaseProfiler`
+
+    :return: sched
+    :rtype: schedule list for each task and core (List of dictionaries)
+    """
+    with profile_phase(profiler, 'check'):
+        valid = check_rms_edf(task_list)
+    if not valid:
+        print("Aborting execution of the multicore scheduling due to invalid input file.")
+        sys.exit(1)
+
+    if mode == 'partitioned':
+        with profile_phase(profiler, 'analysis'):
+            cores = partition(task_list, num_cores, algo, heuristic)
+        if cores is None:
+            print("Aborting execution of the multicore scheduling since this task set could not be partitioned.")
+            sys.exit(1)
+    elif mode == 'global':
+        cores = [task_list]*num_cores
+        total_use = sum(task['exec_time']/float(task['period']) for task in task_list)
+        if total_use > num_cores:
+            print("Aborting execution of the multicore scheduling since the total CPU usage", total_use, "exceeds the number of cores.")
+            sys.exit(1)
+        print("WARNING: global scheduling is simulated with no schedulability guarantees.")
+    else:
+        print ("ERROR: unsupported multicore mode", mode)
+        sys.exit(1)
+
+    with profile_phase(profiler, 'horizon'):
+        sim_time = sim_horizon(task_list, sim_time, horizon, max_sim_time)
+    if sim_time is None:
+        sys.exit(1)
+    print ("The simulation time is:", sim_time)
+
+    with profile_phase(profiler, 'simulate'):
+        if mode == 'partitioned':
+            with Pool(min(num_cores, jobs or os.cpu_count())) as pool:
+                segments = pool.map(simulate_core, [(tasks, algo, sim_time) for tasks in cores])
+        else:
+            priority = rms_priority if algo == 'rms' else edf_priority
+            segments = global_event_sched(task_list, sim_time, priority, num_cores)
+    if profiler is not None:
+        profiler.count('ticks', sim_time*num_cores)
+        profiler.count('jobs', released_jobs(task_list, sim_time))
+
+    if verbose:
+        print (segments)
+
+    with profile_phase(profiler, 'convert'):
+        sched = {}
+        sched['title'] = 'Some title'
+        sched['sched'] = []
+        idle = dict(name='idle', exec_time=1, deadline=1, period=1)
+        for core, (tasks, core_segments) in enumerate(zip(cores, segments)):
+            if mode == 'global':
+                # only the tasks that ran in this core
+                names = {segment[0] for segment in core_segments}
+                tasks = [task for task in tasks if task['name'] in names]
+            core_sched = sched_segments_2_sched_dict(tasks + [idle], core_segments, verbose)
+            for sched_task in core_sched['sched']:
+                sched_task['core'] = core
+                sched['sched'].append(sched_task)
+    return sched
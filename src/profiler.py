@@ -0,0 +1,117 @@
+import contextlib
+import cProfile
+import json
+import time
+import tracemalloc
+
+
+class PhaseProfiler:
+    """Records the wall time, CPU time and, optionally, peak memory of the phases of a run.
+
+    The phases are measured with :meth:`phase`, and the simulators add their
+    tick and job counters with :meth:`count`. The peak memory is measured with
+    tracemalloc, which slows down the code, so it is measured only on request, and
+    the times of that run should not be compared with the ones of a run without it.
+    Optionally, one of the phases runs under cProfile.
+
+    :param cprofile_phase: name of the phase to be run under cProfile. If none is defined, cProfile is not used.
+    :type  cprofile_phase: str
+    :param memory: If True, the peak memory of each phase is measured.
+    :type  memory: bool
+    """
+
+    def __init__(self, cprofile_phase=None, memory=False):
+        self.phases = []
+        self.counters = {}
+        # run description, e.g. the command line arguments, saved with the results
+        self.info = {}
+        self.cprofile_phase = cprofile_phase
+        self.cprofile = None
+        self.memory = memory
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Context manager measuring a phase.
+
+        :param name: phase name. A phase may run more than once, e.g. once per core.
+        :type  name: str
+        """
+        if self.cprofile_phase == name:
+            if self.cprofile is None:
+                self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        started_tracing = self.memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.memory:
+            tracemalloc.reset_peak()
+            base_memory = tracemalloc.get_traced_memory()[0]
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - wall_start
+            cpu_time = time.process_time() - cpu_start
+            if self.cprofile_phase == name:
+                self.cprofile.disable()
+            self.phases.append(dict(name=name, wall_time=wall_time, cpu_time=cpu_time))
+            if self.memory:
+                self.phases[-1]['peak_memory'] = tracemalloc.get_traced_memory()[1] - base_memory
+            if started_tracing:
+                tracemalloc.stop()
+
+    def count(self, name, value):
+        """Add value to a counter.
+
+        :param name: counter name, e.g. 'ticks' or 'jobs'.
+        :type  name: str
+        :param value: value to be added.
+        :type  value: int
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def report(self):
+        """The profiling results.
+
+        The throughput is computed from the 'ticks' and 'jobs' counters and the wall time of the 'simulate' phases.
+
+        :return: Dictionary with the run description, the list of phases, the counters and the throughput.
+        :rtype: Dictionary.
+        """
+        sim_time = sum(phase['wall_time'] for phase in self.phases if phase['name'] == 'simulate')
+        throughput = {}
+        if sim_time > 0:
+            for counter in ('ticks', 'jobs'):
+                if counter in self.counters:
+                    throughput[counter + '_per_sec'] = self.counters[counter] / sim_time
+        return dict(info=self.info, phases=self.phases, counters=self.counters, throughput=throughput,
+            total_wall_time=sum(phase['wall_time'] for phase in self.phases))
+
+    def save(self, file_name, cprofile_file=None):
+        """Save the profiling results as JSON and, optionally, the cProfile statistics.
+
+        :param file_name: output JSON file name.
+        :type  file_name: str
+        :param cprofile_file: output file of the cProfile statistics, readable by the pstats module.
+        :type  cprofile_file: str
+        :return: None.
+        """
+        with open(file_name, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        if cprofile_file is not None and self.cprofile is not None:
+            self.cprofile.dump_stats(cprofile_file)
+
+
+def profile_phase(profiler, name):
+    """Measure a phase with profiler, or do nothing if profiler is None.
+
+    :param profiler: the profiler.
+    :type  profiler: PhaseProfiler
+    :param name: phase name.
+    :type  name: str
+    :return: A context manager.
+    """
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.phase(name)
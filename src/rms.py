@@ -1,14 +1,258 @@
-from common import check_rms_edf, sched_list_2_sched_dict
+from common import check_rms_edf, overhead_params, tick_sched, event_sched
+from profiler import profile_phase
 import numpy as np
 import sys
 
+# fixed priority assignment policies, see assign_priorities
+PRIORITY_POLICIES = ['rm', 'dm', 'explicit', 'opa']
 
-def rms_is_schedulable(tasks):
+
+def response_time(task, hp_tasks, start=0):
+    """Exact response time of a task under fixed priority scheduling.
+
+    Solves the response time equation R = C + sum(ceil(R/Tj)*Cj) for the higher 
+    priority tasks j by fixed-point iteration. The iteration stops as soon as 
+    R exceeds the task deadline (or period, if shorter).
+
+    :param task: task descriptor.
+    :param hp_tasks: list of descriptors of the tasks with higher or equal priority.
+    :param start: initial value of R (warm start). It must not exceed the response time. 
+    :type  start: int
+
+    :return: The response time, or None if the task misses its deadline.
+    :rtype: int
+    """
+    deadline = min(task['deadline'], task['period'])
+    resp = max(start, task['exec_time'] + sum(hp['exec_time'] for hp in hp_tasks))
+    while resp <= deadline:
+        new_resp = task['exec_time']
+        for hp in hp_tasks:
+            new_resp += -(-resp // hp['period']) * hp['exec_time']
+        if new_resp == resp:
+            return resp
+        resp = new_resp
+    return None
+
+
+def rms_response_times(tasks, stop_at_miss=False):
+    """Response Time Analysis (RTA) of a task set under RMS.
+
+    Tasks with the same period are considered to interfere with each other.
+    The response time of each task is used as warm start for the next 
+    lower priority task.
+
+    :param tasks: list of task descriptors.
+    :param stop_at_miss: stop the analysis at the first task missing its deadline.
+    :type  stop_at_miss: bool
+
+    :return: The response time of each task, in the order of the task list. None for the tasks missing their deadline or not analyzed.
+    :rtype: List of int.
+    """
+    return fp_response_times(tasks, [task['period'] for task in tasks], stop_at_miss)
+
+
+def fp_response_times(tasks, priorities, stop_at_miss=False):
+    """Response Time Analysis (RTA) of a task set under fixed priority scheduling.
+
+    As in :func:`rms_response_times`, but with any priority levels. Tasks with the
+    same level interfere with each other.
+
+    :param tasks: list of task descriptors.
+    :param priorities: priority level of each task, lower levels first.
+    :type  priorities: List of int.
+    :param stop_at_miss: stop the analysis at the first task missing its deadline.
+    :type  stop_at_miss: bool
+
+    :return: The response time of each task, in the order of the task list. None for the tasks missing their deadline or not analyzed.
+    :rtype: List of int.
+    """
+    # highest priority first
+    order = sorted(range(len(tasks)), key=lambda idx: priorities[idx])
+    resp_times = [None]*len(tasks)
+    prev = None
+    for pos, idx in enumerate(order):
+        task = tasks[idx]
+        hp_tasks = [tasks[j] for j in order if j != idx and priorities[j] <= priorities[idx]]
+        # the previous task response time is a lower bound only if it has strictly higher priority
+        start = 0
+        if prev is not None and resp_times[prev] is not None and priorities[prev] < priorities[idx]:
+            start = resp_times[prev] + task['exec_time']
+        resp_times[idx] = response_time(task, hp_tasks, start)
+        if resp_times[idx] is None and stop_at_miss:
+            break
+        prev = idx
+    return resp_times
+
+
+def fp_overhead_response_times(tasks, priorities, overheads, stop_at_miss=False):
+    """Response Time Analysis (RTA) under fixed priority scheduling with scheduling overheads.
+
+    It bounds the response times of the schedules of :func:`common.event_sched` with
+    overheads. Each higher priority job costs its execution time, its own context
+    switch and the context switch and preemption delay of the job it preempts. The
+    tick handler is a highest priority task, and a task may be blocked by a dispatch
+    overhead of a lower priority task, which is not preemptive.
+
+    :param tasks: list of task descriptors.
+    :param priorities: priority level of each task, lower levels first.
+    :type  priorities: List of int.
+    :param overheads: the overheads, as in :func:`common.overhead_error`.
+    :type  overheads: Dictionary.
+    :param stop_at_miss: stop the analysis at the first task missing its deadline.
+    :type  stop_at_miss: bool
+
+    :return: The response time of each task, in the order of the task list. None for the tasks missing their deadline or not analyzed.
+    :rtype: List of int.
+    """
+    overheads = overhead_params(overheads)
+    if overheads is None:
+        return fp_response_times(tasks, priorities, stop_at_miss)
+    switch = overheads['context_switch']
+    resume = switch + overheads['preemption_delay']
+    hp_costs = [dict(task, exec_time=task['exec_time'] + switch + resume) for task in tasks]
+    tick = []
+    if overheads['tick_cost'] > 0:
+        tick = [dict(name='tick', exec_time=overheads['tick_cost'], deadline=overheads['tick_period'], period=overheads['tick_period'])]
+    lowest = max(priorities) if priorities else 0
+    resp_times = [None]*len(tasks)
+    for idx in sorted(range(len(tasks)), key=lambda idx: priorities[idx]):
+        task = tasks[idx]
+        hp_tasks = tick + [hp_costs[j] for j in range(len(tasks)) if j != idx and priorities[j] <= priorities[idx]]
+        blocking = resume if priorities[idx] < lowest else 0
+        resp_times[idx] = response_time(dict(task, exec_time=task['exec_time'] + switch + blocking), hp_tasks)
+        if resp_times[idx] is None and stop_at_miss:
+            break
+    return resp_times
+
+
+def deadline_monotonic_priorities(tasks):
+    """Deadline monotonic priority levels, i.e. shortest deadline first.
+
+    It is optimal among the fixed priority assignments when the deadlines are not
+    longer than the periods. The level is the deadline, or the period if shorter,
+    so tasks with the same deadline have the same level.
+
+    :param tasks: list of task descriptors.
+    :return: The priority level of each task, in the order of the task list.
+    :rtype: List of int.
+    """
+    return [min(task['deadline'], task['period']) for task in tasks]
+
+
+def audsley_priorities(tasks):
+    """Optimal priority assignment (OPA) of Audsley.
+
+    The levels are assigned from the lowest to the highest one. Each level gets an
+    unassigned task meeting its deadline when all the other unassigned tasks have
+    higher priority, found with the exact RTA. The candidates are tried in deadline
+    monotonic order, longest deadline first, so the first candidate usually passes,
+    and at most n*(n+1)/2 response times are computed.
+
+    Each RTA starts from the larger of the two response time lower bounds
+    C + sum(Cj) and C/(1 - sum(Cj/Tj)) of the higher priority tasks j.
+
+    :param tasks: list of task descriptors.
+    :return: The priority level of each task, 0 for the highest one, in the order of the task list. None if no fixed priority assignment makes the task set schedulable.
+    :rtype: List of int.
+    """
+    num_tasks = len(tasks)
+    execs = np.array([task['exec_time'] for task in tasks], dtype=np.int64)
+    periods = np.array([task['period'] for task in tasks], dtype=np.int64)
+    deadlines = np.minimum(np.array([task['deadline'] for task in tasks], dtype=np.int64), periods)
+    utils = execs / periods
+    # longest deadline first, then longest period, as in the deadline monotonic order
+    candidates = sorted(range(num_tasks), key=lambda idx: (deadlines[idx], periods[idx]), reverse=True)
+    unassigned = np.ones(num_tasks, dtype=bool)
+    priorities = [None]*num_tasks
+    for level in range(num_tasks - 1, -1, -1):
+        for pos, idx in enumerate(candidates):
+            unassigned[idx] = False
+            hp_execs = execs[unassigned]
+            hp_periods = periods[unassigned]
+            hp_util = utils[unassigned].sum()
+            resp = int(execs[idx] + hp_execs.sum())
+            if hp_util < 1.0:
+                # the bound is rounded down, so it never exceeds the response time
+                resp = max(resp, int(execs[idx] / (1.0 - hp_util) - 1e-9))
+            while resp <= deadlines[idx]:
+                new_resp = int(execs[idx] + (-(-resp // hp_periods) * hp_execs).sum())
+                if new_resp == resp:
+                    break
+                resp = new_resp
+            if resp <= deadlines[idx]:
+                priorities[idx] = level
+                del candidates[pos]
+                break
+            unassigned[idx] = True
+        else:
+            return None
+    return priorities
+
+
+def assign_priorities(tasks, policy='rm'):
+    """Fixed priority level of each task.
+
+    :param tasks: list of task descriptors.
+    :param policy: 'rm' (rate monotonic, the period), 'dm' (deadline monotonic, see :func:`deadline_monotonic_priorities`),
+        'explicit' (the 'priority' field of each task) or 'opa' (see :func:`audsley_priorities`). Lower levels run first.
+    :type  policy: str
+    :return: The priority level of each task, in the order of the task list. None if the 'opa' policy finds no feasible assignment.
+    :rtype: List of int.
+    :raises ValueError: if the policy is not supported, or a task has no 'priority' field with the 'explicit' policy.
+    """
+    if policy == 'rm':
+        return [task['period'] for task in tasks]
+    if policy == 'dm':
+        return deadline_monotonic_priorities(tasks)
+    if policy == 'explicit':
+        for task in tasks:
+            if 'priority' not in task:
+                raise ValueError("field 'priority' not found in task %s" % task['name'])
+        return [task['priority'] for task in tasks]
+    if policy == 'opa':
+        return audsley_priorities(tasks)
+    raise ValueError("unsupported priority policy %s" % policy)
+
+
+def fp_is_schedulable(tasks, priorities, verbose=True, overheads=None):
+    """Check the task set schedulability under fixed priority scheduling with the given priority levels.
+
+    :param tasks: list of task descriptors.
+    :param priorities: priority level of each task, lower levels first.
+    :type  priorities: List of int.
+    :param verbose: If False, the test results are not printed.
+    :type  verbose: bool
+    :param overheads: If defined, the scheduling overheads are accounted as in :func:`fp_overhead_response_times`.
+    :type  overheads: Dictionary.
+
+    :return: True for success, False otherwise.
+    :rtype: bool.
+    """
+    if sum(task['exec_time']/float(task['period']) for task in tasks) > 1.0:
+        if verbose:
+            print("ERROR: total CPU usage > 100%.")
+        return False
+    resp_times = fp_overhead_response_times(tasks, priorities, overheads, stop_at_miss=True)
+    for task, resp in zip(tasks, resp_times):
+        if resp is None:
+            if verbose:
+                print("ERROR: task", task['name'], "misses its deadline according to the response time analysis.")
+            return False
+    if verbose:
+        print("The tasks are schedulable according to the response time analysis.")
+    return True
+
+
+def rms_is_schedulable(tasks, verbose=True):
     """Check the task set schedulability for RMS.
     
     Check whether the specified task set is schedulable under RMS algorithm.
+    The Liu & Layland utilization bound is checked first. When it is inconclusive,
+    the exact Response Time Analysis (RTA) decides.
 
     :param tasks: list of task descriptors.
+    :param verbose: If False, the test results are not printed.
+    :type  verbose: bool
 
     :return: The return value. True for success, False otherwise.
     :rtype: bool.
@@ -18,94 +262,214 @@ def rms_is_schedulable(tasks):
     n = len(tasks)
     if(n == 0 ): return
     #check scallability based off of total use and number os tasks
-    print ("RMS schedudability:",totalUse, " <= ", n*(2**(1/n)-1))
+    if verbose:
+        print ("RMS schedudability:",totalUse, " <= ", n*(2**(1/n)-1))
     if (totalUse > 1.0):
-        print("ERROR: total CPU usage > 100%.")
+        if verbose:
+            print("ERROR: total CPU usage > 100%.")
         return False
-    if (totalUse <= n*(2**(1/n)-1)):
-        print("The tasks are provably schedulable.")
-    else:
-        print("The tasks might be scheludable, with no guarantees.")
+    # the utilization bound assumes deadlines equal to the periods
+    implicit = all(task['deadline'] >= task['period'] for task in tasks)
+    if implicit and (totalUse <= n*(2**(1/n)-1)):
+        if verbose:
+            print("The tasks are provably schedulable.")
+        return True
+    resp_times = rms_response_times(tasks, stop_at_miss=True)
+    for task, resp in zip(tasks, resp_times):
+        if resp is None:
+            if verbose:
+                print("ERROR: task", task['name'], "misses its deadline according to the response time analysis.")
+            return False
+    if verbose:
+        print("The tasks are schedulable according to the response time analysis.")
     return True
-       
 
-def rms(task_list, sim_time=0, verbose=False):
-    """Simulates the Rate Monotonic (RM) scheduling algorithm.
+
+def rms_is_schedulable_batch(exec_times, periods, deadlines=None):
+    """Check the RMS schedulability of many task sets at once.
+
+    Each row of the arrays is a task set. Task sets with less tasks are 
+    padded with zero execution time. The utilization tests and the 
+    Response Time Analysis (RTA) run vectorized over all task sets, one 
+    priority level at a time, and the task sets missing a deadline are 
+    dropped from the remaining iterations.
+
+    :param exec_times: execution time of the tasks, shape (number of task sets, max number of tasks).
+    :type  exec_times: numpy array of int.
+    :param periods: periods of the tasks, same shape of exec_times.
+    :type  periods: numpy array of int.
+    :param deadlines: deadlines of the tasks, same shape of exec_times. If none is defined, the periods are used.
+    :type  deadlines: numpy array of int.
+
+    :return: True for the schedulable task sets, False otherwise.
+    :rtype: numpy array of bool.
+
+    :Example: 
+
+        >>> rms_is_schedulable_batch([[1,2,2],[3,3,0]], [[8,5,10],[4,6,1]])
+        >>> array([ True, False])
+    """
+    exec_times = np.asarray(exec_times, dtype=np.int64)
+    periods = np.asarray(periods, dtype=np.int64)
+    if deadlines is None:
+        deadlines = periods
+    deadlines = np.minimum(np.asarray(deadlines, dtype=np.int64), periods)
+    valid = exec_times > 0
+    # padding tasks never interfere and never miss their deadline
+    periods = np.where(valid, periods, 1)
+    deadlines = np.where(valid, deadlines, np.iinfo(np.int64).max)
+
+    num_tasks = valid.sum(axis=1)
+    util = (exec_times / periods).sum(axis=1)
+    bound = np.where(num_tasks > 0, num_tasks*(2**(1/np.maximum(num_tasks,1))-1), 1.0)
+    implicit = np.all(~valid | (deadlines >= periods), axis=1)
+    sched = util <= 1.0
+    # the utilization bound decides for these sets
+    pending = sched & ~(implicit & (util <= bound))
+    if not pending.any():
+        return sched
+
+    # shortest period first. padding goes to the end of the row
+    rows = np.nonzero(pending)[0]
+    order = np.argsort(np.where(valid[rows], periods[rows], np.iinfo(np.int64).max), axis=1, kind='stable')
+    C = np.take_along_axis(exec_times[rows], order, axis=1)
+    T = np.take_along_axis(periods[rows], order, axis=1)
+    D = np.take_along_axis(deadlines[rows], order, axis=1)
+    ok = np.ones(len(rows), dtype=bool)
+    prev_resp = np.zeros(len(rows), dtype=np.int64)
+    for k in range(C.shape[1]):
+        if not ok.any():
+            break
+        # tasks with higher or equal priority
+        hp = (T <= T[:, k:k+1]) & (C > 0)
+        hp[:, k] = False
+        hp_exec = np.where(hp, C, 0)
+        resp = C[:, k] + hp_exec.sum(axis=1)
+        if k > 0:
+            warm = np.where(T[:, k-1] < T[:, k], prev_resp + C[:, k], 0)
+            resp = np.maximum(resp, warm)
+        active = ok & (C[:, k] > 0)
+        while True:
+            active &= resp <= D[:, k]
+            if not active.any():
+                break
+            new_resp = C[:, k] + (-(-resp[:, None] // T) * hp_exec).sum(axis=1)
+            active &= new_resp != resp
+            resp = np.where(active, new_resp, resp)
+        ok &= (C[:, k] == 0) | (resp <= D[:, k])
+        prev_resp = resp
+    sched[rows] = ok
+    return sched
+
+
+def rms_priority(task, order):
+    """Priority level of a RMS job, i.e. the task period, or the fixed priority level assigned to the task.
+
+    :param task: compact task descriptor.
+    :type  task: :class:`common.Task`
+    :param order: release order of the job (0 for the first job, then period, 2*period, ...).
+    :type  order: int
+
+    :return: The priority level. Shortest period first, unless other levels were assigned with :func:`common.compact_tasks`.
+    :rtype: int
+    """
+    return task.priority
+
+
+def rms_tick_sched(task_list, sim_time, metrics=None, task_ids=False, keep_sched=True):
+    """Simulates RMS one OS tick at a time.
+
+    :param  task_list: List of task descriptors.
+    :param sim_time: Number of OS ticks to be simulated.
+    :type  sim_time: int
+    :param metrics: If defined, it is updated with the timing metrics of the jobs.
+    :type  metrics: SchedMetrics
+    :param task_ids: If True, the schedule has the task index instead of the task name.
+    :type  task_ids: bool
+    :param keep_sched: If False, the schedule is not stored. Useful when only the metrics are required.
+    :type  keep_sched: bool
+
+    :return: The task name running in each OS tick, e.g. ["P1","P1","idle","P3", ...].
+    :rtype: List of str.
+    """
+    return tick_sched(task_list, sim_time, rms_priority, metrics, task_ids=task_ids, keep_sched=keep_sched)
+
+
+def rms_event_sched(task_list, sim_time, metrics=None, checkpoints=None, task_ids=False, overheads=None, keep_sched=True):
+    """Simulates RMS jumping from one job release or job completion to the next one.
+
+    :param  task_list: List of task descriptors.
+    :param sim_time: Number of OS ticks to be simulated.
+    :type  sim_time: int
+    :param metrics: If defined, it is updated with the timing metrics of the jobs.
+    :type  metrics: SchedMetrics
+    :param checkpoints: If defined, the simulator state is recorded in it periodically.
+    :type  checkpoints: SchedCheckpoints
+    :param task_ids: If True, the segments have the task index instead of the task name.
+    :type  task_ids: bool
+    :param overheads: If defined, the scheduling overheads are charged as 'overhead' segments.
+    :type  overheads: Dictionary.
+    :param keep_sched: If False, the execution segments are not stored. Useful when only the metrics are required.
+    :type  keep_sched: bool
+
+    :return: The execution segments, e.g. [["P1",0,3],["idle",3,4],["P3",4,5], ...].
+    :rtype: List of lists.
+    """
+    return event_sched(task_list, sim_time, rms_priority, metrics, keep_sched, checkpoints=checkpoints, task_ids=task_ids, overheads=overheads)
+
+
+def rms(task_list, sim_time=0, verbose=False, engine='event', horizon='hyperperiod', max_sim_time=0, metrics=False, profiler=None, checkpoints=None, policy='rm', overheads=None, keep_sched=True):
+    """Simulates the Rate Monotonic (RM) scheduling algorithm, or another fixed priority assignment.
 
     :param  task_list: List of task descriptors.
-    :param sim_time: Time for simulation. If none is defined, then LCM (Lowest Common Multiple) of periods is used.
+    :param sim_time: Time for simulation. If none is defined, then it is defined by the horizon argument.
     :type  sim_time: int
     :param verbose:
     :type  verbose: bool
+    :param engine: Simulation engine. 'event' jumps between job releases and completions, while 'tick' simulates every OS tick.
+    :type  engine: str
+    :param horizon: Simulation time when sim_time is not defined. 'hyperperiod' uses the LCM (Lowest Common Multiple) of periods and 'busy' uses the first busy period.
+    :type  horizon: str
+    :param max_sim_time: Maximum simulation time. Zero means no limit.
+    :type  max_sim_time: int
+    :param metrics: If True, the timing metrics of each task are included in sched['metrics'], as returned by :meth:`SchedMetrics.summary`.
+    :type  metrics: bool
+    :param profiler: If defined, it measures the check, analysis, horizon, simulate and convert phases and counts the simulated ticks and jobs.
+    :type  profiler: :class:`profiler.PhaseProfiler`
+    :param checkpoints: If defined, the simulator state is recorded in it periodically, so any time window can be re-simulated with :func:`common.event_sched_window`. Requires the event engine.
+    :type  checkpoints: :class:`common.SchedCheckpoints`
+    :param policy: priority assignment, as in :func:`assign_priorities`. 'rm' uses the periods.
+    :type  policy: str
+    :param overheads: If defined, the scheduling overheads, as in :func:`common.overhead_error`. They are accounted by the schedulability test and charged as 'overhead' jobs in the schedule. Requires the event engine and no checkpoints.
+    :type  overheads: Dictionary.
+    :param keep_sched: If False, the schedule is not built, and the result has only the timing metrics of each task, in sched['metrics'].
+    :type  keep_sched: bool
 
     :return: sched 
     :rtype: schedule list for each task (List of dictionaries).
     """
 
+    # imported here, since sched_api imports this module
+    from sched_api import TaskSet, SchedError, NotSchedulableError, schedule
+
     # check the input syntax
-    if not check_rms_edf(task_list):
+    with profile_phase(profiler, 'check'):
+        valid = check_rms_edf(task_list)
+    if not valid:
         print("Aborting execution of RMS algorithm due to invalid input file.")
         sys.exit(1)
-    
-    # check schedulability of the task set
-    if not rms_is_schedulable(task_list):
-        print("Aborting execution of RMS algorithm since this task set is not schedulable for RMS.")
-        sys.exit(1)
-
-    # if the simulation time is not specified by the user, then use the LCM of the task periods
-    if sim_time == 0:
-        # Returns the LCM (Lowest Common Multiple) of a list of integers
-        # this will determine the max simulation time
-        list_period=[]
-        for task in task_list:
-            list_period.append(task['period'])
-        sim_time = np.lcm.reduce(list_period)
-        
-    print ("The simulation time is:", sim_time)
-
-    # assuming all the tasks start at time zero, initialize the OS's ready_list
-    ready_list = []
-    for task in task_list:
-        ready_list.append([task['exec_time'], task])
-    #print (ready_list)
-
-    schedule = []
-    for i in range(1,sim_time+1):
-        # check if there are tasks to be included in the ready_list
-        for task in task_list:
-            # check if it is time to start another job
-            if ((i % task['period']) == 0):
-                ready_list.append([task['exec_time'], task])
-        # shortest period first
-        ready_list.sort(key=lambda x: x[1]['period'], reverse=False)
-
-        if len(ready_list) ==0:
-            schedule.append('idle')
-            # skip this OS tick
-            continue
-        # top task gain access to the cpu
-        schedule.append(ready_list[0][1]['name'])
-        # decrement computation time of the top job
-        ready_list[0][0] -= 1
-        # check if there are jobs to be included in the ready_list
-        for job in ready_list:
-            # check if the job finished, then delete the top of the list
-            if job[0] == 0:
-               del ready_list[0]
-
-    if verbose:
-        print (schedule)
-
-    # artificially including a new task called idle to track the CPU idle time
-    task_list.append(
-        dict(
-            name= 'idle',
-            exec_time= 1,
-            deadline= 1,
-            period= 1,
-        )
-    )
-
-    sched = sched_list_2_sched_dict(task_list,schedule,verbose)
 
-    return sched
\ No newline at end of file
+    try:
+        task_set = TaskSet(task_list, overheads=overheads)
+        if verbose and policy != 'rm':
+            print ("priority levels:", dict((task['name'], level) for task, level in zip(task_list, task_set.priorities(policy))))
+        return schedule(task_set, 'rms', sim_time, engine, horizon, max_sim_time, metrics, keep_sched=keep_sched, policy=policy,
+            profiler=profiler, checkpoints=checkpoints, verbose=True)
+    except NotSchedulableError:
+        if policy == 'rm':
+            print("Aborting execution of RMS algorithm since this task set is not schedulable for RMS.")
+        else:
+            print("Aborting execution of RMS algorithm since this task set is not schedulable with the %s priorities." % policy.upper())
+    except SchedError as exc:
+        print ("ERROR:", exc)
+    sys.exit(1)
@@ -3,9 +3,42 @@ import argparse
 import pprint
 import sys
 # supported algorithms
-from rms import rms
+from rms import rms, assign_priorities, PRIORITY_POLICIES
 from edf import edf
+from multicore import multicore_sched
 from common import plot_gantt
+from common import SchedCheckpoints, overhead_error
+from sched_file import save_sched, save_checkpoints, checkpoint_file_name
+from profiler import PhaseProfiler, profile_phase
+from sched_cache import SchedCache, cache_key, DEFAULT_CACHE_DIR
+
+def print_metrics(metrics):
+    """Print the timing metrics of a schedule as a table.
+
+    :param metrics: The metrics, as returned by :meth:`SchedMetrics.summary`.
+    :type  metrics: Dictionary.
+    :return: None.
+    """
+    print ("%-12s %6s %6s %9s %6s %9s %9s %11s" % ('task', 'jobs', 'bcrt', 'avg_rt', 'wcrt', 'rel_jit', 'fin_jit', 'preemptions'))
+    for task in metrics['tasks']:
+        print ("%-12s %6d %6d %9.2f %6d %9d %9d %11d" % (task['name'], task['jobs'], task['bcrt'], task['avg_rt'], 
+            task['wcrt'], task['release_jitter'], task['finish_jitter'], task['preemptions']))
+    print ("CPU idle ratio: %.4f" % metrics['idle_ratio'])
+    if metrics.get('overhead_ratio', 0.0) > 0:
+        print ("CPU overhead ratio: %.4f" % metrics['overhead_ratio'])
+
+def print_profile(report):
+    """Print the profiling results as a table.
+
+    :param report: The profiling results, as returned by :meth:`PhaseProfiler.report`.
+    :type  report: Dictionary.
+    :return: None.
+    """
+    print ("%-12s %10s %10s %14s" % ('phase', 'wall (s)', 'cpu (s)', 'peak memory'))
+    for phase in report['phases']:
+        print ("%-12s %10.4f %10.4f %14s" % (phase['name'], phase['wall_time'], phase['cpu_time'], phase.get('peak_memory', '-')))
+    for name, value in report['throughput'].items():
+        print ("%s: %.0f" % (name, value))
 
 def main():
     """Executes a task scheduling for a givin algorithm. 
@@ -26,31 +59,102 @@ def main():
                         help='input file describing the tasks to be scheduled'
                         )
     parser.add_argument('--ofile', type=argparse.FileType('w'),
-                        help='output file with the resulting schedule. If not defined, it will not be saved in a file'
+                        help='output file with the resulting schedule. Files with the .sched extension use the binary format, the others use YAML. If not defined, it will not be saved in a file'
                         )
     parser.add_argument('-s','--simtime', dest='sim_time', default=0, type=int,
                 help='The number of OS ticks to be simulated.')
+    parser.add_argument('--horizon', default='hyperperiod', choices=['hyperperiod', 'busy'],
+                help='simulation time when --simtime is not defined. hyperperiod is the LCM of the periods, busy is the first busy period (default: %(default)s)')
+    parser.add_argument('--max-simtime', dest='max_sim_time', default=0, type=int,
+                help='The maximum number of OS ticks to be simulated. Zero means no limit.')
     parser.add_argument('-v','--verbose', dest='verbose', action='store_true', default=False)
     parser.add_argument('--sched',
                         default='rms',
                         nargs='?',
                         choices=['rms', 'edf'],
                         help='list of supported task scheduling algoritms (default: %(default)s)')
+    parser.add_argument('--priority', default='rm', choices=PRIORITY_POLICIES,
+                        help='fixed priority assignment of rms. rm is rate monotonic, dm is deadline monotonic, explicit uses the priority field of each task (lower first) and opa is the optimal assignment of Audsley. Requires a single core (default: %(default)s)')
+    parser.add_argument('--engine',
+                        default='event',
+                        choices=['event', 'tick'],
+                        help='simulation engine. event jumps between job releases and completions, tick simulates every OS tick (default: %(default)s)')
+
+    parser.add_argument('-c','--cores', default=1, type=int,
+                        help='The number of cores (default: %(default)s).')
+    parser.add_argument('--multicore', default='partitioned', choices=['partitioned', 'global'],
+                        help='multicore scheduling mode (default: %(default)s)')
+    parser.add_argument('--heuristic', default='first-fit', choices=['first-fit', 'worst-fit'],
+                        help='bin-packing heuristic of the partitioned mode. The tasks are sorted by decreasing utilization (default: %(default)s)')
+    parser.add_argument('--metrics', action='store_true', default=False,
+                        help='print the response time, jitter and preemptions of each task, and include them in the output file')
+    parser.add_argument('--plot-mode', dest='plot_mode', default='auto', choices=['auto', 'timeline', 'large'],
+                        help='gantt chart mode. large uses a numeric x axis and merges each task into a single trace (default: %(default)s)')
+    parser.add_argument('--profile', default=None,
+                        help='output JSON file with the wall time and CPU time of each phase, and the simulated ticks and jobs per second')
+    parser.add_argument('--profile-memory', dest='profile_memory', action='store_true', default=False,
+                        help='measure also the peak memory of each phase with tracemalloc. It slows down the run, so the times are not comparable with the ones of a run without it. Requires --profile')
+    parser.add_argument('--cprofile', default=None,
+                        help='output file with the cProfile statistics of the phase selected by --cprofile-phase. Requires --profile')
+    parser.add_argument('--cprofile-phase', dest='cprofile_phase', default='simulate',
+                        choices=['parse', 'cache', 'check', 'analysis', 'horizon', 'simulate', 'convert', 'save', 'plot'],
+                        help='phase profiled by cProfile (default: %(default)s)')
+    parser.add_argument('--cache', action='store_true', default=False,
+                        help='look up the schedule in the result cache, and store it there after the simulation')
+    parser.add_argument('--cache-dir', dest='cache_dir', default=DEFAULT_CACHE_DIR,
+                        help='directory of the result cache. It must be writable only by trusted users, since the cached schedules are unpickled (default: %(default)s)')
+    parser.add_argument('--cache-size', dest='cache_size', default=256, type=int,
+                        help='maximum size of the result cache in MB (default: %(default)s)')
+
+    parser.add_argument('--checkpoint-interval', dest='checkpoint_interval', default=0, type=int,
+                        help='record the simulator state every N OS ticks and save it next to --ofile, so show_sched.py can re-simulate any time window. Requires the event engine and a single core. Zero disables the checkpoints (default: %(default)s)')
 
     args = parser.parse_args()
 
+    checkpoints = None
+    if args.checkpoint_interval < 0:
+        print ("ERROR: the checkpoint interval must not be negative. Got", args.checkpoint_interval)
+        sys.exit(1)
+    if args.checkpoint_interval > 0:
+        if args.ofile is None or args.cores > 1 or args.engine != 'event':
+            print ("ERROR: checkpoints require --ofile, a single core and the event engine")
+            sys.exit(1)
+        checkpoints = SchedCheckpoints(args.checkpoint_interval)
+
+    if args.priority != 'rm' and (args.sched != 'rms' or args.cores > 1):
+        print ("ERROR: the priority assignments require rms and a single core")
+        sys.exit(1)
+
+    profiler = None
+    if args.profile is not None:
+        profiler = PhaseProfiler(args.cprofile_phase if args.cprofile is not None else None, args.profile_memory)
+        profiler.info = dict(file=args.file.name, sched=args.sched, engine=args.engine, cores=args.cores,
+            sim_time=args.sim_time, horizon=args.horizon, max_sim_time=args.max_sim_time)
+
     # loading and parsing the YAML file
-    with open(args.file.name) as f:
-        try:
-            docs = yaml.safe_load(f)
-        except yaml.YAMLError as exc:
-            print(exc)
+    with profile_phase(profiler, 'parse'):
+        with open(args.file.name) as f:
+            try:
+                docs = yaml.safe_load(f)
+            except yaml.YAMLError as exc:
+                print(exc)
 
     pp = pprint.PrettyPrinter(indent=4)
     if args.verbose:
         print ('PRINTING THE INPUT CONFIGURATION FILE:')
         pp.pprint(docs)
 
+    # the optional scheduling overheads
+    overheads = docs.get('overheads')
+    if overheads is not None:
+        error = overhead_error(overheads)
+        if error is not None:
+            print ("ERROR:", error)
+            sys.exit(1)
+        if args.cores > 1 or args.engine != 'event' or checkpoints is not None:
+            print ("ERROR: overheads require a single core, the event engine and no checkpoints")
+            sys.exit(1)
+
     # check wheter this yaml file support the selected algorithm
     valid_algo = False
     for algo in docs['algo']:
@@ -62,24 +166,64 @@ def main():
         print ("ERROR: the selected file does not support the selected scheduling algorithm",args.sched)
         sys.exit(1)
 
+    sched = None
+    # a cached schedule has no checkpoints
+    if args.cache and checkpoints is None:
+        cache = SchedCache(args.cache_dir, max_disk_bytes=args.cache_size*2**20)
+        key = cache_key(docs['tasks'], algo=args.sched, sim_time=args.sim_time, engine=args.engine, horizon=args.horizon,
+            max_sim_time=args.max_sim_time, metrics=args.metrics, cores=args.cores, multicore=args.multicore, heuristic=args.heuristic,
+            priority=args.priority, overheads=overheads)
+        with profile_phase(profiler, 'cache'):
+            sched = cache.get(key)
+        print ("cache", "hit" if sched is not None else "miss", key)
+
     # selecting and running the scheduling algorithm
-    if args.sched == 'rms':
-        sched = rms(docs['tasks'], sim_time=args.sim_time, verbose=args.verbose)
+    if sched is not None:
+        # the cached schedule is used
+        pass
+    elif args.cores > 1:
+        sched = multicore_sched(docs['tasks'], args.cores, algo=args.sched, mode=args.multicore, 
+            heuristic=args.heuristic, sim_time=args.sim_time, horizon=args.horizon, 
+            max_sim_time=args.max_sim_time, verbose=args.verbose, profiler=profiler)
+    elif args.sched == 'rms':
+        sched = rms(docs['tasks'], sim_time=args.sim_time, verbose=args.verbose, engine=args.engine,
+            horizon=args.horizon, max_sim_time=args.max_sim_time, metrics=args.metrics, profiler=profiler, checkpoints=checkpoints, policy=args.priority, overheads=overheads)
     elif args.sched == 'edf':
-        sched = edf(docs['tasks'], sim_time=args.sim_time, verbose=args.verbose)
+        sched = edf(docs['tasks'], sim_time=args.sim_time, verbose=args.verbose, engine=args.engine,
+            horizon=args.horizon, max_sim_time=args.max_sim_time, metrics=args.metrics, profiler=profiler, checkpoints=checkpoints,
+            overheads=overheads)
     else:
         print ("ERROR: unsupported scheduling algorithm", args.sched)
         sys.exit(1)
 
+    if args.cache and checkpoints is None and cache.misses > 0:
+        cache.put(key, sched)
+
     if args.verbose:
         print ('PRINTING THE GENERATED SCHEDULING FILE:')
         pp.pprint(sched)
 
+    if args.metrics:
+        if 'metrics' in sched:
+            print_metrics(sched['metrics'])
+        else:
+            print ("WARNING: metrics are supported only for single core schedules")
+
     if args.ofile is not None:
-        with open(args.ofile.name, 'w') as outfile:
-            yaml.dump(sched, outfile, default_flow_style=False)
+        with profile_phase(profiler, 'save'):
+            save_sched(sched, args.ofile.name)
+            if checkpoints is not None:
+                # the assigned levels are always saved, since the 'priority' fields of the
+                # input file are used only by --priority explicit
+                priorities = assign_priorities(docs['tasks'], args.priority) if args.sched == 'rms' else None
+                save_checkpoints(checkpoints, docs['tasks'], args.sched, checkpoint_file_name(args.ofile.name), priorities)
+
+    with profile_phase(profiler, 'plot'):
+        plot_gantt(sched, verbose=args.verbose, mode=args.plot_mode)
 
-    plot_gantt(sched, verbose=args.verbose)
+    if profiler is not None:
+        print_profile(profiler.report())
+        profiler.save(args.profile, args.cprofile)
 
     return sched
 
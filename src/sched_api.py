@@ -0,0 +1,294 @@
+import yaml
+from common import task_list_error, compact_tasks, hyperperiod, busy_period, sched_list_2_sched_dict, sched_segments_2_sched_dict, SchedMetrics, overhead_error, overhead_params, released_jobs
+from profiler import profile_phase
+from rms import rms_is_schedulable, rms_tick_sched, rms_event_sched, assign_priorities, fp_is_schedulable, PRIORITY_POLICIES
+from edf import edf_is_schedulable, edf_tick_sched, edf_event_sched
+from sched_cache import cache_key
+
+# simulator of each (algorithm, engine)
+SIMULATORS = {
+    ('rms', 'event'): rms_event_sched,
+    ('rms', 'tick'): rms_tick_sched,
+    ('edf', 'event'): edf_event_sched,
+    ('edf', 'tick'): edf_tick_sched,
+}
+
+
+class SchedError(Exception):
+    """Base class of the scheduling errors."""
+
+
+class InvalidTaskSetError(SchedError, ValueError):
+    """The task set has missing or invalid fields."""
+
+
+class NotSchedulableError(SchedError):
+    """The task set is not schedulable for the selected algorithm."""
+
+
+class UnsupportedOptionError(SchedError, ValueError):
+    """Unsupported algorithm, priority assignment, simulation engine or horizon."""
+
+
+def _valid_overheads(overheads):
+    """Validate the scheduling overheads and fill in the default values, as in :func:`common.overhead_params`."""
+    if overheads is None:
+        return None
+    error = overhead_error(overheads)
+    if error is not None:
+        raise InvalidTaskSetError(error)
+    return overhead_params(overheads)
+
+
+class TaskSet:
+    """A validated task set, reusable across calls of :func:`schedule`.
+
+    The task descriptors are copied, so later changes in the input list do not
+    affect the task set. The hyperperiod, the priority levels and the schedulability
+    test results are computed once and cached.
+
+    :param task_list: List of task descriptors, in the input YAML format.
+    :type  task_list: List of dictionaries.
+    :param algos: the algorithms supported by the task set, as in the 'algo' field of the input YAML file. If none is defined, all the algorithms are supported.
+    :type  algos: List of str.
+    :param overheads: the scheduling overheads, as in the 'overheads' field of the input YAML file and :func:`common.overhead_error`.
+    :type  overheads: Dictionary.
+    :raises InvalidTaskSetError: if the task list or the overheads are invalid.
+    """
+
+    def __init__(self, task_list, algos=None, overheads=None):
+        error = task_list_error(task_list)
+        if error is not None:
+            raise InvalidTaskSetError(error)
+        self.tasks = tuple(dict(task) for task in task_list)
+        # compact descriptors used by the simulators
+        self.compact = compact_tasks(self.tasks)
+        self.algos = None if algos is None else tuple(algos)
+        self.overheads = _valid_overheads(overheads)
+        self._hyperperiod = None
+        self._priorities = {}
+        self._schedulable = {}
+
+    @classmethod
+    def from_file(cls, file_name):
+        """Load a task set from an input YAML file.
+
+        :param file_name: The input YAML file name.
+        :type  file_name: str
+        :rtype: TaskSet
+        :raises InvalidTaskSetError: if the file could not be parsed or the task list is invalid.
+        """
+        with open(file_name) as f:
+            try:
+                docs = yaml.safe_load(f)
+            except yaml.YAMLError as exc:
+                raise InvalidTaskSetError(str(exc)) from exc
+        if not isinstance(docs, dict) or 'tasks' not in docs:
+            raise InvalidTaskSetError("field 'tasks' not found in %s" % file_name)
+        return cls(docs['tasks'], docs.get('algo'), docs.get('overheads'))
+
+    def __len__(self):
+        return len(self.tasks)
+
+    @property
+    def hyperperiod(self):
+        """The LCM of the task periods."""
+        if self._hyperperiod is None:
+            self._hyperperiod = hyperperiod(self.tasks)
+        return self._hyperperiod
+
+    def overhead_params(self, overheads=None):
+        """Scheduling overheads with the default values filled in, as in :func:`common.overhead_params`.
+
+        :param overheads: the overheads. If none is defined, the ones of the task set are used.
+        :type  overheads: Dictionary.
+        :return: The overheads, or None if they cost nothing.
+        :rtype: Dictionary.
+        :raises InvalidTaskSetError: if the overheads are invalid.
+        """
+        if overheads is None:
+            return self.overheads
+        return _valid_overheads(overheads)
+
+    def priorities(self, policy='rm'):
+        """Fixed priority level of each task, as in :func:`rms.assign_priorities`.
+
+        :param policy: 'rm', 'dm', 'explicit' or 'opa'.
+        :type  policy: str
+        :return: The priority level of each task, or None if the 'opa' policy finds no feasible assignment.
+        :rtype: List of int.
+        :raises UnsupportedOptionError: if the policy is not supported.
+        :raises InvalidTaskSetError: if a task has no 'priority' field with the 'explicit' policy.
+        """
+        if policy not in PRIORITY_POLICIES:
+            raise UnsupportedOptionError("unsupported priority policy %s" % policy)
+        if policy not in self._priorities:
+            try:
+                self._priorities[policy] = assign_priorities(self.tasks, policy)
+            except ValueError as exc:
+                raise InvalidTaskSetError(str(exc)) from exc
+        return self._priorities[policy]
+
+    def is_schedulable(self, algo, policy='rm', overheads=None, verbose=False):
+        """Schedulability test of the algorithm, as in :func:`rms.rms_is_schedulable`, :func:`rms.fp_is_schedulable` and :func:`edf.edf_is_schedulable`.
+
+        :param algo: 'rms' or 'edf'.
+        :type  algo: str
+        :param policy: priority assignment of rms, as in :meth:`priorities`.
+        :type  policy: str
+        :param overheads: the scheduling overheads. If none is defined, the ones of the task set are used.
+        :type  overheads: Dictionary.
+        :param verbose: If True, the test results are printed. The cached results are not printed again.
+        :type  verbose: bool
+        :rtype: bool
+        :raises UnsupportedOptionError: if the algorithm or the policy is not supported.
+        :raises InvalidTaskSetError: if the overheads are invalid.
+        """
+        overheads = self.overhead_params(overheads)
+        key = (algo, policy, None if overheads is None else tuple(sorted(overheads.items())))
+        if key not in self._schedulable:
+            if algo == 'rms':
+                if policy == 'rm' and overheads is None:
+                    self._schedulable[key] = rms_is_schedulable(self.tasks, verbose=verbose)
+                else:
+                    priorities = self.priorities(policy)
+                    if priorities is None and verbose:
+                        print("ERROR: no fixed priority assignment meets all the deadlines.")
+                    self._schedulable[key] = priorities is not None and fp_is_schedulable(self.tasks, priorities, verbose=verbose, overheads=overheads)
+            elif algo == 'edf':
+                if policy != 'rm':
+                    raise UnsupportedOptionError("the priority assignments require rms")
+                self._schedulable[key] = edf_is_schedulable(self.tasks, overheads)
+            else:
+                raise UnsupportedOptionError("unsupported scheduling algorithm %s" % algo)
+        return self._schedulable[key]
+
+    def sim_time(self, sim_time=0, horizon='hyperperiod', max_sim_time=0):
+        """Number of OS ticks to be simulated, as in :func:`common.sim_horizon`.
+
+        :param sim_time: Time for simulation. If zero, it is defined by the horizon argument.
+        :type  sim_time: int
+        :param horizon: 'hyperperiod' or 'busy'.
+        :type  horizon: str
+        :param max_sim_time: Maximum simulation time. Zero means no limit.
+        :type  max_sim_time: int
+        :rtype: int
+        :raises UnsupportedOptionError: if the horizon is not supported.
+        """
+        if sim_time == 0:
+            if horizon == 'hyperperiod':
+                sim_time = self.hyperperiod
+            elif horizon == 'busy':
+                sim_time = busy_period(self.tasks, limit=self.hyperperiod)
+            else:
+                raise UnsupportedOptionError("unsupported simulation horizon %s" % horizon)
+        if max_sim_time > 0 and sim_time > max_sim_time:
+            sim_time = max_sim_time
+        return int(sim_time)
+
+
+def schedule(task_set, algo='rms', sim_time=0, engine='event', horizon='hyperperiod', max_sim_time=0, metrics=False, cache=None, keep_sched=True,
+        policy='rm', overheads=None, profiler=None, checkpoints=None, verbose=False):
+    """Simulates the RMS or EDF scheduling algorithm.
+
+    It never exits and does not change its inputs, and it prints nothing unless verbose
+    is set. The errors are reported with the exceptions of this module. :func:`rms.rms` 
+    and :func:`edf.edf` wrap it for the command line tools.
+
+    :param task_set: The task set. A list of task descriptors is validated on every call, so reuse a TaskSet when possible.
+    :type  task_set: TaskSet or List of dictionaries.
+    :param algo: 'rms' or 'edf'.
+    :type  algo: str
+    :param sim_time: Time for simulation. If none is defined, then it is defined by the horizon argument.
+    :type  sim_time: int
+    :param engine: Simulation engine, 'event' or 'tick'.
+    :type  engine: str
+    :param horizon: Simulation time when sim_time is not defined, 'hyperperiod' or 'busy'.
+    :type  horizon: str
+    :param max_sim_time: Maximum simulation time. Zero means no limit.
+    :type  max_sim_time: int
+    :param metrics: If True, the timing metrics of each task are included in sched['metrics'].
+    :type  metrics: bool
+    :param cache: If defined, the schedules are looked up and stored in this cache.
+    :type  cache: :class:`sched_cache.SchedCache`
+    :param keep_sched: If False, the schedule is not built, and the result has only the timing metrics of each task, in sched['metrics'].
+    :type  keep_sched: bool
+    :param policy: priority assignment of rms, 'rm', 'dm', 'explicit' or 'opa', as in :func:`rms.assign_priorities`.
+    :type  policy: str
+    :param overheads: the scheduling overheads, charged as 'overhead' jobs. If none is defined, the ones of the task set are used. Requires the event engine.
+    :type  overheads: Dictionary.
+    :param profiler: If defined, it measures the analysis, horizon, simulate and convert phases and counts the simulated ticks and jobs.
+    :type  profiler: :class:`profiler.PhaseProfiler`
+    :param checkpoints: If defined, the simulator state is recorded in it periodically, so any time window can be re-simulated with :func:`common.event_sched_window`. Requires the event engine and no overheads. The cache is not used.
+    :type  checkpoints: :class:`common.SchedCheckpoints`
+    :param verbose: If True, the schedulability test results and the simulation time are printed.
+    :type  verbose: bool
+
+    :return: sched
+    :rtype: schedule list for each task (List of dictionaries).
+    :raises InvalidTaskSetError: if the task list or the overheads are invalid, or a task has no priority with the 'explicit' policy.
+    :raises UnsupportedOptionError: if the algorithm, the policy, the engine or the horizon is not supported, the task set does not support the algorithm, or the checkpoints are not supported.
+    :raises NotSchedulableError: if the task set is not schedulable for the algorithm.
+    """
+    if not isinstance(task_set, TaskSet):
+        task_set = TaskSet(task_set)
+    if (algo, engine) not in SIMULATORS:
+        raise UnsupportedOptionError("unsupported scheduling algorithm %s or simulation engine %s" % (algo, engine))
+    if task_set.algos is not None and algo not in task_set.algos:
+        raise UnsupportedOptionError("the task set does not support the scheduling algorithm %s" % algo)
+    overheads = task_set.overhead_params(overheads)
+    if overheads is not None and engine != 'event':
+        raise UnsupportedOptionError("overheads are supported only by the event engine")
+    if checkpoints is not None and (engine != 'event' or overheads is not None):
+        raise UnsupportedOptionError("checkpoints are supported only by the event engine, without overheads")
+    with profile_phase(profiler, 'analysis'):
+        schedulable = task_set.is_schedulable(algo, policy, overheads, verbose)
+    if not schedulable:
+        if policy != 'rm':
+            raise NotSchedulableError("the task set is not schedulable with the %s priorities" % policy.upper())
+        raise NotSchedulableError("the task set is not schedulable for %s" % algo.upper())
+    with profile_phase(profiler, 'horizon'):
+        sim_time = task_set.sim_time(sim_time, horizon, max_sim_time)
+    if verbose:
+        print ("The simulation time is:", sim_time)
+    # a cached schedule has no checkpoints
+    if checkpoints is not None:
+        cache = None
+    if cache is not None:
+        key = cache_key(task_set.tasks, algo=algo, sim_time=sim_time, engine=engine, metrics=metrics, keep_sched=keep_sched,
+            priority=policy, overheads=overheads)
+        sched = cache.get(key)
+        if sched is not None:
+            return sched
+
+    compact = task_set.compact
+    if policy != 'rm':
+        compact = compact_tasks(task_set.tasks, task_set.priorities(policy))
+    collector = SchedMetrics(compact) if metrics or not keep_sched else None
+    with profile_phase(profiler, 'simulate'):
+        if engine == 'event':
+            sim_sched = SIMULATORS[(algo, engine)](compact, sim_time, collector, checkpoints, task_ids=True, overheads=overheads,
+                keep_sched=keep_sched)
+        else:
+            sim_sched = SIMULATORS[(algo, engine)](compact, sim_time, collector, task_ids=True, keep_sched=keep_sched)
+    if profiler is not None:
+        profiler.count('ticks', sim_time)
+        profiler.count('jobs', released_jobs(compact, sim_time))
+
+    if not keep_sched:
+        sched = dict(metrics=collector.summary())
+    else:
+        # the idle task tracks the CPU idle time, and the overhead task the scheduling overheads
+        tasks = list(task_set.tasks) + [dict(name='idle', exec_time=1, deadline=1, period=1)]
+        if overheads is not None:
+            tasks.append(dict(name='overhead', exec_time=1, deadline=1, period=1))
+        with profile_phase(profiler, 'convert'):
+            if engine == 'event':
+                sched = sched_segments_2_sched_dict(tasks, sim_sched)
+            else:
+                sched = sched_list_2_sched_dict(tasks, sim_sched)
+            if collector is not None:
+                sched['metrics'] = collector.summary()
+    if cache is not None:
+        cache.put(key, sched)
+    return sched
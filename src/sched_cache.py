@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import pickle
+from collections import OrderedDict
+
+# default directory of the on-disk store
+DEFAULT_CACHE_DIR = os.environ.get('YATSS_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'yatss'))
+# modules whose source code is part of the cache key, so the cached results
+# are discarded when the simulators change
+KEY_MODULES = ['common.py', 'rms.py', 'edf.py', 'multicore.py', 'sched_api.py']
+
+
+def code_version():
+    """Hash of the source code of the simulators.
+
+    :return: hexadecimal digest.
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    for module in KEY_MODULES:
+        with open(os.path.join(src_dir, module), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+CODE_VERSION = code_version()
+
+
+def cache_key(task_list, **params):
+    """Canonical hash of a task set and the simulation parameters.
+
+    The fields of each task are sorted, but the order of the tasks is kept, since
+    it breaks the priority ties.
+
+    :param task_list: List of task descriptors.
+    :type  task_list: List of dictionaries.
+    :param params: simulation parameters, e.g. algo, sim_time, engine.
+    :return: hexadecimal digest.
+    :rtype: str
+
+    :Example:
+
+        >>> cache_key(tasks, algo='rms', sim_time=0, engine='event')
+    """
+    content = json.dumps([CODE_VERSION, list(task_list), params], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class SchedCache:
+    """Cache of schedules and analysis results, addressed by :func:`cache_key`.
+
+    An in-memory LRU stands in front of an on-disk store. The values are stored
+    pickled, so the callers always get a new copy. When the on-disk store exceeds
+    max_disk_bytes, the least recently used files are removed.
+    Several processes can share the same directory.
+
+    Loading a pickle file can run arbitrary code, so the directory must be writable
+    only by trusted users, like the default one in the user's home.
+
+    :param directory: directory of the on-disk store. If None, only the in-memory LRU is used.
+    :type  directory: str
+    :param max_entries: maximum number of values in memory.
+    :type  max_entries: int
+    :param max_disk_bytes: maximum size of the on-disk store.
+    :type  max_disk_bytes: int
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_entries=128, max_disk_bytes=256*2**20):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pickle')
+
+    def get(self, key, default=None):
+        """Look up a value.
+
+        :param key: key returned by :func:`cache_key`.
+        :type  key: str
+        :param default: value returned on a miss.
+        :return: a copy of the cached value, or default.
+        """
+        data = self.memory.get(key)
+        if data is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return pickle.loads(data)
+        if self.directory is not None:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    data = f.read()
+                # the access time drives the eviction
+                os.utime(self._path(key))
+            except OSError:
+                data = None
+            if data is not None:
+                self._remember(key, data)
+                self.hits += 1
+                self.disk_hits += 1
+                return pickle.loads(data)
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        """Store a value.
+
+        :param key: key returned by :func:`cache_key`.
+        :type  key: str
+        :param value: any picklable value.
+        :return: None.
+        """
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._remember(key, data)
+        if self.directory is not None:
+            # write and rename, so other processes never read partial files
+            tmp_file = '%s.%d.tmp' % (self._path(key), os.getpid())
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_file, self._path(key))
+            self._evict()
+
+    def _remember(self, key, data):
+        self.memory[key] = data
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def _evict(self):
+        """Remove the least recently used files of the on-disk store above max_disk_bytes."""
+        files = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pickle'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """Remove all the values from memory and disk.
+
+        :return: None.
+        """
+        self.memory.clear()
+        if self.directory is not None:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.pickle'):
+                    os.remove(entry.path)
+
+    def stats(self):
+        """Hit and miss counters.
+
+        :return: Dictionary with the number of hits (in memory or on disk), disk hits and misses.
+        :rtype: Dictionary.
+        """
+        return dict(hits=self.hits, disk_hits=self.disk_hits, misses=self.misses)
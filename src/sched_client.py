@@ -0,0 +1,118 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+import numpy as np
+
+
+async def open_connection(socket_path=None, port=8765):
+    """Connect to the scheduling analysis service.
+
+    :param socket_path: Unix socket path. If none is defined, the service on 127.0.0.1 is used.
+    :type  socket_path: str
+    :param port: TCP port, used when socket_path is not defined.
+    :type  port: int
+    :return: Tuple (reader, writer).
+    """
+    if socket_path is not None:
+        return await asyncio.open_unix_connection(socket_path)
+    return await asyncio.open_connection('127.0.0.1', port)
+
+
+async def query(reader, writer, request):
+    """Send a request and wait for its response.
+
+    :param request: the request, as in :func:`sched_server.handle_request`.
+    :type  request: Dictionary.
+    :return: The response.
+    :rtype: Dictionary.
+    """
+    writer.write(json.dumps(request).encode() + b'\n')
+    await writer.drain()
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("the service closed the connection")
+    return json.loads(line)
+
+
+async def run_client(request, num_requests, socket_path, port, latencies, errors):
+    """Send num_requests requests, one at a time, and record their latencies."""
+    reader, writer = await open_connection(socket_path, port)
+    try:
+        for idx in range(num_requests):
+            request['id'] = idx
+            start = time.perf_counter()
+            response = await query(reader, writer, request)
+            latencies.append(time.perf_counter() - start)
+            if not response['ok']:
+                errors.append(response['error'])
+    finally:
+        writer.close()
+
+
+async def benchmark(request, num_requests, connections, socket_path=None, port=8765):
+    """Send the same request many times over concurrent connections.
+
+    :param request: the request.
+    :type  request: Dictionary.
+    :param num_requests: total number of requests.
+    :type  num_requests: int
+    :param connections: number of concurrent connections.
+    :type  connections: int
+    :return: Dictionary with the number of requests, errors, requests/sec and the p50 and p99 latency in milliseconds.
+    :rtype: Dictionary.
+    """
+    latencies = []
+    errors = []
+    per_connection = [num_requests // connections + (idx < num_requests % connections) for idx in range(connections)]
+    start = time.perf_counter()
+    await asyncio.gather(*[run_client(dict(request), count, socket_path, port, latencies, errors)
+        for count in per_connection if count > 0])
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000.0
+    return dict(requests=len(latencies), errors=len(errors), requests_per_sec=len(latencies)/elapsed,
+        p50_ms=float(np.percentile(latencies, 50)), p99_ms=float(np.percentile(latencies, 99)),
+        first_error=errors[0] if errors else None)
+
+
+def main():
+    """Benchmark client of the scheduling analysis service.
+
+    It sends the task set of the input YAML file many times over concurrent
+    connections and reports the requests per second and the latency percentiles.
+
+    :return: None.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('file', type=argparse.FileType('r'),
+                        help='input file describing the tasks to be analyzed')
+    parser.add_argument('--socket', dest='socket_path', default=None,
+                help='Unix socket path. If not defined, the service on 127.0.0.1 is used')
+    parser.add_argument('--port', default=8765, type=int,
+                help='TCP port on 127.0.0.1 (default: %(default)s)')
+    parser.add_argument('--op', default='analyze', choices=['analyze', 'metrics', 'schedule'],
+                help='requested operation (default: %(default)s)')
+    parser.add_argument('--sched', default='rms', choices=['rms', 'edf'],
+                help='scheduling algorithm (default: %(default)s)')
+    parser.add_argument('-n','--requests', dest='num_requests', default=1000, type=int,
+                help='total number of requests (default: %(default)s)')
+    parser.add_argument('-c','--connections', default=16, type=int,
+                help='number of concurrent connections (default: %(default)s)')
+
+    args = parser.parse_args()
+
+    if args.num_requests < 1 or args.connections < 1:
+        print ("ERROR: the number of requests and connections must be positive.")
+        sys.exit(1)
+
+    request = dict(op=args.op, algo=args.sched, yaml=args.file.read())
+    result = asyncio.run(benchmark(request, args.num_requests, args.connections, args.socket_path, args.port))
+    print ("requests: %d, errors: %d" % (result['requests'], result['errors']))
+    if result['first_error'] is not None:
+        print ("first error:", result['first_error'])
+    print ("requests/sec: %.1f" % result['requests_per_sec'])
+    print ("latency p50: %.3f ms, p99: %.3f ms" % (result['p50_ms'], result['p99_ms']))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import json
+import os
+import numpy as np
+import yaml
+from common import SchedCheckpoints
+
+# first bytes of a binary schedule file
+SCHED_MAGIC = b'YATSSCH1'
+# extension of the binary schedule files
+SCHED_BIN_EXT = '.sched'
+# extension appended to the schedule file name to get its checkpoint file
+CHECKPOINT_EXT = '.ckpt'
+
+
+def save_sched_bin(sched, file_name):
+    """Save a schedule in the binary schedule format.
+
+    The file starts with SCHED_MAGIC, followed by the header length (uint64) and
+    a JSON header with the title, the metrics (if any) and the name, color, number 
+    of jobs and offsets of each task. Then, for each task, it has the array of job start
+    times followed by the array of job end times, both little-endian int64.
+    The arrays are aligned to 8 bytes, so they can be memory-mapped.
+
+    :param sched: The schedule, as returned by the scheduling algorithms.
+    :type  sched: Dictionary.
+    :param file_name: The output file name.
+    :type  file_name: str
+    :return: None.
+    """
+    tasks = []
+    arrays = []
+    offset = 0
+    for task in sched['sched']:
+        jobs = np.asarray(task['jobs'], dtype='<i8').reshape(-1, 2)
+        tasks.append(dict(name=task['name'], color=task.get('color', 'blue'),
+            jobs=len(jobs), starts=offset, ends=offset + 8*len(jobs)))
+        if 'core' in task:
+            tasks[-1]['core'] = task['core']
+        arrays.append(jobs)
+        offset += 16*len(jobs)
+
+    header = dict(title=sched.get('title', ''), tasks=tasks)
+    if 'metrics' in sched:
+        header['metrics'] = sched['metrics']
+    header = json.dumps(header).encode()
+    # pad the header so the arrays are aligned to 8 bytes
+    header += b' ' * (-(len(SCHED_MAGIC) + 8 + len(header)) % 8)
+    with open(file_name, 'wb') as f:
+        f.write(SCHED_MAGIC)
+        f.write(np.uint64(len(header)).astype('<u8').tobytes())
+        f.write(header)
+        for jobs in arrays:
+            np.ascontiguousarray(jobs[:, 0]).tofile(f)
+            np.ascontiguousarray(jobs[:, 1]).tofile(f)
+
+
+def load_sched_bin(file_name, start=None, end=None):
+    """Load a schedule saved in the binary schedule format.
+
+    The job arrays are memory-mapped, so only the parts of the file covering
+    the selected time window are read.
+
+    :param file_name: The schedule file name.
+    :type  file_name: str
+    :param start: Only the jobs running at or after this time are loaded. If none is defined, the schedule beginning is used.
+    :type  start: int
+    :param end: Only the jobs starting before this time are loaded. If none is defined, the schedule end is used.
+    :type  end: int
+    :return: The schedule, in the same format of the schedule YAML file, or None if the file format is invalid.
+    :rtype: Dictionary.
+    """
+    with open(file_name, 'rb') as f:
+        if f.read(len(SCHED_MAGIC)) != SCHED_MAGIC:
+            print ("ERROR: invalid binary schedule file", file_name)
+            return None
+        header_len = int(np.frombuffer(f.read(8), dtype='<u8')[0])
+        header = json.loads(f.read(header_len))
+    data_offset = len(SCHED_MAGIC) + 8 + header_len
+
+    data = None
+    if os.path.getsize(file_name) > data_offset:
+        data = np.memmap(file_name, dtype='<i8', mode='r', offset=data_offset)
+
+    sched = {}
+    sched['title'] = header['title']
+    if 'metrics' in header:
+        sched['metrics'] = header['metrics']
+    sched['sched'] = []
+    for task in header['tasks']:
+        sched_task = {}
+        sched_task['name'] = task['name']
+        sched_task['color'] = task['color']
+        if 'core' in task:
+            sched_task['core'] = task['core']
+        sched_task['jobs'] = []
+        num_jobs = task['jobs']
+        if num_jobs > 0:
+            starts = data[task['starts']//8 : task['starts']//8 + num_jobs]
+            ends = data[task['ends']//8 : task['ends']//8 + num_jobs]
+            first, last = job_window(starts, ends, start, end)
+            sched_task['jobs'] = np.stack((starts[first:last], ends[first:last]), axis=1).tolist()
+        sched['sched'].append(sched_task)
+    return sched
+
+
+def job_window(starts, ends, start=None, end=None):
+    """Range of jobs overlapping a time window.
+
+    The jobs of a task are [start, end) intervals that never overlap and are sorted
+    by start time, so the window is found by binary search.
+
+    :param starts: start time of the jobs.
+    :type  starts: numpy array of int.
+    :param ends: end time of the jobs.
+    :type  ends: numpy array of int.
+    :param start: window start. If None, the window starts with the first job.
+    :type  start: int
+    :param end: window end. If None, the window ends with the last job.
+    :type  end: int
+    :return: The index of the first job in the window and the index after the last one.
+    :rtype: tuple of int.
+    """
+    first = 0
+    last = len(starts)
+    if start is not None:
+        first = int(np.searchsorted(starts, start, side='right'))
+        # the previous job may still be running at the window start
+        if first > 0 and ends[first-1] > start:
+            first -= 1
+    if end is not None:
+        last = max(first, int(np.searchsorted(starts, end, side='left')))
+    return first, last
+
+
+def is_sched_bin(file_name):
+    """Check whether a file name refers to the binary schedule format.
+
+    :param file_name: The schedule file name.
+    :type  file_name: str
+    :rtype: bool
+    """
+    return os.path.splitext(file_name)[1] == SCHED_BIN_EXT
+
+
+def save_sched(sched, file_name):
+    """Save a schedule in the format selected by the file extension.
+
+    Files with the SCHED_BIN_EXT extension use the binary schedule format,
+    the others use YAML.
+
+    :param sched: The schedule, as returned by the scheduling algorithms.
+    :type  sched: Dictionary.
+    :param file_name: The output file name.
+    :type  file_name: str
+    :return: None.
+    """
+    if is_sched_bin(file_name):
+        save_sched_bin(sched, file_name)
+    else:
+        with open(file_name, 'w') as outfile:
+            yaml.dump(sched, outfile, default_flow_style=False)
+
+
+def load_sched(file_name, start=None, end=None):
+    """Load a schedule in the format selected by the file extension.
+
+    :param file_name: The schedule file name.
+    :type  file_name: str
+    :param start: Only the jobs running at or after this time are loaded. If none is defined, the schedule beginning is used.
+    :type  start: int
+    :param end: Only the jobs starting before this time are loaded. If none is defined, the schedule end is used.
+    :type  end: int
+    :return: The schedule, or None if the file could not be parsed.
+    :rtype: Dictionary.
+    """
+    if is_sched_bin(file_name):
+        return load_sched_bin(file_name, start, end)
+
+    # loading and parsing the YAML file
+    with open(file_name) as f:
+        try:
+            sched = yaml.safe_load(f)
+        except yaml.YAMLError as exc:
+            print(exc)
+            return None
+    if start is not None or end is not None:
+        for task in sched['sched']:
+            starts = np.array([job[0] for job in task['jobs']], dtype=np.int64)
+            ends = np.array([job[1] for job in task['jobs']], dtype=np.int64)
+            first, last = job_window(starts, ends, start, end)
+            task['jobs'] = task['jobs'][first:last]
+    return sched
+
+
+def checkpoint_file_name(file_name):
+    """Name of the checkpoint file saved next to a schedule file.
+
+    :param file_name: The schedule file name.
+    :type  file_name: str
+    :rtype: str
+    """
+    return file_name + CHECKPOINT_EXT
+
+
+def save_checkpoints(checkpoints, task_list, algo, file_name, priorities=None):
+    """Save the simulator checkpoints of a schedule in a JSON file.
+
+    The file has the scheduling algorithm, the task list and the checkpoints,
+    so any time window of the schedule can be re-simulated without the input file.
+
+    :param checkpoints: The checkpoints recorded by the simulator.
+    :type  checkpoints: :class:`common.SchedCheckpoints`
+    :param task_list: List of task descriptors. The idle task is not saved.
+    :type  task_list: List of dictionaries.
+    :param algo: The scheduling algorithm, 'rms' or 'edf'.
+    :type  algo: str
+    :param file_name: The checkpoint file name, usually :func:`checkpoint_file_name` of the schedule file.
+    :type  file_name: str
+    :param priorities: The fixed priority levels of rms, as returned by :func:`rms.assign_priorities`. They are saved
+        as the 'priority' field of each task, replacing the one of the input file.
+    :type  priorities: List of int.
+    :return: None.
+    """
+    task_list = [task for task in task_list if task['name'] != 'idle']
+    if priorities is not None:
+        task_list = [dict(task, priority=level) for task, level in zip(task_list, priorities)]
+    data = dict(algo=algo, tasks=task_list)
+    data.update(checkpoints.to_dict())
+    with open(file_name, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+
+
+def load_checkpoints(file_name):
+    """Load the simulator checkpoints saved by :func:`save_checkpoints`.
+
+    :param file_name: The checkpoint file name.
+    :type  file_name: str
+    :return: The scheduling algorithm, the task list and the checkpoints, or None if the file could not be parsed.
+    :rtype: tuple
+    """
+    with open(file_name) as f:
+        try:
+            data = json.load(f)
+            return data['algo'], data['tasks'], SchedCheckpoints.from_dict(data)
+        except (ValueError, KeyError) as exc:
+            print ("ERROR: invalid checkpoint file", file_name, exc)
+            return None
@@ -0,0 +1,288 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import yaml
+# the service uses only the library API, so plotly and pandas are never imported
+from sched_api import TaskSet, SchedError, schedule
+from sched_cache import SchedCache
+from rms import fp_overhead_response_times
+
+# operations of the service
+SERVER_OPS = ['analyze', 'metrics', 'schedule']
+# schedules cached by each worker process
+_worker_cache = None
+# task sets parsed by each worker process, by hash of the YAML document
+_task_sets = OrderedDict()
+# maximum number of parsed task sets of each worker process
+MAX_TASK_SETS = 256
+# the C YAML parser is much faster, when available
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def parse_task_set(text):
+    """Parse a task set in the input YAML format, reusing the recently parsed ones.
+
+    :param text: content of the input YAML file. JSON is also accepted.
+    :type  text: str
+    :rtype: :class:`sched_api.TaskSet`
+    """
+    key = hashlib.sha256(text.encode()).digest()
+    task_set = _task_sets.get(key)
+    if task_set is None:
+        docs = yaml.load(text, Loader=YAML_LOADER)
+        if not isinstance(docs, dict) or 'tasks' not in docs:
+            raise ValueError("field 'tasks' not found in the YAML document")
+        task_set = TaskSet(docs['tasks'], docs.get('algo'), docs.get('overheads'))
+        _task_sets[key] = task_set
+        if len(_task_sets) > MAX_TASK_SETS:
+            _task_sets.popitem(last=False)
+    else:
+        _task_sets.move_to_end(key)
+    return task_set
+
+
+def handle_request(request):
+    """Process a single request. Runs in the worker processes.
+
+    The request is a dictionary with the fields:
+
+    * op: 'analyze' returns the schedulability verdict, the utilization and, for RMS,
+      the response time of each task; 'metrics' returns the timing metrics of the
+      simulated schedule; 'schedule' returns the schedule;
+    * algo: 'rms' or 'edf' (default: rms);
+    * tasks: the task list, as in the input YAML file, or yaml: the content of the input YAML file;
+    * sim_time, engine, horizon, max_sim_time, policy and overheads: as in :func:`sched_api.schedule`.
+      The overheads of the request replace the ones of the YAML file.
+
+    :param request: the request.
+    :type  request: Dictionary.
+    :return: The response, with ok=True and the results, or ok=False and the error.
+    :rtype: Dictionary.
+    """
+    global _worker_cache
+    if _worker_cache is None:
+        _worker_cache = SchedCache(directory=None)
+    response = dict(id=request.get('id'))
+    try:
+        op = request.get('op', 'analyze')
+        algo = request.get('algo', 'rms')
+        policy = request.get('policy', 'rm')
+        overheads = request.get('overheads')
+        if op not in SERVER_OPS:
+            raise ValueError("unsupported operation %s" % op)
+        if 'yaml' in request:
+            task_set = parse_task_set(request['yaml'])
+        else:
+            task_set = TaskSet(request.get('tasks', []))
+        if op == 'analyze':
+            response['schedulable'] = task_set.is_schedulable(algo, policy, overheads)
+            response['utilization'] = sum(task['exec_time']/task['period'] for task in task_set.tasks)
+            if algo == 'rms':
+                priorities = task_set.priorities(policy)
+                resp_times = [None]*len(task_set)
+                if priorities is not None:
+                    resp_times = fp_overhead_response_times(task_set.tasks, priorities, task_set.overhead_params(overheads))
+                response['response_times'] = dict((task['name'], resp) for task, resp in zip(task_set.tasks, resp_times))
+        else:
+            sched = schedule(task_set, algo, sim_time=request.get('sim_time', 0), engine=request.get('engine', 'event'),
+                horizon=request.get('horizon', 'hyperperiod'), max_sim_time=request.get('max_sim_time', 0),
+                metrics=(op == 'metrics'), cache=_worker_cache, keep_sched=(op == 'schedule'), policy=policy, overheads=overheads)
+            if op == 'metrics':
+                response['metrics'] = sched['metrics']
+            else:
+                response['sched'] = sched
+        response['ok'] = True
+    except (SchedError, ValueError, TypeError, KeyError, yaml.YAMLError) as exc:
+        response['ok'] = False
+        response['error'] = str(exc)
+        response['error_type'] = type(exc).__name__
+    return response
+
+
+def handle_batch(requests):
+    """Process a batch of requests in a worker process.
+
+    :param requests: list of requests.
+    :type  requests: List of dictionaries.
+    :return: The response of each request.
+    :rtype: List of dictionaries.
+    """
+    return [handle_request(request) for request in requests]
+
+
+class SchedServer:
+    """Scheduling analysis service.
+
+    The clients send one JSON request per line and receive one JSON response per line,
+    in the order of the requests. The requests of all connections are grouped in
+    batches of up to batch_size requests, waiting at most batch_window seconds when
+    all the workers are busy. Each batch is split among the worker processes of the pool.
+
+    :param jobs: number of worker processes. If none is defined, the number of CPUs is used.
+    :type  jobs: int
+    :param batch_size: maximum number of requests of a batch.
+    :type  batch_size: int
+    :param batch_window: maximum time waiting for more requests of a batch, in seconds.
+    :type  batch_window: float
+    """
+
+    def __init__(self, jobs=None, batch_size=32, batch_window=0.002):
+        self.jobs = jobs if jobs else os.cpu_count()
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.queue = None
+        self.pool = None
+        # number of batches being processed
+        self.running = 0
+
+    async def serve(self, socket_path=None, port=8765):
+        """Run the service until it is cancelled.
+
+        :param socket_path: Unix socket path. If none is defined, the service listens on 127.0.0.1.
+        :type  socket_path: str
+        :param port: TCP port, used when socket_path is not defined.
+        :type  port: int
+        """
+        self.queue = asyncio.Queue()
+        with ProcessPoolExecutor(self.jobs) as self.pool:
+            if socket_path is not None:
+                if os.path.exists(socket_path):
+                    os.remove(socket_path)
+                server = await asyncio.start_unix_server(self.handle_client, path=socket_path)
+            else:
+                server = await asyncio.start_server(self.handle_client, host='127.0.0.1', port=port)
+            batcher = asyncio.ensure_future(self.batcher())
+            print ("listening on", socket_path if socket_path is not None else "127.0.0.1:%d" % port, flush=True)
+            try:
+                async with server:
+                    await server.serve_forever()
+            finally:
+                batcher.cancel()
+
+    async def submit(self, request):
+        """Queue a request and wait for its response.
+
+        :param request: the request.
+        :type  request: Dictionary.
+        :rtype: Dictionary.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((request, future))
+        return await future
+
+    async def batcher(self):
+        """Group the queued requests in batches and send them to the worker processes.
+
+        When some worker is idle, the queued requests are sent at once. Otherwise,
+        the batch waits up to batch_window seconds for more requests.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.batch_size and self.running >= self.jobs:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # split the batch, so all the workers get part of it
+            num_chunks = min(self.jobs, len(batch))
+            for chunk in range(num_chunks):
+                self.running += 1
+                asyncio.ensure_future(self.run_batch(batch[chunk::num_chunks]))
+
+    async def run_batch(self, batch):
+        """Process a batch in the pool and deliver the responses."""
+        loop = asyncio.get_running_loop()
+        try:
+            responses = await loop.run_in_executor(self.pool, handle_batch, [request for request, _ in batch])
+        except Exception as exc:
+            responses = [dict(id=request.get('id'), ok=False, error=str(exc), error_type=type(exc).__name__)
+                for request, _ in batch]
+        finally:
+            self.running -= 1
+        for (_, future), response in zip(batch, responses):
+            if not future.done():
+                future.set_result(response)
+
+    async def handle_client(self, reader, writer):
+        """Serve the requests of a connection. The responses are sent in the order of the requests."""
+        pending = asyncio.Queue()
+
+        async def send_responses():
+            while True:
+                future = await pending.get()
+                if future is None:
+                    break
+                writer.write(json.dumps(await future).encode() + b'\n')
+                await writer.drain()
+
+        sender = asyncio.ensure_future(send_responses())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("the request must be a JSON object")
+                except ValueError as exc:
+                    future = asyncio.get_running_loop().create_future()
+                    future.set_result(dict(id=None, ok=False, error=str(exc), error_type='ValueError'))
+                else:
+                    future = asyncio.ensure_future(self.submit(request))
+                await pending.put(future)
+        finally:
+            await pending.put(None)
+            try:
+                await sender
+            except ConnectionError:
+                pass
+            writer.close()
+
+
+def main():
+    """Long running scheduling analysis service.
+
+    It listens on a Unix socket or on a localhost TCP port. See :class:`SchedServer`
+    for the protocol and :func:`handle_request` for the request format.
+
+    :return: None.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--socket', dest='socket_path', default=None,
+                help='Unix socket path. If not defined, the service listens on 127.0.0.1')
+    parser.add_argument('--port', default=8765, type=int,
+                help='TCP port on 127.0.0.1 (default: %(default)s)')
+    parser.add_argument('-j','--jobs', default=None, type=int,
+                help='The number of worker processes. If not defined, the number of CPUs is used.')
+    parser.add_argument('--batch-size', dest='batch_size', default=32, type=int,
+                help='maximum number of requests processed together by a worker (default: %(default)s)')
+    parser.add_argument('--batch-window', dest='batch_window', default=2.0, type=float,
+                help='maximum time waiting for more requests of a batch, in milliseconds (default: %(default)s)')
+
+    args = parser.parse_args()
+
+    if args.batch_size < 1:
+        print ("ERROR: the batch size must be positive. Got", args.batch_size)
+        sys.exit(1)
+
+    server = SchedServer(args.jobs, args.batch_size, args.batch_window/1000.0)
+    try:
+        asyncio.run(server.serve(args.socket_path, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+import argparse
+import math
+import sys
+from fractions import Fraction
+import numpy as np
+import yaml
+from common import check_rms_edf
+from edf import edf_qpa
+
+# supported algorithms of the sensitivity analysis
+SENSITIVITY_ALGOS = ['rms', 'edf']
+
+
+class RmsSensitivity:
+    """Sensitivity analysis of a task set under RMS.
+
+    The Response Time Analysis (RTA) runs vectorized over the affected tasks.
+    The response times of the last schedulable probe of a binary search are
+    lower bounds of the response times of the next probes with longer execution
+    times, so every probe starts from them and converges in a few iterations.
+
+    As in :func:`rms.rms_response_times`, tasks with the same period interfere
+    with each other.
+
+    :param task_list: List of task descriptors.
+    :type  task_list: List of dictionaries.
+
+    :Example:
+
+        >>> sens = RmsSensitivity(tasks)
+        >>> sens.breakdown_factor()
+        >>> sens.wcet_slack()
+    """
+
+    def __init__(self, task_list):
+        self.tasks = list(task_list)
+        self.exec_times = np.array([task['exec_time'] for task in self.tasks], dtype=np.int64)
+        self.periods = np.array([task['period'] for task in self.tasks], dtype=np.int64)
+        self.deadlines = np.minimum(np.array([task['deadline'] for task in self.tasks], dtype=np.int64), self.periods)
+        self.utilization = sum(Fraction(task['exec_time'], task['period']) for task in self.tasks)
+        # hp[k, j] is True when the task j interferes with the task k
+        self.hp = self.periods[None, :] <= self.periods[:, None]
+        np.fill_diagonal(self.hp, False)
+        self.resp = None
+        if self.utilization <= 1:
+            self.resp = self.response_times(self.exec_times, np.arange(len(self.tasks)))
+
+    def response_times(self, exec_times, rows, start=None, exact=True):
+        """Response time of some tasks, for the given execution times of all tasks.
+
+        :param exec_times: execution time of each task. It may be float.
+        :type  exec_times: numpy array.
+        :param rows: index of the analyzed tasks.
+        :type  rows: numpy array of int.
+        :param start: lower bound of the response time of each analyzed task (warm start).
+        :type  start: numpy array.
+        :param exact: If False, the tasks meeting their deadlines according to the response
+            time upper bound of Bini and Baruah are not analyzed, and a lower bound of their
+            response times is returned.
+        :type  exact: bool
+        :return: The response time of each analyzed task, or None if one of them misses its deadline.
+        :rtype: numpy array.
+        """
+        hp_execs = self.hp[rows] * exec_times[None, :]
+        resp = exec_times[rows] + hp_execs.sum(axis=1)
+        if start is not None:
+            resp = np.maximum(resp, start)
+        deadlines = self.deadlines[rows]
+        if not exact:
+            utils = exec_times / self.periods
+            hp_utils = self.hp[rows] @ utils
+            with np.errstate(divide='ignore', invalid='ignore'):
+                bounded = (hp_utils < 1.0) & ((exec_times[rows] + hp_execs @ (1.0 - utils)) / (1.0 - hp_utils) <= deadlines - 1e-9)
+            if bounded.all():
+                return resp
+            pending = np.nonzero(~bounded)[0]
+            pending_resp = self.response_times(exec_times, rows[pending], resp[pending])
+            if pending_resp is None:
+                return None
+            resp[pending] = pending_resp
+            return resp
+        while True:
+            if (resp > deadlines).any():
+                return None
+            new_resp = exec_times[rows] + (-(-resp[:, None] // self.periods[None, :]) * hp_execs).sum(axis=1)
+            if (new_resp == resp).all():
+                return resp
+            resp = new_resp
+
+    def is_schedulable(self):
+        """Exact RMS schedulability test, as in :func:`rms.rms_is_schedulable`.
+
+        :rtype: bool
+        """
+        return self.resp is not None
+
+    def breakdown_factor(self, tolerance=1e-6):
+        """Largest factor scaling all the execution times that keeps the task set schedulable.
+
+        The execution times are scaled as real numbers. The breakdown utilization is
+        this factor times the task set utilization.
+
+        :param tolerance: relative precision of the factor.
+        :type  tolerance: float
+        :return: The factor, lower than 1 if the task set is not schedulable.
+        :rtype: float
+        """
+        exec_times = self.exec_times.astype(float)
+        rows = np.arange(len(self.tasks))
+        # the task set is not schedulable above the utilization bound
+        lo, hi = 0.0, 1.0 / float(self.utilization)
+        lo_resp = None
+        if self.resp is not None:
+            lo, lo_resp = 1.0, self.resp.astype(float)
+        if self.response_times(exec_times * hi, rows, lo_resp, exact=False) is not None:
+            return hi
+        while hi - lo > tolerance * hi:
+            mid = (lo + hi) / 2
+            resp = self.response_times(exec_times * mid, rows, lo_resp, exact=False)
+            if resp is None:
+                hi = mid
+            else:
+                lo, lo_resp = mid, resp
+        return lo
+
+    def task_slack(self, idx):
+        """Largest increase of the execution time of a task that keeps the task set schedulable.
+
+        Only the task and the tasks with the same or longer periods are affected.
+        The increase is limited by the task deadline and by the utilization bound,
+        and the binary search between them reuses the response times of the last
+        schedulable probe.
+
+        :param idx: index of the task in the task list.
+        :type  idx: int
+        :return: The slack in OS ticks, or None if the task set is not schedulable.
+        :rtype: int
+        """
+        if self.resp is None:
+            return None
+        rows = np.nonzero(self.periods >= self.periods[idx])[0]
+        # the response time of the task grows at least as much as its execution time
+        hi = min(int(self.deadlines[idx] - self.resp[idx]),
+            math.floor((1 - self.utilization) * self.tasks[idx]['period']))
+        lo, lo_resp = 0, self.resp[rows]
+        exec_times = self.exec_times.copy()
+        # the upper bound is checked first, since it often holds
+        mid = hi
+        while lo < hi:
+            exec_times[idx] = self.exec_times[idx] + mid
+            resp = self.response_times(exec_times, rows, lo_resp, exact=False)
+            if resp is None:
+                hi = mid - 1
+            else:
+                lo, lo_resp = mid, resp
+            mid = (lo + hi + 1) // 2
+        return lo
+
+    def wcet_slack(self):
+        """Slack of each task, as in :meth:`task_slack`.
+
+        :return: The slack of each task in OS ticks, in the order of the task list. None if the task set is not schedulable.
+        :rtype: List of int.
+        """
+        if self.resp is None:
+            return None
+        return [self.task_slack(idx) for idx in range(len(self.tasks))]
+
+
+class EdfSensitivity:
+    """Sensitivity analysis of a task set under EDF.
+
+    When all deadlines are equal to or longer than the periods, the results follow
+    from the exact utilization test. Otherwise, the binary searches check each probe
+    with the Quick Processor-demand Analysis (QPA).
+
+    :param task_list: List of task descriptors.
+    :type  task_list: List of dictionaries.
+    """
+
+    def __init__(self, task_list):
+        self.tasks = [dict(task) for task in task_list]
+        self.utilization = sum(Fraction(task['exec_time'], task['period']) for task in self.tasks)
+        self.implicit = all(task['deadline'] >= task['period'] for task in self.tasks)
+        self.schedulable = self.utilization <= 1 and (self.implicit or edf_qpa(self.tasks))
+
+    def is_schedulable(self):
+        """Exact EDF schedulability test, as in :func:`edf.edf_is_schedulable`.
+
+        :rtype: bool
+        """
+        return self.schedulable
+
+    def breakdown_factor(self, tolerance=1e-6):
+        """Largest factor scaling all the execution times that keeps the task set schedulable, as in :meth:`RmsSensitivity.breakdown_factor`.
+
+        QPA computes with exact fractions, so the probed factors are multiples of a
+        step with a small denominator instead of floats, whose fractions are huge.
+        Unlike RMS, the utilization bound is not probed first: at 100% utilization,
+        QPA checks the whole busy period, which may be as long as the hyperperiod.
+        """
+        hi = 1 / self.utilization
+        if self.implicit:
+            return float(hi)
+        # the factors are steps/denominator, with a step below the tolerance
+        denominator = math.ceil(4 / (tolerance * hi))
+        lo_steps = denominator if self.schedulable else 0
+        hi_steps = math.ceil(hi * denominator)
+        while hi_steps - lo_steps > 1:
+            mid = (lo_steps + hi_steps) // 2
+            if self._scaled_qpa(Fraction(mid, denominator)):
+                lo_steps = mid
+            else:
+                hi_steps = mid
+        return lo_steps / denominator
+
+    def _scaled_qpa(self, factor):
+        """QPA of the task set with the execution times scaled by factor.
+
+        :param factor: the scale factor.
+        :type  factor: Fraction
+        """
+        tasks = [dict(task, exec_time=task['exec_time'] * factor) for task in self.tasks]
+        if sum(Fraction(task['exec_time'], task['period']) for task in tasks) > 1:
+            return False
+        return edf_qpa(tasks)
+
+    def task_slack(self, idx):
+        """Largest increase of the execution time of a task that keeps the task set schedulable, as in :meth:`RmsSensitivity.task_slack`."""
+        if not self.schedulable:
+            return None
+        task = self.tasks[idx]
+        hi = math.floor((1 - self.utilization) * task['period'])
+        if self.implicit:
+            return hi
+        # the job must finish up to its deadline
+        hi = min(hi, task['deadline'] - task['exec_time'])
+        lo = 0
+        tasks = list(self.tasks)
+        mid = hi
+        while lo < hi:
+            tasks[idx] = dict(task, exec_time=task['exec_time'] + mid)
+            if edf_qpa(tasks):
+                lo = mid
+            else:
+                hi = mid - 1
+            mid = (lo + hi + 1) // 2
+        return lo
+
+    def wcet_slack(self):
+        """Slack of each task, as in :meth:`RmsSensitivity.wcet_slack`."""
+        if not self.schedulable:
+            return None
+        return [self.task_slack(idx) for idx in range(len(self.tasks))]
+
+
+def sensitivity_report(task_list, algo='rms', tolerance=1e-6):
+    """Sensitivity analysis of a task set.
+
+    :param task_list: List of task descriptors.
+    :type  task_list: List of dictionaries.
+    :param algo: 'rms' or 'edf'.
+    :type  algo: str
+    :param tolerance: relative precision of the breakdown factor.
+    :type  tolerance: float
+    :return: Dictionary with 'algo', 'schedulable', 'utilization', 'breakdown_factor',
+        'breakdown_utilization' and 'tasks', a list with one dictionary per task with 'name',
+        'exec_time', 'slack' and 'max_exec_time' (None if the task set is not schedulable)
+        and, for RMS, 'resp_time'.
+    :rtype: Dictionary.
+    :raises ValueError: if the algorithm is not supported.
+    """
+    if algo == 'rms':
+        sens = RmsSensitivity(task_list)
+    elif algo == 'edf':
+        sens = EdfSensitivity(task_list)
+    else:
+        raise ValueError("unsupported scheduling algorithm %s" % algo)
+    factor = sens.breakdown_factor(tolerance)
+    slack = sens.wcet_slack()
+    tasks = []
+    for idx, task in enumerate(task_list):
+        entry = dict(name=task['name'], exec_time=task['exec_time'], slack=None, max_exec_time=None)
+        if slack is not None:
+            entry['slack'] = slack[idx]
+            entry['max_exec_time'] = task['exec_time'] + slack[idx]
+        if algo == 'rms':
+            entry['resp_time'] = int(sens.resp[idx]) if sens.resp is not None else None
+        tasks.append(entry)
+    return dict(algo=algo, schedulable=bool(sens.is_schedulable()), utilization=float(sens.utilization),
+        breakdown_factor=factor, breakdown_utilization=factor * float(sens.utilization), tasks=tasks)
+
+
+def print_report(report):
+    """Print the sensitivity analysis results as a table.
+
+    :param report: The results, as returned by :func:`sensitivity_report`.
+    :type  report: Dictionary.
+    :return: None.
+    """
+    print ("%s schedulable: %s" % (report['algo'].upper(), report['schedulable']))
+    print ("utilization: %.4f" % report['utilization'])
+    print ("breakdown factor: %.6f, breakdown utilization: %.4f" % (report['breakdown_factor'], report['breakdown_utilization']))
+    print ("%-12s %9s %9s %13s %9s" % ('task', 'exec_time', 'slack', 'max_exec_time', 'resp_time'))
+    for task in report['tasks']:
+        print ("%-12s %9d %9s %13s %9s" % (task['name'], task['exec_time'], task['slack'], task['max_exec_time'], task.get('resp_time', '-')))
+
+
+def main():
+    """Sensitivity analysis of a task set.
+
+    It reports the breakdown factor, i.e. the largest factor scaling all the
+    execution times that keeps the task set schedulable, and how much the
+    execution time of each task can grow alone.
+
+    :return: None.
+    """
+    # parsing arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument('file', type=argparse.FileType('r'),
+                        help='input file describing the tasks to be analyzed')
+    parser.add_argument('--sched', default='rms', choices=SENSITIVITY_ALGOS,
+                        help='scheduling algorithm (default: %(default)s)')
+    parser.add_argument('--tolerance', default=1e-6, type=float,
+                        help='relative precision of the breakdown factor (default: %(default)s)')
+    parser.add_argument('--ofile', type=argparse.FileType('w'),
+                        help='output YAML file with the results. If not defined, they are only printed')
+
+    args = parser.parse_args()
+
+    # loading and parsing the YAML file
+    try:
+        docs = yaml.safe_load(args.file)
+    except yaml.YAMLError as exc:
+        print(exc)
+        sys.exit(1)
+    if not check_rms_edf(docs['tasks']):
+        sys.exit(1)
+
+    report = sensitivity_report(docs['tasks'], args.sched, args.tolerance)
+    print_report(report)
+    if args.ofile is not None:
+        yaml.dump(report, args.ofile, default_flow_style=False, sort_keys=False)
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,49 @@
 import yaml
 import argparse
+import os
 import pprint
 import sys
 # supported algorithms 
-from rms import rms
-from common import plot_gantt, check_sched
+from rms import rms, rms_priority
+from edf import edf_priority
+from common import plot_gantt, check_sched, compact_tasks, event_sched_window, sched_segments_2_sched_dict
+from sched_file import load_sched, load_checkpoints, checkpoint_file_name, CHECKPOINT_EXT
+
+# priority function of each algorithm, to re-simulate from the checkpoints
+PRIORITIES = {'rms': rms_priority, 'edf': edf_priority}
+
+def load_window(file_name, start=None, end=None, verbose=False):
+    """Re-simulate a time window of a schedule from its checkpoint file.
+
+    Unlike :func:`sched_file.load_sched`, the jobs are clipped to the window.
+
+    :param file_name: The checkpoint file, saved by run_sched.py with --checkpoint-interval.
+    :type  file_name: str
+    :param start: window start. If none is defined, the schedule beginning is used.
+    :type  start: int
+    :param end: window end. If none is defined, the schedule end is used.
+    :type  end: int
+    :return: The schedule of the window, or None if the checkpoint file could not be parsed.
+    :rtype: Dictionary.
+    """
+    data = load_checkpoints(file_name)
+    if data is None:
+        return None
+    algo, task_list, checkpoints = data
+    if algo not in PRIORITIES:
+        print ("ERROR: unsupported scheduling algorithm in the checkpoint file", algo)
+        return None
+    start = 0 if start is None else max(start, 0)
+    end = checkpoints.sim_time if end is None else min(end, checkpoints.sim_time)
+    if verbose:
+        print ("re-simulating the ticks %d-%d from the checkpoint at %d" % (start, end, checkpoints.nearest(start)['time']))
+    # run_sched.py saves the priority levels assigned by its --priority policy as explicit priorities
+    priorities = None
+    if algo == 'rms' and all('priority' in task for task in task_list):
+        priorities = [task['priority'] for task in task_list]
+    segments = event_sched_window(compact_tasks(task_list, priorities), PRIORITIES[algo], checkpoints, start, end)
+    task_list = task_list + [dict(name='idle', exec_time=1, deadline=1, period=1)]
+    return sched_segments_2_sched_dict(task_list, segments)
 
 def main(file_name):
     """Show the schedule image of a shedule YAML file. 
@@ -13,30 +52,43 @@ def main(file_name):
 
     .. image:: ../../wikipedia.png
 
-    :param file_name: The shedule YAML file.
+    When a time window is selected and the schedule has a checkpoint file, only
+    the window is re-simulated. A checkpoint file can also be shown directly.
+
+    :param file_name: The shedule YAML file, binary schedule file (.sched) or checkpoint file (.ckpt).
     :type  file_name: List of dictionaries.
     :return: None.
     """
 
-    # loading and parsing the YAML file
-    with open(file_name) as f:
-        try:
-            docs = yaml.safe_load(f)
-        except yaml.YAMLError as exc:
-            print(exc)
+    window = args.start is not None or args.end is not None
+    if file_name.endswith(CHECKPOINT_EXT):
+        docs = load_window(file_name, args.start, args.end, args.verbose)
+    elif window and os.path.exists(checkpoint_file_name(file_name)):
+        docs = load_window(checkpoint_file_name(file_name), args.start, args.end, args.verbose)
+    else:
+        # loading and parsing the schedule file. only the selected time window is loaded
+        docs = load_sched(file_name, args.start, args.end)
+    if docs is None:
+        sys.exit(1)
 
     if args.verbose:
         print ('PRINTING THE INPUT SCHEDULING FILE:')
         pp = pprint.PrettyPrinter(indent=4)
         pp.pprint(docs)
 
-    plot_gantt(docs, verbose=args.verbose)
+    plot_gantt(docs, verbose=args.verbose, mode=args.plot_mode)
 
 if __name__ == "__main__":
     # parsing arguments
     parser = argparse.ArgumentParser()
     parser.add_argument('file', type=argparse.FileType('r'))
     parser.add_argument('--verbose', dest='verbose', action='store_true', default=False)
+    parser.add_argument('--start', default=None, type=int,
+                        help='show only the jobs running at or after this OS tick')
+    parser.add_argument('--end', default=None, type=int,
+                        help='show only the jobs starting before this OS tick')
+    parser.add_argument('--plot-mode', dest='plot_mode', default='auto', choices=['auto', 'timeline', 'large'],
+                        help='gantt chart mode. large uses a numeric x axis and merges each task into a single trace (default: %(default)s)')
 
     args = parser.parse_args()
 
@@ -0,0 +1,207 @@
+import json
+import os
+import sys
+import io
+import time
+import tracemalloc
+import contextlib
+import numpy as np
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(TESTS_DIR, 'results', 'benchmark-baseline.json')
+sys.path.append(os.path.join(TESTS_DIR, '..', 'src'))
+from rms import rms, rms_tick_sched
+from edf import edf
+from common import sched_list_2_sched_dict, released_jobs
+from campaign import gen_task_set
+from admission import RmsAdmission, EdfAdmission
+
+# (number of tasks, simulation time) of the synthetic task sets
+BENCH_SIZES = [(5, 10**4), (20, 10**5), (80, 10**6)]
+# utilization of the synthetic task sets. It passes the Liu & Layland bound
+BENCH_UTIL = 0.6
+# each case runs this number of times and the fastest run is reported
+BENCH_REPEAT = 3
+# (number of admitted tasks, number of admission requests) of the admission control benchmark
+ADMISSION_SIZE = (1000, 50)
+
+
+def bench_task_set(num_tasks, sim_time, seed=0):
+    """Deterministic synthetic task set of the benchmark.
+
+    The periods grow with the number of tasks, so the rounding of the execution
+    times does not change the utilization, and every task has at least ten jobs.
+
+    :param num_tasks: number of tasks.
+    :type  num_tasks: int
+    :param sim_time: simulation time.
+    :type  sim_time: int
+    :param seed: seed of the random task set generator.
+    :type  seed: int
+    :return: List of task descriptors.
+    :rtype: List of dictionaries.
+    """
+    rng = np.random.default_rng([seed, num_tasks])
+    return gen_task_set(num_tasks, BENCH_UTIL, rng, min_period=20*num_tasks, max_period=sim_time//10)
+
+
+def measure(func, repeat=BENCH_REPEAT):
+    """Measure the fastest run time and the peak memory of a function.
+
+    The peak memory is measured in a separate run, since tracemalloc slows down the code.
+    The output of the function is discarded.
+
+    :param func: function with no arguments.
+    :type  func: function
+    :param repeat: number of timed runs.
+    :type  repeat: int
+    :return: Tuple (fastest run time in seconds, peak memory in bytes).
+    :rtype: tuple
+    """
+    best = float('inf')
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return best, peak
+
+
+def run_benchmarks(verbose=False):
+    """Run the scaling benchmark suite.
+
+    The simulators are measured with task sets of growing size and simulation time,
+    and the converter is measured with the tick schedules of the same task sets.
+
+    :param verbose:
+    :type  verbose: bool
+    :return: The results of each case: ticks/sec, jobs/sec and peak memory in bytes.
+    :rtype: Dictionary.
+    """
+    results = {}
+    for num_tasks, sim_time in BENCH_SIZES:
+        task_list = bench_task_set(num_tasks, sim_time)
+        num_jobs = released_jobs(task_list, sim_time)
+        for name, algo in (('rms', rms), ('edf', edf)):
+            elapsed, peak = measure(lambda: algo(task_list, sim_time=sim_time))
+            results['%s-%d-%d' % (name, num_tasks, sim_time)] = dict(ticks_per_sec=sim_time/elapsed,
+                jobs_per_sec=num_jobs/elapsed, peak_memory=peak)
+        # the idle task is added only for the conversion, as in rms()
+        sched_list = rms_tick_sched(task_list, sim_time)
+        tasks = task_list + [dict(name='idle', exec_time=1, deadline=1, period=1)]
+        elapsed, peak = measure(lambda: sched_list_2_sched_dict(tasks, sched_list))
+        results['convert-%d-%d' % (num_tasks, sim_time)] = dict(ticks_per_sec=sim_time/elapsed,
+            jobs_per_sec=num_jobs/elapsed, peak_memory=peak)
+        if verbose:
+            print ("finished the benchmarks with", num_tasks, "tasks")
+    return results
+
+
+def run_admission_benchmarks(verbose=False):
+    """Run the admission control benchmark suite.
+
+    Each request admits a new task into a large task set and removes it again, so
+    every request sees the same task set. The task sets have implicit deadlines or
+    deadlines at 90% of the periods, which require the exact tests.
+
+    :param verbose:
+    :type  verbose: bool
+    :return: The results of each case: admissions/sec and peak memory in bytes.
+    :rtype: Dictionary.
+    """
+    num_tasks, num_requests = ADMISSION_SIZE
+    rng = np.random.default_rng(num_tasks)
+    task_list = gen_task_set(num_tasks, BENCH_UTIL, rng, min_period=10**4, max_period=10**6)
+    requests = gen_task_set(num_requests, 0.1, rng, min_period=10**4, max_period=10**6)
+    for idx, task in enumerate(requests):
+        task['name'] = 'request%d' % idx
+    results = {}
+    for constrained in (False, True):
+        if constrained:
+            task_list = [dict(task, deadline=max(task['exec_time'], task['period']*9//10)) for task in task_list]
+            requests = [dict(task, deadline=max(task['exec_time'], task['period']*9//10)) for task in requests]
+        for name, cls in (('rms', RmsAdmission), ('edf', EdfAdmission)):
+            admission = cls(task_list)
+            def admit_all():
+                for task in requests:
+                    if admission.admit(task):
+                        admission.remove(task['name'])
+            elapsed, peak = measure(admit_all)
+            results['admit-%s-%d%s' % (name, num_tasks, '-constrained' if constrained else '')] = dict(
+                admits_per_sec=num_requests/elapsed, peak_memory=peak)
+        if verbose:
+            print ("finished the admission benchmarks", "with constrained deadlines" if constrained else "")
+    return results
+
+
+def compare_baseline(results, baseline, tolerance):
+    """Compare the benchmark results with the baseline.
+
+    A case regresses when its throughput drops below (1 - tolerance) times the baseline
+    throughput, or when its peak memory grows above (1 + tolerance) times the baseline.
+
+    :param results: results of :func:`run_benchmarks`.
+    :type  results: Dictionary.
+    :param baseline: baseline results, in the same format.
+    :type  baseline: Dictionary.
+    :param tolerance: accepted relative slowdown and memory growth.
+    :type  tolerance: float
+    :return: The error message of each regression.
+    :rtype: List of str.
+    """
+    errors = []
+    for case, result in results.items():
+        if case not in baseline:
+            continue
+        for key in ('ticks_per_sec', 'jobs_per_sec', 'admits_per_sec'):
+            if key in result and key in baseline[case] and result[key] < baseline[case][key] * (1 - tolerance):
+                errors.append("%s: %s dropped from %.0f to %.0f" % (case, key, baseline[case][key], result[key]))
+        if result['peak_memory'] > baseline[case]['peak_memory'] * (1 + tolerance):
+            errors.append("%s: peak memory grew from %d to %d bytes" % (case, baseline[case]['peak_memory'], result['peak_memory']))
+    return errors
+
+
+def main(tolerance=0.5, save_baseline=False, verbose=False):
+    """Run the scaling benchmark suite and compare it with the stored baseline.
+
+    :param tolerance: accepted relative slowdown and memory growth.
+    :type  tolerance: float
+    :param save_baseline: if True, the results are saved as the new baseline.
+    :type  save_baseline: bool
+    :param verbose:
+    :type  verbose: bool
+    :return: The number of regressions.
+    :rtype: int
+    """
+    results = run_benchmarks(verbose)
+    print ("%-24s %14s %14s %14s" % ('benchmark', 'ticks/sec', 'jobs/sec', 'peak memory'))
+    for case, result in results.items():
+        print ("%-24s %14.0f %14.0f %14d" % (case, result['ticks_per_sec'], result['jobs_per_sec'], result['peak_memory']))
+    admission_results = run_admission_benchmarks(verbose)
+    print ("%-28s %14s %14s %14s" % ('benchmark', 'admits/sec', 'ms/admit', 'peak memory'))
+    for case, result in admission_results.items():
+        print ("%-28s %14.0f %14.3f %14d" % (case, result['admits_per_sec'], 1e3/result['admits_per_sec'], result['peak_memory']))
+    results.update(admission_results)
+
+    if save_baseline:
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print ("baseline saved in", BASELINE_FILE)
+        return 0
+    if not os.path.isfile(BASELINE_FILE):
+        print ("WARNING: baseline file", BASELINE_FILE, "not found")
+        return 0
+    with open(BASELINE_FILE) as f:
+        baseline = json.load(f)
+    errors = compare_baseline(results, baseline, tolerance)
+    for error in errors:
+        print ("    REGRESSION:", error)
+    print ("%d benchmark regressions" % len(errors))
+    return len(errors)
+
+if __name__ == "__main__":
+    sys.exit(1 if main(save_baseline='--save-baseline' in sys.argv) > 0 else 0)
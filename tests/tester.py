@@ -1,138 +1,965 @@
 import yaml
 import argparse
-import pprint
 import os
 import sys
+import io
+import copy
 import glob
-import filecmp
-
-#sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
-#
-# from lib.Tasks import ManualTask, TaskMaster
+import time
+import contextlib
+import numpy as np
+import tempfile
+import pickle
+import functools
+import json
+import asyncio
+from fractions import Fraction
+from multiprocessing import Pool
 
 # tests
 # https://github.com/guilyx/gantt-trampoline/blob/master/tests/test_auto_tasks.py
 
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+EXAMPLES_DIR = os.path.join(TESTS_DIR, '..', 'examples')
+RESULTS_DIR = os.path.join(TESTS_DIR, 'results')
+sys.path.append(os.path.join(TESTS_DIR, '..', 'src'))
+# supported algorithms
+from rms import rms, assign_priorities, rms_priority, rms_response_times
+from edf import edf, edf_priority, edf_is_schedulable
+from admission import RmsAdmission, EdfAdmission
+from sensitivity import sensitivity_report
+from sched_api import TaskSet, schedule, InvalidTaskSetError, NotSchedulableError, UnsupportedOptionError
+from multicore import multicore_sched
+from batch_sched import batch_sched, pack_task_sets
+from campaign import gen_task_set
+from common import verify_sched, hyperperiod, SchedCheckpoints, event_sched
+import sched_cache
+from sched_cache import SchedCache, cache_key, DEFAULT_CACHE_DIR
+from sched_file import save_checkpoints, save_sched, load_sched
+from show_sched import load_window
+from sched_server import SchedServer
+from sched_client import open_connection
 
-# TODO: https://github.com/seperman/deepdiff to compare both YAMLs
+# the tested scheduling algorithms
+SCHED_ALGOS = {'rms': rms, 'edf': edf}
+# priority function of each algorithm in the simulators
+SCHED_PRIORITIES = {'rms': rms_priority, 'edf': edf_priority}
+# cases of other example files, with the options of the algorithm. (input file, algorithm, options)
+OPTION_CASES = [
+    ('deadline-monotonic.yaml', 'rms', {}),
+    ('deadline-monotonic.yaml', 'rms', dict(policy='dm')),
+    ('deadline-monotonic.yaml', 'rms', dict(policy='explicit')),
+    ('deadline-monotonic.yaml', 'rms', dict(policy='opa')),
+    ('overheads.yaml', 'rms', {}),
+    ('overheads.yaml', 'edf', {}),
+]
+# multicore cases, run in this process since the partitioned mode has its own worker processes. (input file, algorithm, options)
+MULTICORE_CASES = [('testbench5.yaml', algo, dict(cores=2, mode=mode)) for mode in ('partitioned', 'global') for algo in SCHED_ALGOS]
+# seed of the generated task sets
+SEED = 2021
+# task set whose schedules finish a job in the last tick of the hyperperiod
+FINAL_TICK_TASKS = [
+    dict(name='t0', exec_time=1, deadline=2, period=2),
+    dict(name='t1', exec_time=5, deadline=10, period=10),
+]
+# task set whose 'priority' fields are the opposite of rate monotonic, used only by --priority explicit
+PRIORITY_FIELD_TASKS = [
+    dict(name='a', exec_time=1, deadline=4, period=4, priority=5),
+    dict(name='b', exec_time=2, deadline=10, period=10, priority=0),
+]
 
-#sys.path.insert(0, os.path.abspath('../src'))
-sys.path.append('../src')
-# supported algorithms
-from rms import rms
-from edf import edf
+# task set whose timing metrics are computed by hand in METRICS_EXPECTED
+METRICS_TASKS = [
+    dict(name='a', exec_time=1, deadline=4, period=4),
+    dict(name='b', exec_time=2, deadline=6, period=6),
+    dict(name='c', exec_time=3, deadline=12, period=12),
+]
+# metrics of METRICS_TASKS in its hyperperiod: (jobs, bcrt, avg_rt, wcrt, release_jitter, finish_jitter, preemptions) of each task.
+# rms runs a [0,1) [4,5) [8,9), b [1,3) [6,8) and c [3,4) [5,6) [9,10): c is preempted at 4 by a and at 6 by b.
+# edf runs a [0,1) [4,5) [9,10), b [1,3) [7,9) and c [3,4) [5,7): c keeps the CPU at 6, since its
+# deadline is equal to the one of b and it was released first, and it is preempted only at 4.
+# Both leave the CPU idle in [10,12).
+METRICS_EXPECTED = {
+    'rms': dict(a=(3, 1, 1.0, 1, 0, 0, 0), b=(2, 2, 2.5, 3, 1, 1, 0), c=(1, 10, 10.0, 10, 0, 0, 2)),
+    'edf': dict(a=(3, 1, 4/3, 2, 1, 1, 0), b=(2, 3, 3.0, 3, 0, 0, 0), c=(1, 7, 7.0, 7, 0, 0, 1)),
+}
+METRICS_FIELDS = ('jobs', 'bcrt', 'avg_rt', 'wcrt', 'release_jitter', 'finish_jitter', 'preemptions')
 
-def main():
-    """Tester for the scheduling algoritms. 
 
-    Given an input file describing the task set, this function generates
-     its scheduling considering the scheduling algorithm passed by argument.
-     At the end, it generates a schedule image, similar to this one: 
+def case_name(filename, algo, options):
+    """Name of a test case, which is also the name of its expected results file.
+
+    If the filename is testbench2.yaml and the algorithm is RMS, then
+    the expected filename will be results/testbench2-rms.yaml. The values
+    of the options are appended in the order of their names, e.g. results/deadline-monotonic-rms-dm.yaml
+
+    :param filename: testbench file name.
+    :type  filename: str
+    :param algo: algorithm name.
+    :type  algo: str
+    :param options: options of the algorithm.
+    :type  options: Dictionary.
+    :rtype: str
+    """
+    fname, extension = os.path.splitext(os.path.basename(filename))
+    return "-".join([fname, algo] + [str(options[name]) for name in sorted(options)]) + extension
+
+
+def run_case(args):
+    """Run a single regression test case. Used by the worker processes.
+
+    The generated schedule must match the expected results file, which is
+    empty when the task set is not schedulable for the algorithm. The overheads
+    of the input file are charged in the schedule. The schedule must
+    have no overlaps, gaps, deadline misses or execution errors over the whole
+    simulated time, the hyperperiod.
+
+    :param args: tuple (testbench file name, algorithm name, options of the algorithm, output directory or None, result cache directory or None).
+    :type  args: tuple
+    :return: Tuple (test case name, list of error messages, elapsed time in seconds, cache hit).
+    :rtype: tuple
+    """
+    filename, algo, options, outdir, cache_dir = args
+    case = case_name(filename, algo, options)
+    errors = []
+
+    # loading and parsing the input YAML file
+    with open(filename) as f:
+        try:
+            docs = yaml.safe_load(f)
+        except yaml.YAMLError as exc:
+            return case, ["invalid input file: %s" % exc], 0.0, False
+
+    # check wheter this yaml file support the selected algorithm
+    if algo not in docs['algo']:
+        return case, ["the file does not support the scheduling algorithm %s" % algo], 0.0, False
+
+    # an empty expected results file means that the task set is not schedulable for this algo
+    expected_file = os.path.join(RESULTS_DIR, case)
+    if not os.path.isfile(expected_file):
+        return case, ["expected results file %s not found" % expected_file], 0.0, False
+    with open(expected_file) as f:
+        expected = f.read()
+
+    log = io.StringIO()
+    start = time.perf_counter()
+    sched = None
+    if cache_dir is not None:
+        cache = SchedCache(cache_dir)
+        key = cache_key(docs['tasks'], algo=algo, overheads=docs.get('overheads'), **options)
+        sched = cache.get(key)
+    hit = sched is not None
+    try:
+        if not hit:
+            with contextlib.redirect_stdout(log):
+                sched = SCHED_ALGOS[algo](copy.deepcopy(docs['tasks']), overheads=docs.get('overheads'), **options)
+            if cache_dir is not None:
+                cache.put(key, sched)
+        generated = yaml.dump(sched, default_flow_style=False)
+    except SystemExit:
+        sched = None
+        generated = ''
+    elapsed = time.perf_counter() - start
+
+    if outdir is not None:
+        with open(os.path.join(outdir, case), 'w') as outfile:
+            outfile.write(generated)
+
+    #comparing the expected schedule with the obtained one
+    if generated != expected:
+        if expected == '':
+            errors.append("the task set was expected to be rejected")
+        elif sched is None:
+            errors.append("the task set was rejected: %s" % log.getvalue().strip().splitlines()[-1])
+        else:
+            errors.append("the generated schedule does not match %s" % expected_file)
+    if sched is not None:
+        result = verify_sched(sched, docs['tasks'], hyperperiod(docs['tasks']))
+        for overlap in result['overlaps']:
+            errors.append("tasks %s and %s overlap in [%d, %d]" % tuple(overlap))
+        for gap in result['gaps']:
+            errors.append("no task nor idle in [%d, %d]" % tuple(gap))
+        for miss in result['deadline_misses']:
+            errors.append("task %s job %d released at %d misses its deadline %d, finish time %s" % tuple(miss))
+        for error in result['exec_errors']:
+            errors.append("task %s job %d released at %d starts at %d" % tuple(error))
+    return case, errors, elapsed, hit
+
+
+def verify_case(algo):
+    """Regression test of the schedule verifier on a generated schedule.
+
+    The whole simulated time is checked, so the job finishing in the last tick of the
+    schedule must be accounted.
+
+    :param algo: algorithm name.
+    :type  algo: str
+    :return: Tuple (test case name, list of error messages).
+    :rtype: tuple
+    """
+    case = "verify-final-tick-" + algo
+    with contextlib.redirect_stdout(io.StringIO()):
+        sched = SCHED_ALGOS[algo](copy.deepcopy(FINAL_TICK_TASKS))
+    result = verify_sched(sched, FINAL_TICK_TASKS, hyperperiod(FINAL_TICK_TASKS))
+    errors = ["the verifier reports %s: %s" % (check, result[check])
+        for check in ('overlaps', 'gaps', 'deadline_misses', 'exec_errors') if result[check]]
+    return case, errors
+
+
+def multicore_case(filename, algo, options, outdir):
+    """Regression test of a multicore schedule.
+
+    The generated schedule must match the expected results file. The schedule
+    of each core must have no overlaps nor gaps. In the partitioned mode, the
+    tasks of each core must have no deadline misses nor execution errors. In the
+    global mode, the jobs of each task are checked over all the cores.
+
+    :param filename: testbench file name.
+    :type  filename: str
+    :param algo: algorithm name.
+    :type  algo: str
+    :param options: number of 'cores' and multicore 'mode'.
+    :type  options: Dictionary.
+    :param outdir: directory to save the generated schedule. If None, it is not saved.
+    :type  outdir: str
+    :return: Tuple (test case name, list of error messages).
+    :rtype: tuple
+    """
+    case = case_name(filename, algo, options)
+    errors = []
+    with open(filename) as f:
+        docs = yaml.safe_load(f)
+    with contextlib.redirect_stdout(io.StringIO()):
+        sched = multicore_sched(copy.deepcopy(docs['tasks']), options['cores'], algo=algo, mode=options['mode'],
+            jobs=options['cores'])
+    generated = yaml.dump(sched, default_flow_style=False)
+    if outdir is not None:
+        with open(os.path.join(outdir, case), 'w') as outfile:
+            outfile.write(generated)
+    expected_file = os.path.join(RESULTS_DIR, case)
+    if not os.path.isfile(expected_file):
+        return case, ["expected results file %s not found" % expected_file]
+    with open(expected_file) as f:
+        if generated != f.read():
+            errors.append("the generated schedule does not match %s" % expected_file)
+
+    sim_time = hyperperiod(docs['tasks'])
+    for core in range(options['cores']):
+        core_sched = dict(sched, sched=[task for task in sched['sched'] if task['core'] == core])
+        task_list = None
+        if options['mode'] == 'partitioned':
+            names = {task['name'] for task in core_sched['sched']}
+            task_list = [task for task in docs['tasks'] if task['name'] in names]
+        result = verify_sched(core_sched, task_list, sim_time)
+        errors += ["core %d: the verifier reports %s: %s" % (core, check, result[check])
+            for check in ('overlaps', 'gaps', 'deadline_misses', 'exec_errors') if result[check]]
+    if options['mode'] == 'global':
+        # the jobs of a task on every core. the tasks of different cores overlap
+        jobs = {}
+        for task in sched['sched']:
+            jobs.setdefault(task['name'], []).extend(task['jobs'])
+        result = verify_sched(dict(sched, sched=[dict(name=name, jobs=task_jobs) for name, task_jobs in jobs.items()]),
+            docs['tasks'], sim_time)
+        errors += ["the verifier reports %s: %s" % (check, result[check])
+            for check in ('deadline_misses', 'exec_errors') if result[check]]
+    return case, errors
+
 
-    .. image:: ../../wikipedia.png
+def merge_segments(segments):
+    """Merge the adjacent execution segments of the same task.
 
-    :param file_name: The shedule YAML file.
-    :type  file_name: List of dictionaries.
-    :return: None.
+    :param segments: execution segments [task, start, end), sorted by start time.
+    :type  segments: List of lists.
+    :rtype: List of lists.
+    """
+    merged = []
+    for task, start, end in segments:
+        if merged and merged[-1][0] == task and merged[-1][2] == start:
+            merged[-1][2] = end
+        else:
+            merged.append([task, start, end])
+    return merged
+
+
+def batch_case(algo, num_sets=60, sim_time=3000):
+    """Regression test of the batch simulator against the event simulator.
+
+    Generated task sets, some of them overloaded or with constrained deadlines, must
+    have the same execution intervals and deadline misses in both simulators.
+
+    :param algo: algorithm name.
+    :type  algo: str
+    :param num_sets: number of generated task sets.
+    :type  num_sets: int
+    :param sim_time: Number of OS ticks to be simulated.
+    :type  sim_time: int
+    :return: Tuple (test case name, list of error messages).
+    :rtype: tuple
+    """
+    case = "batch-vs-event-" + algo
+    errors = []
+    rng = np.random.default_rng(SEED)
+    task_sets = [gen_task_set(int(rng.integers(2, 7)), rng.uniform(0.5, 1.2), rng, 5, 300, constrained=idx % 2 == 1)
+        for idx in range(num_sets)]
+    result = batch_sched(*pack_task_sets(task_sets), sim_time=sim_time, algo=algo, intervals=True, stop_at_miss=False)
+    intervals = result['intervals']
+    for idx, tasks in enumerate(task_sets):
+        rows = intervals['set'] == idx
+        # the idle intervals are -1 in the batch simulator and len(tasks) in the event one
+        batch = [[int(task) if task >= 0 else len(tasks), int(start), int(end)]
+            for task, start, end in zip(intervals['task'][rows], intervals['start'][rows], intervals['end'][rows])]
+        segments = event_sched(tasks, sim_time, SCHED_PRIORITIES[algo], task_ids=True)
+        if merge_segments(batch) != merge_segments(segments):
+            errors.append("task set %d: the execution intervals differ" % idx)
+        names = [task['name'] for task in tasks] + ['idle']
+        sched = dict(sched=[dict(name=name, jobs=[[start, end] for task, start, end in segments if task == task_idx])
+            for task_idx, name in enumerate(names)])
+        missed = len(verify_sched(sched, tasks, sim_time)['deadline_misses']) > 0
+        if missed != bool(result['missed'][idx]):
+            errors.append("task set %d: the deadline miss is %s in the batch simulator and %s in the event simulator" %
+                (idx, bool(result['missed'][idx]), missed))
+    return case, errors
+
+
+def admission_case(algo, num_ops=400):
+    """Regression test of the incremental admission control against the full analysis.
+
+    A seeded sequence of admissions, removals and changes is applied to the admission
+    control. Each verdict must match the full analysis of the resulting task set, and
+    the RMS response times must match :func:`rms.rms_response_times`.
+
+    :param algo: algorithm name.
+    :type  algo: str
+    :param num_ops: number of changes.
+    :type  num_ops: int
+    :return: Tuple (test case name, list of error messages).
+    :rtype: tuple
+    """
+    case = "admission-" + algo
+    errors = []
+    rng = np.random.default_rng(SEED)
+    admission = RmsAdmission() if algo == 'rms' else EdfAdmission()
+    # the admitted tasks, by name
+    admitted = {}
+    for op in range(num_ops):
+        task = gen_task_set(1, rng.uniform(0.02, 0.3), rng, 5, 200, constrained=rng.random() < 0.5)[0]
+        kind = rng.choice(['admit', 'remove', 'modify'], p=[0.6, 0.2, 0.2]) if admitted else 'admit'
+        if kind == 'admit':
+            task['name'] = 'op%d' % op
+            candidate = dict(admitted, **{task['name']: task})
+            accepted = admission.admit(task)
+        elif kind == 'remove':
+            name = str(rng.choice(sorted(admitted)))
+            candidate = {key: value for key, value in admitted.items() if key != name}
+            admission.remove(name)
+            accepted = True
+        else:
+            task['name'] = str(rng.choice(sorted(admitted)))
+            candidate = dict(admitted, **{task['name']: task})
+            accepted = admission.modify(task)
+
+        if algo == 'rms':
+            resp = rms_response_times(list(candidate.values()))
+            expected = all(value is not None for value in resp)
+        else:
+            with contextlib.redirect_stdout(io.StringIO()):
+                expected = edf_is_schedulable(list(candidate.values()))
+        if accepted != expected:
+            errors.append("%s %d: the change is %s, but the full analysis says %s" %
+                (kind, op, 'accepted' if accepted else 'rejected', 'schedulable' if expected else 'not schedulable'))
+        if accepted:
+            admitted = candidate
+        if algo == 'rms' and accepted and admission.response_times() != dict(zip(candidate, resp)):
+            errors.append("%s %d: the response times differ from the full analysis" % (kind, op))
+        if len(admission) != len(admitted) or not all(name in admission for name in admitted):
+            errors.append("%s %d: the admitted tasks differ" % (kind, op))
+    return case, errors
+
+
+def window_jobs(sched, start, end):
+    """Jobs of each task of a schedule clipped to a time window.
+
+    The adjacent jobs of a task are merged, since the simulators may split an execution
+    at different ticks.
+
+    :param sched: The schedule.
+    :type  sched: Dictionary.
+    :param start: window start.
+    :type  start: int
+    :param end: window end (exclusive).
+    :type  end: int
+    :return: The list of [start, end) intervals of each task name.
+    :rtype: Dictionary.
+    """
+    jobs = {}
+    for task in sched['sched']:
+        intervals = []
+        for job_start, job_end in task['jobs']:
+            job_start, job_end = max(job_start, start), min(job_end, end)
+            if job_start >= job_end:
+                continue
+            if intervals and intervals[-1][1] == job_start:
+                intervals[-1][1] = job_end
+            else:
+                intervals.append([job_start, job_end])
+        if intervals:
+            jobs[task['name']] = intervals
+    return jobs
+
+
+def checkpoint_priority_case(policy):
+    """Regression test of the priority levels saved in the checkpoint file.
+
+    The 'priority' fields of the input file must be ignored by the re-simulated windows,
+    unless they are the selected priority assignment.
+
+    :param policy: priority assignment of rms.
+    :type  policy: str
+    :return: Tuple (test case name, list of error messages).
+    :rtype: tuple
+    """
+    case = "checkpoint-priority-" + policy
+    errors = []
+    checkpoints = SchedCheckpoints(4)
+    with contextlib.redirect_stdout(io.StringIO()):
+        sched = rms(copy.deepcopy(PRIORITY_FIELD_TASKS), checkpoints=checkpoints, policy=policy)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        file_name = os.path.join(tmpdir, 'sched.yaml.ckpt')
+        save_checkpoints(checkpoints, PRIORITY_FIELD_TASKS, 'rms', file_name, assign_priorities(PRIORITY_FIELD_TASKS, policy))
+        for start, end in [(0, 20), (0, 3), (5, 13), (8, 9)]:
+            window = load_window(file_name, start, end)
+            if window_jobs(window, start, end) != window_jobs(sched, start, end):
+                errors.append("the window [%d, %d) does not match the full schedule" % (start, end))
+    return case, errors
+
+
+def checkpoint_case(algo, num_sets=20, sim_time=5000, interval=250):
+    """Regression test of the time windows re-simulated from the checkpoints.
+
+    Generated task sets, some of them overloaded, are simulated with checkpoints, which
+    are saved in a checkpoint file. Each window re-simulated from the file must match
+    the same window of the full schedule, including the windows at the start and at the
+    end of the schedule and the ones crossing checkpoints.
+
+    :param algo: algorithm name.
+    :type  algo: str
+    :param num_sets: number of generated task sets.
+    :type  num_sets: int
+    :param sim_time: Number of OS ticks to be simulated.
+    :type  sim_time: int
+    :param interval: checkpoint interval.
+    :type  interval: int
+    :return: Tuple (test case name, list of error messages).
+    :rtype: tuple
+    """
+    case = "checkpoint-window-" + algo
+    errors = []
+    rng = np.random.default_rng(SEED)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        file_name = os.path.join(tmpdir, 'sched.yaml.ckpt')
+        for idx in range(num_sets):
+            tasks = gen_task_set(int(rng.integers(2, 7)), rng.uniform(0.5, 1.2), rng, 5, 300, constrained=idx % 2 == 1)
+            checkpoints = SchedCheckpoints(interval)
+            segments = event_sched(tasks, sim_time, SCHED_PRIORITIES[algo], checkpoints=checkpoints)
+            names = [task['name'] for task in tasks] + ['idle']
+            sched = dict(sched=[dict(name=name, jobs=[[start, end] for task, start, end in segments if task == name])
+                for name in names])
+            save_checkpoints(checkpoints, tasks, algo, file_name,
+                assign_priorities(tasks) if algo == 'rms' else None)
+            starts = rng.integers(0, sim_time, 5)
+            windows = [(0, interval), (sim_time - 1, sim_time), (interval - 1, interval + 1), (0, sim_time)]
+            windows += [(int(start), int(start + rng.integers(1, 3*interval))) for start in starts]
+            for start, end in windows:
+                window = load_window(file_name, start, end)
+                if window_jobs(window, start, end) != window_jobs(sched, start, end):
+                    errors.append("task set %d: the window [%d, %d) does not match the full schedule" % (idx, start, end))
+    return case, errors
+
+
+def checkpoint_overheads_case(algo):
+    """Regression test of the rejection of the checkpoints with scheduling overheads.
+
+    :param algo: algorithm name.
+    :type  algo: str
+    :return: Tuple (test case name, list of error messages).
+    :rtype: tuple
+    """
+    case = "checkpoint-overheads-" + algo
+    errors = []
+    with open(os.path.join(EXAMPLES_DIR, 'overheads.yaml')) as f:
+        docs = yaml.safe_load(f)
+    try:
+        event_sched(docs['tasks'], hyperperiod(docs['tasks']), SCHED_PRIORITIES[algo],
+            checkpoints=SchedCheckpoints(10), overheads=docs['overheads'])
+        errors.append("the simulator accepts checkpoints with overheads")
+    except ValueError:
+        pass
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            SCHED_ALGOS[algo](copy.deepcopy(docs['tasks']), checkpoints=SchedCheckpoints(10), overheads=docs['overheads'])
+        errors.append("%s accepts checkpoints with overheads" % algo)
+    except SystemExit:
+        pass
+    return case, errors
+
+
+def sched_file_case(filename, algo):
+    """Regression test of the binary schedule format and of the time windows of the schedule files.
+
+    A schedule with metrics is saved in the binary and YAML formats. Both files must load
+    the same schedule, and the same jobs for each window: at the schedule start, at the last
+    tick, after the end and around the end of a job.
+
+    :param filename: testbench file name.
+    :type  filename: str
+    :param algo: algorithm name.
+    :type  algo: str
+    :return: Tuple (test case name, list of error messages).
+    :rtype: tuple
+    """
+    case = "sched-file-" + case_name(filename, algo, {})
+    errors = []
+    with open(filename) as f:
+        docs = yaml.safe_load(f)
+    with contextlib.redirect_stdout(io.StringIO()):
+        sched = SCHED_ALGOS[algo](copy.deepcopy(docs['tasks']), metrics=True)
+    sim_time = hyperperiod(docs['tasks'])
+    job_end = sched['sched'][0]['jobs'][0][1]
+    windows = [(None, None), (0, 0), (0, 1), (sim_time - 1, sim_time), (sim_time, sim_time + 10),
+        (job_end - 1, job_end), (job_end, job_end + 1), (job_end - 1, job_end + 1), (None, job_end), (job_end, None)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        bin_file = os.path.join(tmpdir, 'sched.sched')
+        yaml_file = os.path.join(tmpdir, 'sched.yaml')
+        save_sched(sched, bin_file)
+        save_sched(sched, yaml_file)
+        for start, end in windows:
+            # the jobs running at or after start and starting before end
+            expected = dict(sched, sched=[dict(task, jobs=[job for job in task['jobs']
+                if (start is None or job[1] > start) and (end is None or job[0] < end)]) for task in sched['sched']])
+            for file_name in (bin_file, yaml_file):
+                if load_sched(file_name, start, end) != expected:
+                    errors.append("%s: the window [%s, %s) does not match the schedule" % (os.path.basename(file_name), start, end))
+    return case, errors
+
+
+def api_case(algo):
+    """Regression test of the library API.
+
+    The schedules of :func:`sched_api.schedule` must match the ones of the command line
+    wrappers, without printing anything nor changing the inputs. Each kind of error must
+    raise its exception.
+
+    :param algo: algorithm name.
+    :type  algo: str
+    :return: Tuple (test case name, list of error messages).
+    :rtype: tuple
+    """
+    case = "api-" + algo
+    errors = []
+    with open(os.path.join(EXAMPLES_DIR, 'testbench2.yaml')) as f:
+        docs = yaml.safe_load(f)
+    with open(os.path.join(EXAMPLES_DIR, 'overheads.yaml')) as f:
+        overhead_docs = yaml.safe_load(f)
+    for tasks, options in [(docs['tasks'], {}), (docs['tasks'], dict(metrics=True, engine='tick')),
+            (docs['tasks'], dict(keep_sched=False)), (overhead_docs['tasks'], dict(overheads=overhead_docs['overheads']))]:
+        inputs = copy.deepcopy((tasks, options))
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            sched = schedule(tasks, algo, **options)
+        if log.getvalue() != '':
+            errors.append("%s: schedule prints %r" % (options, log.getvalue()))
+        if (tasks, options) != inputs:
+            errors.append("%s: schedule changes its inputs" % options)
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = SCHED_ALGOS[algo](copy.deepcopy(tasks), **options)
+        if sched != expected:
+            errors.append("%s: the schedule does not match %s()" % (options, algo))
+
+    with open(os.path.join(EXAMPLES_DIR, 'testbench5.yaml')) as f:
+        overloaded = yaml.safe_load(f)['tasks']
+    missing = [dict(task) for task in docs['tasks']]
+    del missing[0]['period']
+    failures = [
+        (InvalidTaskSetError, missing, {}),
+        (InvalidTaskSetError, docs['tasks'], dict(overheads=dict(context_switch=-1))),
+        (NotSchedulableError, overloaded, {}),
+        (UnsupportedOptionError, docs['tasks'], dict(engine='bogus')),
+        (UnsupportedOptionError, docs['tasks'], dict(horizon='bogus')),
+        (UnsupportedOptionError, docs['tasks'], dict(overheads=overhead_docs['overheads'], engine='tick')),
+        (UnsupportedOptionError, docs['tasks'], dict(checkpoints=SchedCheckpoints(10), engine='tick')),
+        (UnsupportedOptionError, TaskSet(docs['tasks'], algos=['rms' if algo == 'edf' else 'edf']), {}),
+    ]
+    if algo == 'rms':
+        failures += [
+            (InvalidTaskSetError, docs['tasks'], dict(policy='explicit')),
+            (UnsupportedOptionError, docs['tasks'], dict(policy='bogus')),
+            (NotSchedulableError, overloaded, dict(policy='opa')),
+        ]
+    else:
+        failures.append((UnsupportedOptionError, docs['tasks'], dict(policy='dm')))
+    for exception, tasks, options in failures:
+        log = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(log):
+                schedule(tasks, algo, **options)
+            errors.append("%s: %s not raised" % (options, exception.__name__))
+        except exception:
+            pass
+        except Exception as exc:
+            errors.append("%s: %s raised instead of %s" % (options, type(exc).__name__, exception.__name__))
+        if log.getvalue() != '':
+            errors.append("%s: schedule prints %r" % (options, log.getvalue()))
+    try:
+        schedule(docs['tasks'], 'bogus')
+        errors.append("the unsupported algorithm is accepted")
+    except UnsupportedOptionError:
+        pass
+    return case, errors
+
+
+def cache_case():
+    """Regression test of the result cache.
+
+    Checks the hits in memory and on disk, the misses, the keys that must change
+    with the tasks, the options and the code of the simulators, and the eviction
+    from memory and disk.
+
+    :return: Tuple (test case name, list of error messages).
+    :rtype: tuple
+    """
+    case = "result-cache"
+    errors = []
+    tasks = copy.deepcopy(FINAL_TICK_TASKS)
+    key = cache_key(tasks, algo='rms')
+    with contextlib.redirect_stdout(io.StringIO()):
+        sched = rms(copy.deepcopy(tasks))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = SchedCache(tmpdir)
+        if cache.get(key) is not None:
+            errors.append("hit in an empty cache")
+        cache.put(key, sched)
+        cached = cache.get(key)
+        if cached != sched or cached is sched:
+            errors.append("the memory hit is not a copy of the stored value")
+        if SchedCache(tmpdir).get(key) != sched:
+            errors.append("the value stored on disk is not found by another cache")
+        if cache.stats() != dict(hits=1, disk_hits=0, misses=1):
+            errors.append("wrong counters %s" % cache.stats())
+
+        # the keys change with the task set, the order of the tasks, the options and the simulators
+        keys = [cache_key(tasks, algo='edf'), cache_key(tasks[::-1], algo='rms'),
+            cache_key([dict(tasks[0], exec_time=2)] + tasks[1:], algo='rms'), cache_key(tasks, algo='rms', sim_time=10)]
+        code_version = sched_cache.CODE_VERSION
+        try:
+            sched_cache.CODE_VERSION = 'changed'
+            keys.append(cache_key(tasks, algo='rms'))
+        finally:
+            sched_cache.CODE_VERSION = code_version
+        if key in keys or len(set(keys)) != len(keys):
+            errors.append("the cache key does not change with the task set, the options or the simulators")
+        if cache_key(tasks, algo='rms') != key or cache_key([dict(sorted(task.items())) for task in tasks], algo='rms') != key:
+            errors.append("the cache key is not canonical")
+
+        # the least recently used values are evicted from memory and disk
+        small = SchedCache(os.path.join(tmpdir, 'small'), max_entries=2,
+            max_disk_bytes=2*len(pickle.dumps(sched, protocol=pickle.HIGHEST_PROTOCOL)))
+        for value in range(3):
+            small.put(str(value), sched)
+        if list(small.memory) != ['1', '2']:
+            errors.append("the memory keeps %s instead of the last 2 values" % list(small.memory))
+        if sorted(os.listdir(small.directory)) != ['1.pickle', '2.pickle']:
+            errors.append("the disk keeps %s instead of the last 2 values" % sorted(os.listdir(small.directory)))
+        small.clear()
+        if small.get('2') is not None or os.listdir(small.directory):
+            errors.append("the cleared cache is not empty")
+
+    # the task name of the idle task is reserved, so no task is dropped from the key
+    try:
+        TaskSet([dict(tasks[0], name='idle')] + tasks[1:])
+        errors.append("a task named idle is accepted")
+    except InvalidTaskSetError:
+        pass
+    return case, errors
+
+
+def exact_test(tasks, algo):
+    """Exact schedulability test, used to check the other analyses.
+
+    :param tasks: list of task descriptors. The execution times may be fractions.
+    :param algo: algorithm name.
+    :type  algo: str
+    :rtype: bool
+    """
+    if algo == 'rms':
+        return all(resp is not None for resp in rms_response_times(tasks))
+    with contextlib.redirect_stdout(io.StringIO()):
+        return edf_is_schedulable(tasks)
+
+
+def sensitivity_case(algo, num_sets=30, tolerance=1e-6):
+    """Regression test of the sensitivity analysis against the exact schedulability tests.
+
+    For generated task sets, the execution times scaled by the breakdown factor must be
+    schedulable, and scaled slightly above it must not. Each task with its execution time
+    increased by its slack must be schedulable, and increased by one tick more must not.
+
+    :param algo: algorithm name.
+    :type  algo: str
+    :param num_sets: number of generated task sets.
+    :type  num_sets: int
+    :param tolerance: relative precision of the breakdown factor.
+    :type  tolerance: float
+    :return: Tuple (test case name, list of error messages).
+    :rtype: tuple
+    """
+    case = "sensitivity-" + algo
+    errors = []
+    rng = np.random.default_rng(SEED)
+    for idx in range(num_sets):
+        tasks = gen_task_set(int(rng.integers(2, 7)), rng.uniform(0.4, 1.0), rng, 5, 300, constrained=idx % 2 == 1)
+        report = sensitivity_report(tasks, algo, tolerance)
+        if report['schedulable'] != exact_test(tasks, algo):
+            errors.append("task set %d: the schedulability verdict differs from the exact test" % idx)
+        # the factor is precise up to the tolerance
+        factor = Fraction(report['breakdown_factor']).limit_denominator(int(1e3 / tolerance))
+        for scale, expected in ((factor * (1 - 2*Fraction(tolerance)), True), (factor * (1 + 2*Fraction(tolerance)), False)):
+            if exact_test([dict(task, exec_time=task['exec_time'] * scale) for task in tasks], algo) != expected:
+                errors.append("task set %d: the execution times scaled by %.8f are %sschedulable" %
+                    (idx, scale, 'not ' if expected else ''))
+        if not report['schedulable']:
+            continue
+        for task_idx, entry in enumerate(report['tasks']):
+            for extra, expected in ((entry['slack'], True), (entry['slack'] + 1, False)):
+                changed = list(tasks)
+                changed[task_idx] = dict(tasks[task_idx], exec_time=tasks[task_idx]['exec_time'] + extra)
+                if exact_test(changed, algo) != expected:
+                    errors.append("task set %d: task %s with %d more ticks is %sschedulable" %
+                        (idx, entry['name'], extra, 'not ' if expected else ''))
+    return case, errors
+
+
+def metrics_case(algo):
+    """Regression test of the timing metrics against the ones computed by hand.
+
+    The metrics of METRICS_TASKS must match METRICS_EXPECTED with both simulation
+    engines, whether the schedule is kept or not.
+
+    :param algo: algorithm name.
+    :type  algo: str
+    :return: Tuple (test case name, list of error messages).
+    :rtype: tuple
+    """
+    case = "metrics-" + algo
+    errors = []
+    for engine in ('event', 'tick'):
+        for keep_sched in (True, False):
+            metrics = schedule(METRICS_TASKS, algo, engine=engine, metrics=True, keep_sched=keep_sched)['metrics']
+            for task in metrics['tasks']:
+                expected = dict(zip(METRICS_FIELDS, METRICS_EXPECTED[algo][task['name']]))
+                for field, value in expected.items():
+                    if task[field] != value:
+                        errors.append("%s engine, keep_sched=%s: %s of task %s is %s instead of %s" %
+                            (engine, keep_sched, field, task['name'], task[field], value))
+            if metrics['idle_ratio'] != 2/12 or metrics['overhead_ratio'] != 0:
+                errors.append("%s engine, keep_sched=%s: the idle ratio is %s instead of %s" %
+                    (engine, keep_sched, metrics['idle_ratio'], 2/12))
+    return case, errors
+
+
+async def server_session(server, socket_path, docs, yaml_text):
+    """Client side of :func:`server_case`. Runs the service and returns the error messages."""
+    errors = []
+    # record the requests of each batch sent to the workers
+    batches = []
+    run_batch = server.run_batch
+    def record_batch(batch):
+        batches.append([request.get('id') for request, _ in batch])
+        return run_batch(batch)
+    server.run_batch = record_batch
+    # the connections being served, so the service stops after the last one is closed
+    connections = []
+    handle_client = server.handle_client
+    def record_client(reader, writer):
+        connections.append(asyncio.ensure_future(handle_client(reader, writer)))
+        return connections[-1]
+    server.handle_client = record_client
+
+    serve = asyncio.ensure_future(server.serve(socket_path))
+    try:
+        while not os.path.exists(socket_path):
+            if serve.done():
+                serve.result()
+            await asyncio.sleep(0.01)
+        # start the workers before connecting, otherwise the forked workers keep a copy
+        # of the client socket, and the service never sees the connection closed
+        await asyncio.gather(*[asyncio.get_running_loop().run_in_executor(server.pool, int) for _ in range(server.jobs)])
+
+        # the results must match the ones of the library API
+        reader, writer = await open_connection(socket_path)
+        task_set = TaskSet(docs['tasks'])
+        for algo in SCHED_ALGOS:
+            expected = [
+                dict(schedulable=task_set.is_schedulable(algo), utilization=sum(task['exec_time']/task['period'] for task in docs['tasks'])),
+                dict(metrics=schedule(task_set, algo, metrics=True, keep_sched=False)['metrics']),
+                dict(sched=schedule(task_set, algo)),
+            ]
+            if algo == 'rms':
+                expected[0]['response_times'] = dict((task['name'], resp) for task, resp in zip(docs['tasks'], rms_response_times(docs['tasks'])))
+            for op, fields in zip(['analyze', 'metrics', 'schedule'], expected):
+                for source in (dict(yaml=yaml_text), dict(tasks=docs['tasks'])):
+                    request = dict(id=op, op=op, algo=algo, **source)
+                    writer.write(json.dumps(request).encode() + b'\n')
+                    response = json.loads(await reader.readline())
+                    # compared after a JSON round trip, as sent by the service
+                    fields = json.loads(json.dumps(fields))
+                    if response != dict(id=op, ok=True, **fields):
+                        errors.append("%s %s from %s: the response does not match sched_api" % (algo, op, list(source)[0]))
+
+        # the invalid requests are answered with an error, and the connection keeps working
+        for line, error_type in [(b'not json', 'ValueError'), (b'[1, 2]', 'ValueError'),
+                (json.dumps(dict(id=1, op='bogus', tasks=docs['tasks'])).encode(), 'ValueError'),
+                (json.dumps(dict(id=2, yaml='tasks: [')).encode(), 'ParserError'),
+                (json.dumps(dict(id=3, yaml='[1, 2]')).encode(), 'ValueError'),
+                (json.dumps(dict(id=4, tasks=[dict(name='a', exec_time=1)])).encode(), 'InvalidTaskSetError')]:
+            writer.write(line + b'\n')
+            response = json.loads(await reader.readline())
+            if response.get('ok') is not False or response.get('error_type') != error_type or not response.get('error'):
+                errors.append("the request %r gets %s instead of a %s" % (line[:20], response, error_type))
+        writer.write(json.dumps(dict(id='after', yaml=yaml_text)).encode() + b'\n')
+        if not json.loads(await reader.readline()).get('ok'):
+            errors.append("the connection does not work after the invalid requests")
+        writer.close()
+
+        # pipelined requests of concurrent connections: the responses come in the order of the
+        # requests of each connection, although the long simulations finish after the analyses
+        async def pipeline(conn, num_requests=20):
+            reader, writer = await open_connection(socket_path)
+            ids = ['%d-%d' % (conn, idx) for idx in range(num_requests)]
+            for idx, request_id in enumerate(ids):
+                # different simulation times, so the worker caches do not hit
+                request = dict(id=request_id, op='analyze', algo='edf', tasks=docs['tasks'])
+                if idx % 4 == 0:
+                    request.update(op='metrics', sim_time=100000 + 100*conn + idx)
+                writer.write(json.dumps(request).encode() + b'\n')
+            await writer.drain()
+            responses = [json.loads(await reader.readline()) for _ in ids]
+            writer.close()
+            if [response['id'] for response in responses] != ids or not all(response['ok'] for response in responses):
+                errors.append("connection %d: the responses are not in the order of the requests" % conn)
+
+        batches.clear()
+        await asyncio.gather(*[pipeline(conn) for conn in range(4)])
+        if not any(len(set(request_id.split('-')[0] for request_id in batch)) > 1 for batch in batches):
+            errors.append("the requests of different connections are never batched together")
+        await asyncio.gather(*connections)
+    finally:
+        serve.cancel()
+        try:
+            await serve
+        except asyncio.CancelledError:
+            pass
+    return errors
+
+
+def server_case():
+    """Regression test of the scheduling analysis service, on a Unix socket.
+
+    Checks that the responses match :mod:`sched_api`, that the invalid requests get
+    an error response, that the responses of each connection come in the order of its
+    requests, and that the requests of different connections are batched together.
+
+    :return: Tuple (test case name, list of error messages).
+    :rtype: tuple
+    """
+    case = "server"
+    with open(os.path.join(EXAMPLES_DIR, 'testbench2.yaml')) as f:
+        yaml_text = f.read()
+    docs = yaml.safe_load(yaml_text)
+    # few workers, so the requests queue up while they are busy
+    server = SchedServer(jobs=2, batch_size=8, batch_window=0.05)
+    with tempfile.TemporaryDirectory() as tmpdir, contextlib.redirect_stdout(io.StringIO()):
+        errors = asyncio.run(server_session(server, os.path.join(tmpdir, 'server.sock'), docs, yaml_text))
+    return case, errors
+
+
+def main():
+    """Tester for the scheduling algoritms.
+
+    Runs every testbench in the examples directory with every scheduling algorithm
+    in parallel worker processes, compares the schedules with the expected ones in
+    the results directory, and reports all the failures. Optionally, it also runs
+    the scaling benchmark suite and compares it with the stored baseline.
+
+    :return: 0 if all tests passed, 1 otherwise.
+    :rtype: int
     """
     # parsing arguments
     parser = argparse.ArgumentParser()
-    parser.add_argument('file', type=argparse.FileType('r'),
-                        help='input file describing the tasks to be scheduled'
-                        )
-    parser.add_argument('--ofile', type=argparse.FileType('w'),
-                        help='output file with the resulting schedule. If not defined, it will not be saved in a file'
-                        )
-    parser.add_argument('-s','--simtime', dest='sim_time', default=0, type=int,
-                help='The number of OS ticks to be simulated.')
+    parser.add_argument('-j','--jobs', default=None, type=int,
+                help='The number of worker processes. If not defined, the number of CPUs is used.')
+    parser.add_argument('--outdir', default=None,
+                help='directory to save the generated schedules. If not defined, they are not saved')
     parser.add_argument('-v','--verbose', dest='verbose', action='store_true', default=False)
-    parser.add_argument('--sched',
-                        default='rms',
-                        nargs='?',
-                        choices=['rms', 'edf'],
-                        help='list of supported task scheduling algoritms (default: %(default)s)')
+    parser.add_argument('--cache', action='store_true', default=False,
+                help='reuse the schedules of the result cache. The cache is invalidated when the simulators change')
+    parser.add_argument('--cache-dir', dest='cache_dir', default=DEFAULT_CACHE_DIR,
+                help='directory of the result cache (default: %(default)s)')
+    parser.add_argument('--bench', action='store_true', default=False,
+                help='run also the scaling benchmark suite')
+    parser.add_argument('--save-baseline', dest='save_baseline', action='store_true', default=False,
+                help='save the benchmark results as the new baseline')
+    parser.add_argument('--tolerance', default=0.5, type=float,
+                help='accepted benchmark slowdown with respect to the baseline (default: %(default)s)')
 
     args = parser.parse_args()
-    pp = pprint.PrettyPrinter(indent=4)
 
     # set the tested scheduling algorithms and the testcases
-    tested_sched_algo = ['rms','edf']
-    testcases = glob.glob("testbench*.yaml")
-   
-    os.chdir("../examples")
+    testcases = sorted(glob.glob(os.path.join(EXAMPLES_DIR, "testbench*.yaml")))
+    cache_dir = args.cache_dir if args.cache else None
+    work = [(filename, algo, {}, args.outdir, cache_dir) for filename in testcases for algo in SCHED_ALGOS]
+    work += [(os.path.join(EXAMPLES_DIR, filename), algo, options, args.outdir, cache_dir) for filename, algo, options in OPTION_CASES]
 
     # main test loop
-    for filename in testcases:
-        # loading and parsing the input YAML file
-        with open(filename) as f:
-            try:
-                docs = yaml.safe_load(f)
-            except yaml.YAMLError as exc:
-                print(exc)
-
-        if args.verbose:
-            print ('PRINTING THE INPUT CONFIGURATION FILE:')
-            pp.pprint(docs)
-
-        # testing the same file for different algorithms
-        for algo in tested_sched_algo:
-            print("Testing:",filename, algo)
-
-            # loading and parsing the expected YAML file
-            #dir_name = os.path.dirname(filename)
-            extension = os.path.splitext(os.path.basename(filename))[1]
-            fname = os.path.splitext(filename)[0]
-            # if the filename is testbench2.yaml and the algorithm is RMS, then 
-            # the output filename will be /tmp/testbench2-rms.yaml
-            expected_file = "../tests/results/"+fname+"-"+algo+extension
-            
-            #is the expected results file is not found, it means that the 
-            #taskset was not schedulable for this algo
-            with open(expected_file) as f:
-                try:
-                    expected_doc = yaml.safe_load(f)
-                except yaml.YAMLError as exc:
-                    expected_doc = None
-                    print("Expected results file is not found.", filename, "is not schedulable for", algo)
-
-            # check wheter this yaml file support the selected algorithm
-            valid_algo = False
-            for supported_algo in docs['algo']:
-                if supported_algo == algo:
-                    valid_algo = True
-                    break
-            if not valid_algo:
-                print ("ERROR: the selected file does not support the selected scheduling algorithm", algo)
-                return 1
-
-            # selecting and running the scheduling algorithm
-            if algo == 'rms':
-                sched = rms(docs['tasks'], verbose=args.verbose)
-            elif algo == 'edf':
-                sched = edf(docs['tasks'], verbose=args.verbose)
-            else:
-                print ("ERROR: unsupported scheduling algorithm", algo)
-                return 1
-
-            extension = os.path.splitext(filename)[1]
-            fname = os.path.splitext(filename)[0]
-            # if the filename is testbench2.yaml and the algorithm is RMS, then 
-            # the output filename will be /tmp/testbench2-rms.yaml
-            ofile = "/tmp/"+fname+"-"+algo+extension
-            with open(ofile, 'w') as outfile:
-                yaml.dump(sched, outfile, default_flow_style=False)
-
-            #comparing the expected schedule with the obtained one
-            if expected_doc != sched:
-                print("ERROR:", filename, algo, "do not match")
-            # compare both files
-            if not filecmp.cmp(expected_file, ofile, shallow=False):
-                print ('ERROR: PRINTING THE GENERATED FILES:')
-                pp.pprint(expected_doc)
-                pp.pprint(sched)
-                return 1
-
-    return 0
+    failures = 0
+    hits = 0
+    with Pool(args.jobs) as pool:
+        for case, errors, elapsed, hit in pool.imap(run_case, work):
+            print ("%-36s %-6s %8.4fs %s" % (case, 'FAIL' if errors else 'ok', elapsed, '(cached)' if hit else ''))
+            for error in errors:
+                print ("    ERROR:", error)
+            failures += len(errors) > 0
+            hits += hit
+    # the checks of the other features, run in this process
+    checks = [functools.partial(verify_case, algo) for algo in SCHED_ALGOS]
+    checks += [functools.partial(multicore_case, os.path.join(EXAMPLES_DIR, filename), algo, options, args.outdir)
+        for filename, algo, options in MULTICORE_CASES]
+    checks += [functools.partial(checkpoint_priority_case, policy) for policy in ('rm', 'explicit')]
+    checks += [functools.partial(sched_file_case, filename, algo) for filename in testcases[:2] for algo in SCHED_ALGOS]
+    checks += [functools.partial(checkpoint_case, algo) for algo in SCHED_ALGOS]
+    checks += [functools.partial(checkpoint_overheads_case, algo) for algo in SCHED_ALGOS]
+    checks += [functools.partial(batch_case, algo) for algo in SCHED_ALGOS]
+    checks += [functools.partial(admission_case, algo) for algo in SCHED_ALGOS]
+    checks += [functools.partial(api_case, algo) for algo in SCHED_ALGOS]
+    checks += [functools.partial(metrics_case, algo) for algo in SCHED_ALGOS]
+    checks += [functools.partial(sensitivity_case, algo) for algo in SCHED_ALGOS]
+    checks.append(cache_case)
+    checks.append(server_case)
+    for check in checks:
+        case, errors = check()
+        print ("%-36s %-6s" % (case, 'FAIL' if errors else 'ok'))
+        for error in errors:
+            print ("    ERROR:", error)
+        failures += len(errors) > 0
+    print ("%d of %d test cases failed" % (failures, len(work) + len(checks)))
+    if args.cache:
+        print ("result cache: %d hits, %d misses" % (hits, len(work) - hits))
+
+    if args.bench:
+        # imported here since it is needed only for benchmarking
+        import benchmark
+        failures += benchmark.main(args.tolerance, args.save_baseline, args.verbose)
+
+    return 1 if failures > 0 else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())